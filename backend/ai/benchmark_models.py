@@ -0,0 +1,180 @@
+"""Forward-pass micro-benchmark across models, batch sizes and TF thread settings.
+
+Run from the ai directory:
+
+    python benchmark_models.py                                    # every model, default grid
+    python benchmark_models.py --models cnn ensemble --batch-sizes 1 8 32 --threads 0:0 4:1 8:2
+
+Each (model, intra:inter threads) pair runs in its own subprocess, because
+TensorFlow's thread pools can only be configured before the runtime starts,
+and so that peak RSS and load time are measured per model. Models load from
+trained/ when the .keras file exists, otherwise they are built with random
+weights from models/*.py (same architecture, so latency is representative).
+
+Results are written as <output>.csv and <output>.json; rows on the Pareto
+front of (p50 latency, throughput, peak RSS) are marked ``pareto``.
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from export_tflite import MODELS, TRAINED_DIR
+
+DEFAULT_BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64]
+DEFAULT_THREADS = ["0:0", "1:1", "4:1", "8:2"]  # intra:inter, 0 = TensorFlow default
+
+
+def build_random(name: str):
+    """Randomly initialized equivalent of a trained model, from models/*.py"""
+    from models.cnn_model import build_cnn_model
+    from models.ensemble_model import build_ensemble
+    from models.resnet_model import build_resnet_model
+    from models.vgg16_model import build_vgg16_model
+
+    if name == "vgg16":
+        return build_vgg16_model(weights=None)[0]
+    if name == "resnet50v2":
+        return build_resnet_model(weights=None)[0]
+    if name == "cnn":
+        return build_cnn_model()[0]
+    if name == "cnn_binarized":
+        return build_cnn_model(binarize=True)[0]
+    _, vgg_base = build_vgg16_model(weights=None)
+    _, resnet_base = build_resnet_model(weights=None)
+    _, cnn_base = build_cnn_model()
+    return build_ensemble(vgg_base, resnet_base, cnn_base)
+
+
+def peak_rss_mb() -> float:
+    import resource
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def run_worker(name: str, intra: int, inter: int, batch_sizes: list, repeat: int, random_init: bool) -> list:
+    """Benchmark one model under one thread setting (runs in a fresh process)"""
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(intra)
+    tf.config.threading.set_inter_op_parallelism_threads(inter)
+
+    path = os.path.join(TRAINED_DIR, MODELS[name])
+    started = time.perf_counter()
+    if os.path.exists(path) and not random_init:
+        model, source = tf.keras.models.load_model(path), "trained"
+    else:
+        model, source = build_random(name), "random"
+    load_seconds = time.perf_counter() - started
+
+    rng = np.random.default_rng(0)
+    rows = []
+    for batch_size in batch_sizes:
+        batch = rng.random((batch_size, 256, 256, 3), dtype=np.float32)
+        model.predict_on_batch(batch)  # warm-up / tracing for this shape
+        timings = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            model.predict_on_batch(batch)
+            timings.append(time.perf_counter() - t)
+        timings = np.array(timings) * 1000.0
+        rows.append({
+            "model": name,
+            "source": source,
+            "intra_op_threads": intra,
+            "inter_op_threads": inter,
+            "batch_size": batch_size,
+            "p50_ms": round(float(np.percentile(timings, 50)), 3),
+            "p95_ms": round(float(np.percentile(timings, 95)), 3),
+            "ms_per_image": round(float(np.percentile(timings, 50)) / batch_size, 3),
+            "images_per_second": round(batch_size / (float(np.mean(timings)) / 1000.0), 2),
+            "params": model.count_params(),
+        })
+
+    for row in rows:
+        row["load_seconds"] = round(load_seconds, 3)
+        row["peak_rss_mb"] = peak_rss_mb()
+    return rows
+
+
+def dominates(a: dict, b: dict) -> bool:
+    """``a`` is at least as good as ``b`` on latency, throughput and RSS, and better on one"""
+    at_least = (a["p50_ms"] <= b["p50_ms"] and a["images_per_second"] >= b["images_per_second"]
+                and a["peak_rss_mb"] <= b["peak_rss_mb"])
+    better = (a["p50_ms"] < b["p50_ms"] or a["images_per_second"] > b["images_per_second"]
+              or a["peak_rss_mb"] < b["peak_rss_mb"])
+    return at_least and better
+
+
+def mark_pareto(rows: list):
+    """Flag rows that no other row dominates"""
+    for row in rows:
+        row["pareto"] = not any(dominates(other, row) for other in rows)
+
+
+def run_all(args) -> list:
+    rows = []
+    for name in args.models:
+        for threads in args.threads:
+            cmd = [
+                sys.executable, __file__, "--worker", "--models", name, "--threads", threads,
+                "--batch-sizes", *map(str, args.batch_sizes), "--repeat", str(args.repeat),
+            ]
+            if args.random_init:
+                cmd.append("--random-init")
+            print(f"{name:<14} threads {threads:<5} ...", flush=True)
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"  failed:\n{result.stderr[-2000:]}")
+                continue
+            rows.extend(json.loads(result.stdout.strip().splitlines()[-1]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model forward passes")
+    parser.add_argument("--models", nargs="+", choices=sorted(MODELS), default=sorted(MODELS))
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--threads", nargs="+", default=DEFAULT_THREADS, help="intra:inter op thread pairs")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--random-init", action="store_true", help="Ignore trained weights")
+    parser.add_argument("--output", default=os.path.join(TRAINED_DIR, "model_benchmark"))
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        intra, inter = (int(n) for n in args.threads[0].split(":"))
+        rows = run_worker(args.models[0], intra, inter, args.batch_sizes, args.repeat, args.random_init)
+        print(json.dumps(rows))
+        return
+
+    rows = run_all(args)
+    if not rows:
+        sys.exit("No results")
+    mark_pareto(rows)
+
+    with open(f"{args.output}.json", "w") as f:
+        json.dump(rows, f, indent=2)
+    with open(f"{args.output}.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print(f"\n{'model':<14} {'src':<7} {'threads':>7} {'batch':>5} {'p50':>10} {'img/s':>9} "
+          f"{'rss':>8} {'load':>7}  pareto")
+    for row in sorted(rows, key=lambda r: (r["model"], r["batch_size"], r["p50_ms"])):
+        print(f"{row['model']:<14} {row['source']:<7} {row['intra_op_threads']:>3}:{row['inter_op_threads']:<3} "
+              f"{row['batch_size']:>5} {row['p50_ms']:>8.2f}ms {row['images_per_second']:>9.1f} "
+              f"{row['peak_rss_mb']:>6.0f}MB {row['load_seconds']:>6.2f}s  {'*' if row['pareto'] else ''}")
+    print(f"\nResults written to {args.output}.csv and {args.output}.json")
+
+
+if __name__ == "__main__":
+    main()
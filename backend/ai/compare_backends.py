@@ -0,0 +1,124 @@
+"""Accuracy-parity and latency report: Keras vs. exported TFLite variants.
+
+Run from the ai directory after export_tflite.py:
+
+    python compare_backends.py --models ensemble --output trained/backend_report.json
+
+For every model the Keras original and each exported variant are scored on
+the Testing split. The report gives accuracy, top-1 agreement with Keras,
+the largest softmax difference, single-image latency and batch throughput.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from export_tflite import MODELS, QUANTIZATIONS, TRAINED_DIR, tflite_path
+from preprocessing import read_resize_mode
+from tflite_runner import TFLiteRunner
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def load_test_split(resize: str):
+    from data_loader import load_datasets
+
+    _, _, test_dataset = load_datasets(resize)
+    images, labels = [], []
+    for x, y in test_dataset:
+        images.append(x.numpy())
+        labels.append(np.argmax(y.numpy(), axis=-1))
+    return np.concatenate(images).astype(np.float32), np.concatenate(labels)
+
+
+def predict_all(predict_fn, images: np.ndarray, batch_size: int) -> np.ndarray:
+    return np.concatenate([
+        predict_fn(images[i:i + batch_size]) for i in range(0, len(images), batch_size)
+    ])
+
+
+def measure_latency(predict_fn, images: np.ndarray, batch_size: int, repeat: int) -> dict:
+    batch = images[:batch_size]
+    predict_fn(batch)  # warm-up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        predict_fn(batch)
+        timings.append(time.perf_counter() - started)
+    timings = np.array(timings) * 1000.0
+    return {
+        "batch_size": len(batch),
+        "p50_ms": round(float(np.percentile(timings, 50)), 3),
+        "p95_ms": round(float(np.percentile(timings, 95)), 3),
+        "images_per_second": round(len(batch) / (np.mean(timings) / 1000.0), 2),
+    }
+
+
+def evaluate(name: str, images: np.ndarray, labels: np.ndarray, batch_size: int, repeat: int) -> list:
+    keras_path = os.path.join(TRAINED_DIR, MODELS[name])
+    if not os.path.exists(keras_path):
+        print(f"Skipping {name}: {keras_path} not found")
+        return []
+
+    model = tf.keras.models.load_model(keras_path)
+    backends = [("keras", lambda batch: model.predict(batch, verbose=0))]
+    for quantization in QUANTIZATIONS:
+        path = tflite_path(keras_path, quantization)
+        if os.path.exists(path):
+            backends.append((f"tflite-{quantization}", TFLiteRunner(path).predict))
+
+    rows = []
+    reference = None
+    for backend, predict_fn in backends:
+        probs = softmax(predict_all(predict_fn, images, batch_size))
+        if reference is None:
+            reference = probs
+        rows.append({
+            "model": name,
+            "backend": backend,
+            "accuracy": round(float(np.mean(np.argmax(probs, axis=1) == labels)), 4),
+            "agreement_with_keras": round(float(np.mean(np.argmax(probs, axis=1) == np.argmax(reference, axis=1))), 4),
+            "max_prob_diff": round(float(np.max(np.abs(probs - reference))), 4),
+            "latency_single": measure_latency(predict_fn, images, 1, repeat),
+            "latency_batch": measure_latency(predict_fn, images, batch_size, max(1, repeat // 4)),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Keras and TFLite backends on the Testing split")
+    parser.add_argument("--models", nargs="+", choices=sorted(MODELS), default=["ensemble"])
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", default=os.path.join(TRAINED_DIR, "backend_report.json"))
+    args = parser.parse_args()
+
+    # Each model is scored on inputs resized the way it was trained
+    splits = {}
+    report = []
+    for name in args.models:
+        resize = read_resize_mode(os.path.join(TRAINED_DIR, MODELS[name]))
+        if resize not in splits:
+            splits[resize] = load_test_split(resize)
+        images, labels = splits[resize]
+        report.extend(evaluate(name, images, labels, args.batch_size, args.repeat))
+
+    print(f"{'model':<14} {'backend':<16} {'acc':>6} {'agree':>6} {'maxdiff':>8} {'p50 1img':>9} {'img/s batch':>11}")
+    for row in report:
+        print(f"{row['model']:<14} {row['backend']:<16} {row['accuracy']:>6.4f} {row['agreement_with_keras']:>6.4f} "
+              f"{row['max_prob_diff']:>8.4f} {row['latency_single']['p50_ms']:>8.2f}ms "
+              f"{row['latency_batch']['images_per_second']:>11.1f}")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""DICOM series -> 8-bit slice images for the MRI models.
+
+Indexing reads headers only (``stop_before_pixels``); pixel data is decoded
+later, one slice at a time, so a series never has to be in memory at once.
+Slices are windowed (window/level from the request, the file, or the
+0.5-99.5 percentile range) and rendered as grayscale PNG at native
+resolution, the same input a manual PNG export would give the models.
+"""
+import io
+
+import numpy as np
+import pydicom
+from pydicom.errors import InvalidDicomError
+from pydicom.pixels import apply_modality_lut
+from PIL import Image
+
+from ai.preprocessing import ImageDecodeError
+
+
+class DicomSlice:
+    """One frame of one DICOM file, in series order"""
+
+    def __init__(self, name: str, open_file, frame: int, sort_key: tuple, window: tuple):
+        self.name = name
+        self.open_file = open_file
+        self.frame = frame
+        self.sort_key = sort_key
+        self.window = window
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}#{self.frame}" if self.frame else self.name
+
+
+def first_value(value):
+    """Window tags may hold several values; the first is the default window"""
+    if value is None:
+        return None
+    if isinstance(value, pydicom.multival.MultiValue):
+        value = value[0]
+    return float(value)
+
+
+def index_series(sources: list) -> list:
+    """DicomSlice per frame of the image-bearing DICOM files among (name, open_file) sources.
+
+    Files that aren't DICOM, or carry no image (DICOMDIR, reports), are
+    skipped. Slices are ordered by series, instance number and position.
+    """
+    slices = []
+    for name, open_file in sources:
+        with open_file() as f:
+            try:
+                ds = pydicom.dcmread(f, stop_before_pixels=True)
+            except (InvalidDicomError, EOFError, OSError):
+                continue
+        if "Rows" not in ds or "Columns" not in ds:
+            continue
+
+        position = ds.get("ImagePositionPatient")
+        base_key = (
+            int(ds.get("SeriesNumber") or 0),
+            int(ds.get("InstanceNumber") or 0),
+            float(position[2]) if position else 0.0,
+            name,
+        )
+        window = (first_value(ds.get("WindowCenter")), first_value(ds.get("WindowWidth")))
+        for frame in range(int(ds.get("NumberOfFrames") or 1)):
+            slices.append(DicomSlice(name, open_file, frame, base_key + (frame,), window))
+
+    return sorted(slices, key=lambda s: s.sort_key)
+
+
+def window_level(pixels: np.ndarray, center: float = None, width: float = None) -> np.ndarray:
+    """Linear DICOM VOI window to uint8; without a window, the 0.5-99.5 percentile range"""
+    pixels = pixels.astype(np.float32)
+    if center is None or not width:
+        low, high = np.percentile(pixels, (0.5, 99.5))
+        center, width = (low + high) / 2.0, max(high - low, 1.0)
+    scaled = (pixels - (center - 0.5)) / max(width - 1.0, 1.0) + 0.5
+    return (np.clip(scaled, 0.0, 1.0) * 255.0 + 0.5).astype(np.uint8)
+
+
+def render_slices(slices: list, center: float = None, width: float = None) -> list:
+    """(label, PNG bytes) per slice; decodes each file's pixel data once"""
+    rendered = []
+    decoded = {}
+    for s in slices:
+        try:
+            if s.name not in decoded:
+                decoded.clear()  # frames of one file are adjacent, keep just the current one
+                with s.open_file() as f:
+                    ds = pydicom.dcmread(f)
+                    decoded[s.name] = (ds, ds.pixel_array)
+            ds, pixels = decoded[s.name]
+            if int(ds.get("NumberOfFrames") or 1) > 1:
+                pixels = pixels[s.frame]
+
+            if int(ds.get("SamplesPerPixel") or 1) == 3:
+                img = Image.fromarray(pixels.astype(np.uint8), "RGB")
+            else:
+                pixels = apply_modality_lut(pixels, ds)
+                window = (center, width) if width else s.window
+                img = Image.fromarray(window_level(pixels, *window), "L")
+                if ds.get("PhotometricInterpretation") == "MONOCHROME1":
+                    img = Image.eval(img, lambda v: 255 - v)
+        except Exception as e:
+            raise ImageDecodeError(f"Could not decode DICOM slice: {s.label}") from e
+
+        buf = io.BytesIO()
+        img.save(buf, "PNG", compress_level=1)
+        rendered.append((f"{s.label}.png", buf.getvalue()))
+    return rendered
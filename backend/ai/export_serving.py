@@ -0,0 +1,160 @@
+"""Serving export: strip training-only layers, fold BatchNorm, fix the signature.
+
+Run from the ai directory after training:
+
+    python export_serving.py                     # trained/MRI_ENSEMBLED.serving
+    python export_serving.py --models ensemble cnn
+
+The exported SavedModel contains:
+  * no RandomRotation / RandomZoom / RandomContrast / Dropout layers (they are
+    identities at inference time but still cost a call each),
+  * BatchNormalization folded into the preceding Conv2D/Dense wherever the
+    convolution is linear and feeds only that BatchNormalization,
+  * a single ``serve`` function traced for float32 (None, 256, 256, 3) input
+    that the API calls directly instead of going through ``Model.predict``.
+"""
+import argparse
+import os
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers
+from tensorflow.keras.models import Model, clone_model
+
+from export_tflite import MODELS, TRAINED_DIR
+
+TRAINING_ONLY_LAYERS = (
+    layers.RandomRotation,
+    layers.RandomZoom,
+    layers.RandomContrast,
+    layers.RandomFlip,
+    layers.RandomTranslation,
+    layers.Dropout,
+    layers.GaussianNoise,
+    layers.GaussianDropout,
+)
+
+
+def serving_path(keras_path: str) -> str:
+    """trained/MRI_ENSEMBLED.keras -> trained/MRI_ENSEMBLED.serving"""
+    return f"{os.path.splitext(keras_path)[0]}.serving"
+
+
+def iter_layers(model):
+    """All layers of ``model``, descending into nested models"""
+    for layer in model.layers:
+        yield layer
+        if isinstance(layer, Model):
+            yield from iter_layers(layer)
+
+
+def find_foldable_pairs(model) -> dict:
+    """Map BatchNormalization -> the linear Conv2D/Dense that solely feeds it"""
+    pairs = {}
+    for bn in iter_layers(model):
+        if not isinstance(bn, layers.BatchNormalization) or len(bn._inbound_nodes) != 1:
+            continue
+        if bn.axis not in (-1, 3) or bn.axis == 3 and len(bn.input.shape) != 4:
+            continue
+        parents = bn._inbound_nodes[0].parent_nodes
+        if len(parents) != 1:
+            continue
+        producer = parents[0].operation
+        if not isinstance(producer, (layers.Conv2D, layers.Dense)):
+            continue
+        if producer.get_config()["activation"] != "linear":
+            continue
+        if len(producer._inbound_nodes) != 1 or len(producer._outbound_nodes) != 1:
+            continue
+        pairs[bn] = producer
+    return pairs
+
+
+def fold_weights(producer, bn) -> list:
+    """Kernel and bias of ``producer`` with ``bn`` applied to its output"""
+    kernel = producer.kernel.numpy()
+    bias = producer.bias.numpy() if producer.use_bias else np.zeros(kernel.shape[-1], kernel.dtype)
+
+    gamma = bn.gamma.numpy() if bn.scale else np.ones_like(bias)
+    beta = bn.beta.numpy() if bn.center else np.zeros_like(bias)
+    scale = gamma / np.sqrt(bn.moving_variance.numpy() + bn.epsilon)
+
+    return [kernel * scale, (bias - bn.moving_mean.numpy()) * scale + beta]
+
+
+def build_serving_model(model):
+    """Clone ``model`` without training-only layers and with BatchNorm folded"""
+    pairs = find_foldable_pairs(model)
+    folded_producers = {id(producer): bn for bn, producer in pairs.items()}
+    folded_bns = {id(bn) for bn in pairs}
+    stripped = []
+
+    def clone_layer(layer):
+        if isinstance(layer, TRAINING_ONLY_LAYERS):
+            stripped.append(layer.name)
+            return layers.Identity(name=layer.name)
+        if id(layer) in folded_bns:
+            return layers.Identity(name=layer.name)
+        config = layer.get_config()
+        if id(layer) in folded_producers:
+            config["use_bias"] = True
+        return layer.__class__.from_config(config)
+
+    def call_layer(layer, *args, **kwargs):
+        # Removed layers are bypassed entirely rather than kept as no-ops
+        if isinstance(layer, layers.Identity):
+            return args[0]
+        return layer(*args, **kwargs)
+
+    serving = clone_model(model, clone_function=clone_layer, call_function=call_layer, recursive=True)
+    copy_weights(model, serving, folded_producers)
+    return serving, len(stripped), len(pairs)
+
+
+def copy_weights(source, target, folded_producers: dict):
+    kept = {layer.name: layer for layer in target.layers}
+    for layer in source.layers:
+        cloned = kept.get(layer.name)
+        if cloned is None:
+            continue  # stripped or folded away
+        if isinstance(layer, Model):
+            copy_weights(layer, cloned, folded_producers)
+        elif id(layer) in folded_producers:
+            cloned.set_weights(fold_weights(layer, folded_producers[id(layer)]))
+        elif layer.weights:
+            cloned.set_weights(layer.get_weights())
+
+
+def export(name: str, check_samples: int = 8):
+    keras_path = os.path.join(TRAINED_DIR, MODELS[name])
+    if not os.path.exists(keras_path):
+        print(f"Skipping {name}: {keras_path} not found")
+        return None
+
+    model = tf.keras.models.load_model(keras_path)
+    serving, stripped, folded = build_serving_model(model)
+
+    # The stripped graph must compute the same logits as inference-mode Keras
+    sample = np.random.default_rng(0).random((check_samples, 256, 256, 3), dtype=np.float32)
+    max_diff = float(np.max(np.abs(model(sample, training=False) - serving(sample, training=False))))
+
+    out_path = serving_path(keras_path)
+    serving.export(out_path, format="tf_saved_model", input_signature=[
+        tf.TensorSpec((None, 256, 256, 3), tf.float32, name="image")
+    ])
+    print(f"{name:<14} -> {out_path}: stripped {stripped} training-only layers, folded {folded} BatchNorms, "
+          f"max logit diff {max_diff:.2e}")
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export serving-optimized SavedModels")
+    parser.add_argument("--models", nargs="+", choices=sorted(MODELS), default=["ensemble"])
+    args = parser.parse_args()
+
+    for name in args.models:
+        export(name)
+
+
+if __name__ == "__main__":
+    main()
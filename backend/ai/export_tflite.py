@@ -0,0 +1,101 @@
+"""Export trained Keras models to TensorFlow Lite for CPU serving.
+
+Run from the ai directory after training:
+
+    python export_tflite.py                      # ensemble, float16 + int8
+    python export_tflite.py --models ensemble cnn --quantization int8
+
+Every variant keeps float32 inputs/outputs, so the serving code can feed the
+same normalized (N, 256, 256, 3) batches it feeds the Keras model. int8
+post-training quantization is calibrated on a sample of the Training split
+loaded through data_loader.py.
+"""
+import argparse
+import os
+
+import tensorflow as tf
+
+from preprocessing import TRAINING_RESIZE_MODE, read_resize_mode
+
+TRAINED_DIR = "trained"
+
+MODELS = {
+    "ensemble": "MRI_ENSEMBLED.keras",
+    "vgg16": "MRI_VGG16_Tuned.keras",
+    "resnet50v2": "MRI_ResNet50V2_Tuned.keras",
+    "cnn": "MRI_CNN.keras",
+    "cnn_binarized": "MRI_CNN_Binarized.keras",
+}
+
+QUANTIZATIONS = ("float32", "float16", "int8")
+
+
+def tflite_path(keras_path: str, quantization: str) -> str:
+    """trained/MRI_ENSEMBLED.keras -> trained/MRI_ENSEMBLED.int8.tflite"""
+    return f"{os.path.splitext(keras_path)[0]}.{quantization}.tflite"
+
+
+def representative_dataset(num_samples: int, resize: str):
+    """Calibration generator over a sample of the Training split, resized like the model's inputs"""
+    from data_loader import load_datasets
+
+    train_dataset, _, _ = load_datasets(resize)
+
+    def generator():
+        yielded = 0
+        for images, _ in train_dataset:
+            for img in images:
+                yield [tf.expand_dims(tf.cast(img, tf.float32), 0)]
+                yielded += 1
+                if yielded >= num_samples:
+                    return
+
+    return generator
+
+
+def convert(model, quantization: str, calibration_samples: int = 200, resize: str = TRAINING_RESIZE_MODE) -> bytes:
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+
+    if quantization == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        # Int8 weights and activations with float32 I/O; ops without an int8
+        # kernel fall back to float
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset(calibration_samples, resize)
+
+    return converter.convert()
+
+
+def export(name: str, quantizations, calibration_samples: int = 200) -> list:
+    keras_path = os.path.join(TRAINED_DIR, MODELS[name])
+    if not os.path.exists(keras_path):
+        print(f"Skipping {name}: {keras_path} not found")
+        return []
+
+    model = tf.keras.models.load_model(keras_path)
+    written = []
+    for quantization in quantizations:
+        out_path = tflite_path(keras_path, quantization)
+        with open(out_path, "wb") as f:
+            f.write(convert(model, quantization, calibration_samples, read_resize_mode(keras_path)))
+        size_mb = os.path.getsize(out_path) / 2**20
+        print(f"{name:<14} {quantization:<8} -> {out_path} ({size_mb:.1f} MB)")
+        written.append(out_path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export trained models to TFLite")
+    parser.add_argument("--models", nargs="+", choices=sorted(MODELS), default=["ensemble"])
+    parser.add_argument("--quantization", nargs="+", choices=QUANTIZATIONS, default=["float16", "int8"])
+    parser.add_argument("--calibration-samples", type=int, default=200)
+    args = parser.parse_args()
+
+    for name in args.models:
+        export(name, args.quantization, args.calibration_samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Grad-CAM class-activation heatmaps for the trained Keras models.
+
+For the ensemble the target is the Concatenate layer that joins the VGG16,
+ResNet50V2 and CNN feature maps, so one heatmap covers all three branches.
+Other models use their last 4-D (spatial) layer.
+"""
+import io
+
+import numpy as np
+import tensorflow as tf
+from PIL import Image
+
+
+def find_target_layer(model):
+    """The Concatenate layer if there is one, else the last layer with a spatial output"""
+    spatial = [layer for layer in model.layers if len(layer.output.shape) == 4]
+    for layer in reversed(spatial):
+        if isinstance(layer, tf.keras.layers.Concatenate):
+            return layer
+    if not spatial:
+        raise ValueError(f"Model {model.name} has no spatial layer for Grad-CAM")
+    return spatial[-1]
+
+
+class GradCAM:
+    """Gradient-weighted class activation maps over one target layer"""
+
+    def __init__(self, model, layer_name: str = None):
+        layer = model.get_layer(layer_name) if layer_name else find_target_layer(model)
+        self.layer_name = layer.name
+        self.grad_model = tf.keras.Model(model.inputs, [layer.output, model.output])
+
+    def heatmap(self, img_array: np.ndarray, class_index: int = None) -> np.ndarray:
+        """(H, W) float32 heatmap in [0, 1] for ``class_index`` (default: predicted class)"""
+        x = tf.convert_to_tensor(img_array[None], dtype=tf.float32)
+        with tf.GradientTape() as tape:
+            features, logits = self.grad_model(x, training=False)
+            if class_index is None:
+                class_index = int(tf.argmax(logits[0]))
+            score = logits[:, class_index]
+
+        grads = tape.gradient(score, features)
+        weights = tf.reduce_mean(grads, axis=(1, 2))
+        cam = tf.nn.relu(tf.reduce_sum(features * weights[:, None, None, :], axis=-1))[0]
+        cam = cam / (tf.reduce_max(cam) + 1e-8)
+
+        cam = tf.image.resize(cam[..., None], img_array.shape[:2], method="bilinear")
+        return cam[..., 0].numpy().astype(np.float32)
+
+
+def jet(values: np.ndarray) -> np.ndarray:
+    """Map [0, 1] values to RGB with the jet colormap"""
+    x = values[..., None] * 4.0
+    return np.clip(1.5 - np.abs(x - np.array([3.0, 2.0, 1.0], dtype=np.float32)), 0.0, 1.0)
+
+
+def overlay_png(img_array: np.ndarray, heatmap: np.ndarray, alpha: float = 0.4) -> bytes:
+    """Blend the heatmap over the normalized image and encode it as PNG"""
+    blended = (1.0 - alpha) * img_array + alpha * jet(heatmap)
+    img = Image.fromarray(np.uint8(np.clip(blended, 0.0, 1.0) * 255.0))
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
@@ -9,7 +9,7 @@ from tensorflow.keras.layers import *
 from tensorflow.keras.losses import *
 from tensorflow.keras.models import *
 from tensorflow.keras.optimizers import *
-from tensorflow.keras.preprocessing import image_dataset_from_directory
+from preprocessing import image_dataset
 from tensorflow.keras.regularizers import *
 import os
 
@@ -18,52 +18,34 @@ categories = os.listdir(main_dataset_dir + "Training")
 main_dataset_labels = np.array(categories)
 
 
-train_dataset = image_dataset_from_directory(
+train_dataset = image_dataset(
     directory = main_dataset_dir + "Training",
-    labels = "inferred",
-    label_mode = "categorical",
     class_names = list(main_dataset_labels),
-    color_mode = "rgb",
     batch_size = 32,
     image_size = (256, 256),
     shuffle = True,
-    pad_to_aspect_ratio = True,
     validation_split = 0.2,
     subset = "training",
     seed = 74,
-).map(
-    lambda x, y: (x / 255., y)
 )
 
-validation_dataset = image_dataset_from_directory(
+validation_dataset = image_dataset(
     directory = main_dataset_dir + "Training",
-    labels = "inferred",
-    label_mode = "categorical",
     class_names = list(main_dataset_labels),
-    color_mode = "rgb",
     batch_size = 32,
     image_size = (256, 256),
     shuffle = True,
-    pad_to_aspect_ratio = True,
     validation_split = 0.2,
     subset = "validation",
     seed = 74,
-).map(
-    lambda x, y: (x / 255., y)
 )
 
-test_dataset = image_dataset_from_directory(
+test_dataset = image_dataset(
     directory = main_dataset_dir + "Testing",
-    labels = "inferred",
-    label_mode = "categorical",
     class_names = list(main_dataset_labels),
-    color_mode = "rgb",
     image_size = (256, 256),
     batch_size = 32,
     shuffle = True,
-    pad_to_aspect_ratio = True    
-).map(
-    lambda x, y: (x / 255., y)
 )
 
 
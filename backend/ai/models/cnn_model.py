@@ -1,10 +1,17 @@
+import tensorflow as tf
 from tensorflow.keras.layers import *
 from tensorflow.keras.models import Model
-from augmentations import augment_input
+from augmentation import augment_input
 
-def build_cnn_model():
+def binarization(img):
+    return tf.where(img > tf.reduce_mean(img) * 1.5, 1., 0.)
+
+
+def build_cnn_model(binarize=False):
     inp = Input((256, 256, 3))
     x = augment_input(inp)
+    if binarize:
+        x = Lambda(binarization)(x)
 
     # Example CNN
     for filters in [32, 64, 128, 256, 512]:
@@ -1,6 +1,6 @@
 from tensorflow.keras.layers import *
 from tensorflow.keras.models import Model
-from augmentations import augment_input
+from augmentation import augment_input
 
 def build_ensemble(base1, base2, base3):
     inp = Input((256, 256, 3))
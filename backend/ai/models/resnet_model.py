@@ -1,10 +1,10 @@
 from tensorflow.keras.applications import ResNet50V2
 from tensorflow.keras.layers import *
 from tensorflow.keras.models import Model
-from augmentations import augment_input
+from augmentation import augment_input
 
-def build_resnet_model():
-    base = ResNet50V2(weights="imagenet", include_top=False, input_shape=(256, 256, 3))
+def build_resnet_model(weights="imagenet"):
+    base = ResNet50V2(weights=weights, include_top=False, input_shape=(256, 256, 3))
     base.trainable = False
 
     inp = Input((256, 256, 3))
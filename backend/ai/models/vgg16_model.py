@@ -1,10 +1,10 @@
 from tensorflow.keras.applications import VGG16
 from tensorflow.keras.layers import Input, Flatten, Dense, BatchNormalization
 from tensorflow.keras.models import Model
-from augmentations import augment_input
+from augmentation import augment_input
 
-def build_vgg16_model():
-    base = VGG16(weights="imagenet", include_top=False, input_shape=(256, 256, 3))
+def build_vgg16_model(weights="imagenet"):
+    base = VGG16(weights=weights, include_top=False, input_shape=(256, 256, 3))
     base.trainable = False
 
     inp = Input((256, 256, 3))
@@ -0,0 +1,140 @@
+"""NIfTI volumes -> 8-bit axial slice images for the MRI models.
+
+Volumes are never loaded whole: uncompressed ``.nii`` data is memory-mapped
+and ``.nii.gz`` is decompressed as a stream, so only the slice being looked
+at is in memory. Slices are taken along the third voxel axis (axial for
+axially acquired volumes) and rotated so anterior is up, as the training
+images are.
+
+A first pass reads a strided sample of every slice to find the volume's
+intensity range and which slices are background; only the informative ones
+are then extracted and rendered as grayscale PNG.
+"""
+import gzip
+import io
+
+import numpy as np
+from nibabel.nifti1 import Nifti1Header
+from nibabel.nifti2 import Nifti2Header
+from nibabel.orientations import aff2axcodes
+from PIL import Image
+
+from ai.dicom import window_level
+
+GZIP_MAGIC = b"\x1f\x8b"
+# Every STATS_STRIDE-th voxel along each in-plane axis feeds the pre-filter
+STATS_STRIDE = 4
+
+
+class NiftiVolume:
+    """Header of a single-file NIfTI-1/2 volume and on-demand access to its axial slices"""
+
+    def __init__(self, open_file):
+        # open_file() returns a context manager yielding the raw file, rewound
+        self.open_file = open_file
+        with open_file() as f:
+            head = f.read(540)
+        self.compressed = head[:2] == GZIP_MAGIC
+        if self.compressed:
+            with open_file() as f:
+                head = gzip.GzipFile(fileobj=f, mode="rb").read(540)
+
+        # Single-file magic: NIfTI-1 at the end of its 348-byte header, NIfTI-2 right after sizeof_hdr
+        if head[344:348] == b"n+1\0":
+            header_class = Nifti1Header
+        elif head[4:8] == b"n+2\0":
+            header_class = Nifti2Header
+        else:
+            raise ValueError("Not a single-file NIfTI volume (.nii / .nii.gz)")
+        try:
+            self.header = header_class.from_fileobj(io.BytesIO(head), check=False)
+        except Exception as e:
+            raise ValueError(f"Not a NIfTI volume: {e}") from e
+
+        try:
+            self.dtype = self.header.get_data_dtype()
+        except Exception as e:
+            raise ValueError(f"Unsupported NIfTI data type: {e}") from e
+        if self.dtype.kind not in "biuf":
+            raise ValueError(f"Unsupported NIfTI data type: {self.dtype}")
+        shape = tuple(int(n) for n in self.header.get_data_shape()) + (1, 1)
+        self.shape = shape[:3]  # further dimensions (time, echoes) are ignored: first volume only
+        self.offset = int(self.header.get_data_offset())
+        self.slope, self.inter = self.header.get_slope_inter()
+        self.orientation = "".join(aff2axcodes(self.header.get_best_affine()))
+
+    @property
+    def slice_count(self) -> int:
+        return self.shape[2]
+
+    def scale(self, raw: np.ndarray) -> np.ndarray:
+        pixels = raw.astype(np.float32)
+        if self.slope is not None:
+            pixels = pixels * self.slope + self.inter
+        return np.nan_to_num(pixels, copy=False)
+
+    def iter_slices(self, indices=None, stride: int = 1):
+        """Yield (index, float32 slice) for ``indices`` (default all), in volume order"""
+        wanted = sorted(set(range(self.slice_count) if indices is None else indices))
+        if not wanted:
+            return
+        nx, ny, _ = self.shape
+        slice_bytes = nx * ny * self.dtype.itemsize
+
+        with self.open_file() as f:
+            if self.compressed:
+                # Decompress sequentially, skipping unwanted slices without keeping them
+                stream = gzip.GzipFile(fileobj=f, mode="rb")
+                stream.seek(self.offset)
+                position = 0
+                for z in wanted:
+                    if z > position:
+                        stream.seek((z - position) * slice_bytes, io.SEEK_CUR)
+                    data = stream.read(slice_bytes)
+                    if len(data) < slice_bytes:
+                        raise ValueError(f"Truncated NIfTI volume at slice {z}")
+                    position = z + 1
+                    raw = np.frombuffer(data, self.dtype).reshape((nx, ny), order="F")
+                    yield z, self.scale(raw[::stride, ::stride])
+            else:
+                f.fileno()  # spooled uploads roll over to a real file so they can be mapped
+                data = np.memmap(f, dtype=self.dtype, mode="r", offset=self.offset, shape=self.shape, order="F")
+                for z in wanted:
+                    yield z, self.scale(data[::stride, ::stride, z])
+
+    def render(self, pixels: np.ndarray, window: tuple) -> bytes:
+        """PNG of one slice, anterior up, windowed to ``window`` (low, high)"""
+        low, high = window
+        img = Image.fromarray(window_level(np.rot90(pixels), (low + high) / 2.0, max(high - low, 1.0)), "L")
+        buf = io.BytesIO()
+        img.save(buf, "PNG", compress_level=1)
+        return buf.getvalue()
+
+
+def scan_volume(volume: NiftiVolume, min_foreground: float, background_level: float):
+    """(informative slice indices, volume window) from a strided sample of every slice.
+
+    The window is the volume's 0.5-99.5 percentile range. A slice is
+    informative when at least ``min_foreground`` of its voxels are brighter
+    than ``background_level`` of the way up that range.
+    """
+    samples = [sample for _, sample in volume.iter_slices(stride=STATS_STRIDE)]
+    low, high = (float(v) for v in np.percentile(np.concatenate([s.ravel() for s in samples]), (0.5, 99.5)))
+    threshold = low + background_level * (high - low)
+    informative = [
+        z for z, sample in enumerate(samples)
+        if high > low and np.mean(sample > threshold) >= min_foreground
+    ]
+    return informative, (low, high)
+
+
+def iter_rendered(volume: NiftiVolume, indices: list, window: tuple, batch_size: int):
+    """Lists of up to ``batch_size`` (index, PNG bytes), extracting slices as they are needed"""
+    batch = []
+    for z, pixels in volume.iter_slices(indices):
+        batch.append((z, volume.render(pixels, window)))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
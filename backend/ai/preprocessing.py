@@ -0,0 +1,168 @@
+"""Image decoding and preprocessing shared by serving and the training loaders.
+
+Serving and the training datasets (``image_dataset``) both go through
+``decode_image``, so a file gives the model the same tensor whether it is
+being trained on or analyzed:
+
+- JPEGs are decoded at reduced size (libjpeg DCT scaling by 1/2, 1/4 or 1/8)
+  when that still covers the target, so a 2048px upload is never decoded
+  at full resolution
+- bilinear resize, either straight to the target ("stretch", like
+  image_dataset_from_directory's default) or to fit it with the aspect ratio
+  kept and zero padding on the short side ("pad", like
+  ``pad_to_aspect_ratio=True``)
+- RGB, float32, scaled to [0, 1]
+
+Which resize a model needs is part of the model: training writes it to a
+``<model>.preprocessing.json`` file next to the .keras artifact, and serving
+reads it from there. The train_*.py scripts stretched before they used this
+module, so artifacts without that file get "stretch". To serve padded
+inputs, retrain everything with ``python run_all.py --force`` from ai/
+(without --force it skips models whose weights exist) and restart serving.
+"""
+import io
+import json
+import os
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+IMG_SIZE = (256, 256)
+# Files image_dataset_from_directory picks up
+DATASET_EXTENSIONS = (".bmp", ".gif", ".jpeg", ".jpg", ".png")
+
+RESIZE_MODES = ("pad", "stretch")
+# What training uses now, and what artifacts without a preprocessing file were trained with
+TRAINING_RESIZE_MODE = "pad"
+LEGACY_RESIZE_MODE = "stretch"
+
+
+class ImageDecodeError(ValueError):
+    """Raised when uploaded bytes cannot be decoded as an image"""
+
+
+def preprocessing_path(model_path: str) -> str:
+    """trained/MRI_ENSEMBLED.keras -> trained/MRI_ENSEMBLED.preprocessing.json"""
+    return f"{os.path.splitext(model_path)[0]}.preprocessing.json"
+
+
+def write_preprocessing(model_path: str, resize: str = TRAINING_RESIZE_MODE):
+    """Record next to a trained model how its inputs were resized"""
+    with open(preprocessing_path(model_path), "w") as f:
+        json.dump({"resize": resize, "image_size": list(IMG_SIZE)}, f)
+
+
+def read_resize_mode(model_path: str) -> str:
+    """Resize mode a model was trained with; LEGACY_RESIZE_MODE if it predates the record"""
+    try:
+        with open(preprocessing_path(model_path)) as f:
+            resize = json.load(f)["resize"]
+    except FileNotFoundError:
+        return LEGACY_RESIZE_MODE
+    if resize not in RESIZE_MODES:
+        raise ValueError(f"Unknown resize mode {resize!r} in {preprocessing_path(model_path)}")
+    return resize
+
+
+def decode_image(data: bytes, target_size=IMG_SIZE, resize: str = TRAINING_RESIZE_MODE) -> np.ndarray:
+    """Decode JPEG/PNG/WebP bytes in memory into a normalized (H, W, 3) array"""
+    return preprocess_image(open_image(data, target_size, resize), target_size, resize)
+
+
+def fit_size(size: tuple, target_size=IMG_SIZE) -> tuple:
+    """(width, height) of an image of ``size`` scaled to fit ``target_size`` (height, width)"""
+    width, height = size
+    ratio = max(width / target_size[1], height / target_size[0])
+    return max(1, int(width / ratio)), max(1, int(height / ratio))
+
+
+def resized_size(size: tuple, target_size=IMG_SIZE, resize: str = TRAINING_RESIZE_MODE) -> tuple:
+    """(width, height) the image is resized to before any padding"""
+    if resize == "stretch":
+        return target_size[1], target_size[0]
+    return fit_size(size, target_size)
+
+
+def open_image(data: bytes, target_size=None, resize: str = TRAINING_RESIZE_MODE) -> Image.Image:
+    """Decode image bytes in memory into a PIL image, JPEGs at reduced size if ``target_size`` is given"""
+    try:
+        img = Image.open(io.BytesIO(data))
+        if target_size is not None:
+            # Only JPEG implements draft: it picks the smallest scale still covering the resized size
+            img.draft(None, resized_size(img.size, target_size, resize))
+        img.load()
+    except (UnidentifiedImageError, OSError) as e:
+        raise ImageDecodeError("Could not decode image") from e
+    return img
+
+
+def preprocess_image(img: Image.Image, target_size=IMG_SIZE, resize: str = TRAINING_RESIZE_MODE) -> np.ndarray:
+    """RGB conversion, bilinear resize (zero-padded to the target in "pad" mode) and /255 scaling"""
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    width_height = (target_size[1], target_size[0])
+    fitted = resized_size(img.size, target_size, resize)
+    if img.size != fitted:
+        img = img.resize(fitted, Image.BILINEAR)
+    if fitted != width_height:
+        padded = Image.new("RGB", width_height)
+        padded.paste(img, ((width_height[0] - fitted[0]) // 2, (width_height[1] - fitted[1]) // 2))
+        img = padded
+
+    img_array = np.asarray(img, dtype=np.float32)
+    return img_array / 255.0
+
+
+def index_images(directory, class_names, shuffle=True, seed=None, validation_split=None, subset=None):
+    """(paths, labels) of a class-per-subdirectory dataset, split like image_dataset_from_directory"""
+    paths, labels = [], []
+    for label, class_name in enumerate(class_names):
+        for root, _, files in sorted(os.walk(os.path.join(directory, class_name))):
+            for filename in sorted(files):
+                if filename.lower().endswith(DATASET_EXTENSIONS):
+                    paths.append(os.path.join(root, filename))
+                    labels.append(label)
+
+    if shuffle:
+        if seed is None:
+            # Drawn once and reused below, so the dataset's file order and shuffle agree
+            seed = int(np.random.default_rng().integers(1_000_000))
+        np.random.RandomState(seed).shuffle(paths)
+        np.random.RandomState(seed).shuffle(labels)
+
+    if validation_split:
+        num_val_samples = int(validation_split * len(paths))
+        if subset == "training":
+            paths, labels = paths[:-num_val_samples], labels[:-num_val_samples]
+        elif subset == "validation":
+            paths, labels = paths[-num_val_samples:], labels[-num_val_samples:]
+    return paths, labels
+
+
+def image_dataset(directory, class_names, image_size=IMG_SIZE, batch_size=32, shuffle=True,
+                  validation_split=None, subset=None, seed=None, resize=TRAINING_RESIZE_MODE):
+    """image_dataset_from_directory(label_mode="categorical") decoding through ``decode_image``.
+
+    Same files, order and validation split for a given seed; images come out
+    already scaled to [0, 1]. ``resize="pad"`` corresponds to
+    ``pad_to_aspect_ratio=True``, "stretch" to the default.
+    """
+    import tensorflow as tf
+
+    paths, labels = index_images(directory, class_names, shuffle, seed, validation_split, subset)
+
+    def load(path):
+        with open(path.decode(), "rb") as f:
+            return decode_image(f.read(), image_size, resize)
+
+    def load_example(path, label):
+        img = tf.numpy_function(load, [path], tf.float32)
+        img.set_shape(image_size + (3,))
+        return img, tf.one_hot(label, len(class_names))
+
+    dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+    if shuffle:
+        dataset = dataset.shuffle(buffer_size=batch_size * 8, seed=seed)
+    dataset = dataset.map(load_example, num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
@@ -1,13 +1,35 @@
+"""Train every model the ensemble needs, skipping those already trained.
+
+Run from the ai directory:
+
+    python run_all.py            # only models whose weights are missing
+    python run_all.py --force    # retrain everything, e.g. after a preprocessing change
+
+Each script writes trained/<model>.keras and a <model>.preprocessing.json
+recording how its inputs were resized; serving reads the latter, so restart
+the API/inference server afterwards (and re-run export_serving.py or
+export_tflite.py if those backends are used).
+"""
+import argparse
 import os
+import sys
+
+# (script, weights it writes), in dependency order: the ensemble loads the three base models
+STEPS = [
+    ("train_vgg16.py", "trained/MRI_VGG16_Tuned_Base.weights.h5"),
+    ("train_resnet50v2.py", "trained/MRI_ResNet50V2_Tuned_Base.weights.h5"),
+    ("train_cnn.py", "trained/MRI_CNN_Base.weights.h5"),
+    ("train_cnn_binarized.py", "trained/MRI_CNN_Binarized_Base.weights.h5"),
+    ("train_ensemble.py", "trained/MRI_ENSEMBLED.weights.h5"),
+]
 
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--force", action="store_true", help="Retrain even if the weights already exist")
+args = parser.parse_args()
 
-if not os.path.exists("trained/MRI_VGG16_Tuned_Base.weights.h5"):
-    os.system("python train_vgg16.py")
-if not os.path.exists("trained/MRI_ResNet50V2_Tuned_Base.weights.h5"):
-    os.system("python train_resnet50v2.py")
-if not os.path.exists("trained/MRI_CNN_Base.weights.h5"):
-    os.system("python train_cnn.py")
-if not os.path.exists("trained/MRI_CNN_Binarized_Base.weights.h5"):
-    os.system("python train_cnn_binarized.py")
-if not os.path.exists("trained/MRI_ENSEMBLED.weights.h5"):
-    os.system("python train_ensemble.py")
+for script, weights in STEPS:
+    if os.path.exists(weights) and not args.force:
+        print(f"Skipping {script}: {weights} exists (use --force to retrain)")
+        continue
+    if os.system(f"{sys.executable} {script}") != 0:
+        raise SystemExit(f"{script} failed")
@@ -0,0 +1,82 @@
+"""Offline threshold sweep for cascade inference (CNN first, ensemble on demand).
+
+Run from the ai directory:
+
+    python sweep_cascade.py --thresholds 0.5 0.6 0.7 0.8 0.9 0.95 0.99
+
+Both models score the whole Testing split once; each threshold is then
+simulated: images whose CNN top probability is below it are answered by the
+ensemble instead. Average latency per image is estimated from measured
+single-image forward passes as t_cnn + escalation_rate * t_ensemble.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from compare_backends import load_test_split, predict_all, softmax
+
+CNN_PATH = "trained/MRI_CNN.keras"
+ENSEMBLE_PATH = "trained/MRI_ENSEMBLED.keras"
+
+
+def single_image_latency_ms(model, images: np.ndarray, repeat: int) -> float:
+    model(images[:1], training=False)  # warm-up
+    started = time.perf_counter()
+    for i in range(repeat):
+        model(images[i % len(images)][None], training=False)
+    return (time.perf_counter() - started) / repeat * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep the cascade confidence threshold on the Testing split")
+    parser.add_argument("--thresholds", nargs="+", type=float,
+                        default=[0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.98, 0.99])
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", default=os.path.join("trained", "cascade_sweep.json"))
+    args = parser.parse_args()
+
+    images, labels = load_test_split()
+    cnn = tf.keras.models.load_model(CNN_PATH)
+    ensemble = tf.keras.models.load_model(ENSEMBLE_PATH)
+
+    cnn_probs = softmax(predict_all(lambda x: cnn.predict(x, verbose=0), images, args.batch_size))
+    ensemble_probs = softmax(predict_all(lambda x: ensemble.predict(x, verbose=0), images, args.batch_size))
+    cnn_ms = single_image_latency_ms(cnn, images, args.repeat)
+    ensemble_ms = single_image_latency_ms(ensemble, images, args.repeat)
+
+    confidence = cnn_probs.max(axis=1)
+    rows = [{
+        "threshold": None,
+        "escalation_rate": 1.0,
+        "accuracy": round(float(np.mean(ensemble_probs.argmax(axis=1) == labels)), 4),
+        "avg_latency_ms": round(ensemble_ms, 3),
+    }]
+    for threshold in sorted(args.thresholds):
+        escalate = confidence < threshold
+        probs = np.where(escalate[:, None], ensemble_probs, cnn_probs)
+        rate = float(np.mean(escalate))
+        rows.append({
+            "threshold": threshold,
+            "escalation_rate": round(rate, 4),
+            "accuracy": round(float(np.mean(probs.argmax(axis=1) == labels)), 4),
+            "avg_latency_ms": round(cnn_ms + rate * ensemble_ms, 3),
+        })
+
+    print(f"CNN {cnn_ms:.2f} ms/image, ensemble {ensemble_ms:.2f} ms/image\n")
+    print(f"{'threshold':>10} {'escalated':>10} {'accuracy':>9} {'avg ms':>8}")
+    for row in rows:
+        label = "ensemble" if row["threshold"] is None else f"{row['threshold']:.2f}"
+        print(f"{label:>10} {row['escalation_rate']:>10.2%} {row['accuracy']:>9.4f} {row['avg_latency_ms']:>8.2f}")
+
+    with open(args.output, "w") as f:
+        json.dump({"cnn_ms": cnn_ms, "ensemble_ms": ensemble_ms, "rows": rows}, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import threading
+
+import numpy as np
+
+try:
+    from ai_edge_litert.interpreter import Interpreter
+except ImportError:
+    import tensorflow as tf
+
+    Interpreter = tf.lite.Interpreter
+
+
+class TFLiteRunner:
+    """Thread-safe batch inference on an exported .tflite model.
+
+    The interpreter is resized to the incoming batch size on demand, so it
+    accepts the same (N, 256, 256, 3) float32 batches as the Keras model.
+    """
+
+    def __init__(self, path: str, num_threads: int = None):
+        self.path = path
+        self.interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self._batch_size = None
+        self._lock = threading.Lock()
+
+    def predict(self, img_batch: np.ndarray) -> np.ndarray:
+        img_batch = np.ascontiguousarray(img_batch, dtype=np.float32)
+        with self._lock:
+            if img_batch.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(self.input_index, list(img_batch.shape))
+                self.interpreter.allocate_tensors()
+                self._batch_size = img_batch.shape[0]
+            self.interpreter.set_tensor(self.input_index, img_batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output_index).copy()
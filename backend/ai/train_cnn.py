@@ -5,7 +5,7 @@ from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import *
 from tensorflow.keras.losses import CategoricalCrossentropy
 from sklearn.metrics import classification_report
-from tensorflow.keras.preprocessing import image_dataset_from_directory
+from preprocessing import image_dataset, write_preprocessing
 import numpy as np
 import os
 
@@ -19,9 +19,8 @@ class_names = np.array(categories)
 print("\n\nCNN model training started\n\n")
 
 
-train_ds = image_dataset_from_directory(
+train_ds = image_dataset(
     DATA_DIR + "Training",
-    label_mode="categorical",
     class_names=list(class_names),
     image_size=(256, 256),
     batch_size=32,
@@ -29,12 +28,11 @@ train_ds = image_dataset_from_directory(
     validation_split=0.2,
     subset="training",
     seed=74,
-).map(lambda x, y: (x / 255., y))
+)
 
 
-val_ds = image_dataset_from_directory(
+val_ds = image_dataset(
     DATA_DIR + "Training",
-    label_mode="categorical",
     class_names=list(class_names),
     image_size=(256, 256),
     batch_size=32,
@@ -42,16 +40,15 @@ val_ds = image_dataset_from_directory(
     validation_split=0.2,
     subset="validation",
     seed=74,
-).map(lambda x, y: (x / 255., y))
+)
 
 
-test_ds = image_dataset_from_directory(
+test_ds = image_dataset(
     DATA_DIR + "Testing",
-    label_mode="categorical",
     class_names=list(class_names),
     image_size=(256, 256),
     batch_size=32,
-).map(lambda x, y: (x / 255., y))
+)
 
 
 def build_cnn():
@@ -90,7 +87,9 @@ model.fit(train_ds, epochs=50, validation_data=val_ds, callbacks=callbacks)
 model.evaluate(test_ds)
 
 model.save("trained/MRI_CNN.keras")
+write_preprocessing("trained/MRI_CNN.keras")
 base.save("trained/MRI_CNN_Base.keras")
+write_preprocessing("trained/MRI_CNN_Base.keras")
 
 model.save_weights("trained/MRI_CNN.weights.h5")
 base.save_weights("trained/MRI_CNN_Base.weights.h5")
@@ -5,7 +5,7 @@ from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import *
 from sklearn.metrics import classification_report
 from tensorflow.keras.losses import CategoricalCrossentropy
-from tensorflow.keras.preprocessing import image_dataset_from_directory
+from preprocessing import image_dataset, write_preprocessing
 import numpy as np
 import os
 
@@ -19,10 +19,8 @@ class_names = np.array(categories)
 
 print("\n\nCNN BINARIZED model training started\n\n")
 
-train_ds = image_dataset_from_directory(
+train_ds = image_dataset(
     DATA_DIR + "Training",
-    labels="inferred",
-    label_mode="categorical",
     class_names=list(class_names),
     image_size=(256, 256),
     batch_size=32,
@@ -30,13 +28,11 @@ train_ds = image_dataset_from_directory(
     validation_split=0.2,
     subset="training",
     seed=74,
-).map(lambda x, y: (x / 255., y))
+)
 
 
-val_ds = image_dataset_from_directory(
+val_ds = image_dataset(
     DATA_DIR + "Training",
-    labels="inferred",
-    label_mode="categorical",
     class_names=list(class_names),
     image_size=(256, 256),
     batch_size=32,
@@ -44,18 +40,16 @@ val_ds = image_dataset_from_directory(
     validation_split=0.2,
     subset="validation",
     seed=74,
-).map(lambda x, y: (x / 255., y))
+)
 
 
-test_ds = image_dataset_from_directory(
+test_ds = image_dataset(
     DATA_DIR + "Testing",
-    labels="inferred",
-    label_mode="categorical",
     class_names=list(class_names),
     image_size=(256, 256),
     batch_size=32,
     shuffle=True,
-).map(lambda x, y: (x / 255., y))
+)
 
 
 # --------------------
@@ -113,7 +107,9 @@ model.fit(train_ds, epochs=50, validation_data=val_ds, callbacks=callbacks)
 model.evaluate(test_ds)
 
 model.save("trained/MRI_CNN_Binarized.keras")
+write_preprocessing("trained/MRI_CNN_Binarized.keras")
 base.save("trained/MRI_CNN_Binarized_Base.keras")
+write_preprocessing("trained/MRI_CNN_Binarized_Base.keras")
 
 model.save_weights("trained/MRI_CNN_Binarized.weights.h5")
 base.save_weights("trained/MRI_CNN_Binarized_Base.weights.h5")
@@ -4,7 +4,7 @@ from tensorflow.keras.models import *
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.losses import CategoricalCrossentropy
 from tensorflow.keras.callbacks import *
-from tensorflow.keras.preprocessing import image_dataset_from_directory
+from preprocessing import image_dataset, write_preprocessing
 from sklearn.metrics import classification_report
 import numpy as np
 import os
@@ -17,35 +17,32 @@ categories = os.listdir(DATA_DIR + "Training")
 class_names = np.array(categories)
 
 
-train_ds = image_dataset_from_directory(
+train_ds = image_dataset(
     DATA_DIR + "Training",
-    label_mode="categorical",
     class_names=list(class_names),
     image_size=(256, 256),
     batch_size=32,
     validation_split=0.2,
     subset="training",
     seed=74,
-).map(lambda x, y: (x / 255., y))
+)
 
-val_ds = image_dataset_from_directory(
+val_ds = image_dataset(
     DATA_DIR + "Training",
-    label_mode="categorical",
     class_names=list(class_names),
     image_size=(256, 256),
     batch_size=32,
     validation_split=0.2,
     subset="validation",
     seed=74,
-).map(lambda x, y: (x / 255., y))
+)
 
-test_ds = image_dataset_from_directory(
+test_ds = image_dataset(
     DATA_DIR + "Testing",
-    label_mode="categorical",
     class_names=list(class_names),
     image_size=(256, 256),
     batch_size=32,
-).map(lambda x, y: (x / 255., y))
+)
 
 
 # --------------------
@@ -109,6 +106,7 @@ model.evaluate(test_ds)
 # Save
 # --------------------
 model.save("trained/MRI_ENSEMBLED.keras")
+write_preprocessing("trained/MRI_ENSEMBLED.keras")
 model.save_weights("trained/MRI_ENSEMBLED.weights.h5")
 
 
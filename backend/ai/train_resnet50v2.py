@@ -5,7 +5,7 @@ from tensorflow.keras.models import *
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.losses import CategoricalCrossentropy
 from tensorflow.keras.callbacks import *
-from tensorflow.keras.preprocessing import image_dataset_from_directory
+from preprocessing import image_dataset, write_preprocessing
 from sklearn.metrics import classification_report
 import numpy as np
 import os
@@ -20,10 +20,8 @@ class_names = np.array(categories)
 
 print("\n\nRESNET50v2 model training started\n\n")
 
-train_ds = image_dataset_from_directory(
+train_ds = image_dataset(
     DATA_DIR + "Training",
-    labels="inferred",
-    label_mode="categorical",
     class_names=list(class_names),
     image_size=(256, 256),
     shuffle=True,
@@ -31,12 +29,10 @@ train_ds = image_dataset_from_directory(
     validation_split=0.2,
     subset="training",
     seed=74,
-).map(lambda x, y: (x / 255., y))
+)
 
-val_ds = image_dataset_from_directory(
+val_ds = image_dataset(
     DATA_DIR + "Training",
-    labels="inferred",
-    label_mode="categorical",
     class_names=list(class_names),
     image_size=(256, 256),
     shuffle=True,
@@ -44,17 +40,15 @@ val_ds = image_dataset_from_directory(
     validation_split=0.2,
     subset="validation",
     seed=74,
-).map(lambda x, y: (x / 255., y))
+)
 
-test_ds = image_dataset_from_directory(
+test_ds = image_dataset(
     DATA_DIR + "Testing",
-    labels="inferred",
-    label_mode="categorical",
     class_names=list(class_names),
     image_size=(256, 256),
     shuffle=True,
     batch_size=32,
-).map(lambda x, y: (x / 255., y))
+)
 
 
 # --------------------
@@ -103,7 +97,9 @@ model.evaluate(test_ds)
 # Save models
 # --------------------
 model.save("trained/MRI_ResNet50V2_Tuned.keras")
+write_preprocessing("trained/MRI_ResNet50V2_Tuned.keras")
 base.save("trained/MRI_ResNet50V2_Tuned_Base.keras")
+write_preprocessing("trained/MRI_ResNet50V2_Tuned_Base.keras")
 
 model.save_weights("trained/MRI_ResNet50V2_Tuned.weights.h5")
 base.save_weights("trained/MRI_ResNet50V2_Tuned_Base.weights.h5")
@@ -0,0 +1,62 @@
+"""Test-time augmentation: N augmented views of one image built in a single vectorized op.
+
+The views mirror the training augmentation in augmentation.py at a smaller
+scale: horizontal flips, small rotations and contrast jitter. View parameters
+come from a fixed seed, so the same image and view count always give the same
+views and the same (cacheable) prediction. View 0 is always the original image.
+"""
+import numpy as np
+
+TTA_ROTATION_DEGREES = 10.0
+TTA_CONTRAST_RANGE = (0.8, 1.2)  # Same factors as RandomContrast in augmentation.py
+TTA_SEED = 0
+
+
+def view_params(n_views: int):
+    """(flip, angle in radians, contrast factor) arrays, one entry per view"""
+    rng = np.random.default_rng(TTA_SEED)
+    flips = np.arange(n_views) % 2 == 1
+    angles = np.deg2rad(rng.uniform(-TTA_ROTATION_DEGREES, TTA_ROTATION_DEGREES, n_views))
+    contrast = rng.uniform(*TTA_CONTRAST_RANGE, n_views)
+
+    angles[0] = 0.0
+    contrast[0] = 1.0
+    return flips, angles, contrast
+
+
+def augment_views(img: np.ndarray, n_views: int) -> np.ndarray:
+    """Stack ``n_views`` augmented copies of a normalized (H, W, C) image.
+
+    Every view is an inverse affine warp (flip + rotation about the centre)
+    sampled bilinearly, followed by contrast scaling around the view's mean.
+    All views are computed together as (N, H, W) coordinate grids.
+    """
+    h, w = img.shape[:2]
+    flips, angles, contrast = view_params(n_views)
+
+    # Output pixel -> source pixel for every view at once
+    ys, xs = np.mgrid[0:h, 0:w].astype(np.float32)
+    dx, dy = xs - (w - 1) / 2, ys - (h - 1) / 2
+    cos = np.cos(angles).astype(np.float32)[:, None, None]
+    sin = np.sin(angles).astype(np.float32)[:, None, None]
+    src_x = cos * dx + sin * dy
+    src_y = cos * dy - sin * dx
+    src_x = np.where(flips[:, None, None], -src_x, src_x) + (w - 1) / 2
+    src_y = src_y + (h - 1) / 2
+
+    # Bilinear sampling, edges extended
+    x0, y0 = np.floor(src_x), np.floor(src_y)
+    wx, wy = (src_x - x0)[..., None], (src_y - y0)[..., None]
+    x1 = np.clip(x0 + 1, 0, w - 1).astype(np.intp)
+    y1 = np.clip(y0 + 1, 0, h - 1).astype(np.intp)
+    x0 = np.clip(x0, 0, w - 1).astype(np.intp)
+    y0 = np.clip(y0, 0, h - 1).astype(np.intp)
+    views = (
+        img[y0, x0] * (1 - wx) * (1 - wy) + img[y0, x1] * wx * (1 - wy)
+        + img[y1, x0] * (1 - wx) * wy + img[y1, x1] * wx * wy
+    )
+
+    # Contrast jitter like RandomContrast: scale around the per-view channel means
+    mean = views.mean(axis=(1, 2), keepdims=True)
+    views = (views - mean) * contrast.astype(np.float32)[:, None, None, None] + mean
+    return np.maximum(views, 0.0).astype(np.float32)
@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# Micro-batching configuration
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "16"))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+
+
+class MicroBatcher:
+    """Collect concurrent single-image requests and run them as one forward pass.
+
+    Callers submit one preprocessed image (H, W, C) and get back a Future that
+    resolves to that image's row of the model output. A background thread
+    waits up to ``max_wait_ms`` after the oldest queued request (or until
+    ``max_batch_size`` requests are queued), stacks them into a batch, calls
+    ``predict_fn`` once and fans the rows back out to the waiting futures.
+    """
+
+    def __init__(self, predict_fn, max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+
+        # Stats
+        self._requests = 0
+        self._batches = 0
+        self._errors = 0
+        self._max_queue_depth = 0
+        self._batch_sizes = {}
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+        self._total_forward = 0.0
+
+    def submit(self, img_array: np.ndarray) -> Future:
+        """Queue a single image and return a Future for its prediction row"""
+        future = Future()
+        with self._cond:
+            self._ensure_worker()
+            self._queue.append((img_array, future, time.perf_counter()))
+            self._max_queue_depth = max(self._max_queue_depth, len(self._queue))
+            self._cond.notify()
+        return future
+
+    def predict(self, img_array: np.ndarray) -> np.ndarray:
+        """Blocking helper: submit an image and wait for its prediction row"""
+        return self.submit(img_array).result()
+
+    def stats(self) -> dict:
+        """Queue-depth, batch-size and wait-time statistics for tuning"""
+        with self._cond:
+            batches = self._batches
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_queue_depth,
+                "requests": self._requests,
+                "batches": batches,
+                "errors": self._errors,
+                "avg_batch_size": round(self._requests / batches, 2) if batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "avg_wait_ms": round(self._total_wait / self._requests * 1000.0, 3) if self._requests else 0.0,
+                "max_wait_ms_seen": round(self._max_wait_seen * 1000.0, 3),
+                "avg_forward_ms": round(self._total_forward / batches * 1000.0, 3) if batches else 0.0,
+            }
+
+    def _ensure_worker(self):
+        # Called with self._cond held
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self) -> list:
+        """Block until a batch is ready according to the size/wait policy"""
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            size = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(size)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            dispatched = time.perf_counter()
+
+            # Drop requests whose callers already gave up
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            try:
+                outputs = self.predict_fn(np.stack([item[0] for item in batch]))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                with self._cond:
+                    self._errors += 1
+                continue
+            forward = time.perf_counter() - started
+
+            for i, (_, future, _) in enumerate(batch):
+                future.set_result(outputs[i])
+
+            waits = [dispatched - enqueued for _, _, enqueued in batch]
+            with self._cond:
+                self._requests += len(batch)
+                self._batches += 1
+                self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+                self._total_wait += sum(waits)
+                self._max_wait_seen = max(self._max_wait_seen, max(waits))
+                self._total_forward += forward
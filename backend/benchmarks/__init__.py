@@ -0,0 +1 @@
+# Initialize benchmarks package
\ No newline at end of file
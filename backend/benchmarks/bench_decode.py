@@ -0,0 +1,71 @@
+"""Micro-benchmark: in-memory image decode vs. the old temp-file + load_img path.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_decode --size 1024 --repeat 50
+"""
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from ai.preprocessing import decode_image
+
+FORMATS = ("JPEG", "PNG", "WEBP")
+
+
+def make_sample(fmt: str, size: int) -> bytes:
+    """Synthetic MRI-like grayscale slice encoded as ``fmt``"""
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[:size, :size]
+    r = np.hypot(yy - size / 2, xx - size / 2) / (size / 2)
+    pixels = np.clip((1 - r) * 200 + rng.normal(0, 12, (size, size)), 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels, mode="L").convert("RGB").save(buf, fmt)
+    return buf.getvalue()
+
+
+def tempfile_load_img(data: bytes) -> np.ndarray:
+    """The previous serving path: spool to a temp file, then keras load_img"""
+    from tensorflow.keras.preprocessing import image
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
+        shutil.copyfileobj(io.BytesIO(data), tmp)
+        tmp_path = tmp.name
+    try:
+        img = image.load_img(tmp_path, target_size=(256, 256))
+        return image.img_to_array(img) / 255.0
+    finally:
+        os.remove(tmp_path)
+
+
+def bench(fn, data: bytes, repeat: int) -> float:
+    fn(data)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(data)
+    return (time.perf_counter() - start) / repeat * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1024, help="Source image edge in pixels")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    # Outputs differ: serving now resizes and pads like training; see bench_preprocessing
+    print(f"{'format':<6} {'load_img ms':>12} {'in-memory ms':>13} {'speedup':>8}")
+    for fmt in FORMATS:
+        data = make_sample(fmt, args.size)
+        old_ms = bench(tempfile_load_img, data, args.repeat)
+        new_ms = bench(decode_image, data, args.repeat)
+        print(f"{fmt:<6} {old_ms:>12.2f} {new_ms:>13.2f} {old_ms / new_ms:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Benchmark reduced-size JPEG decoding and check train/serve preprocessing parity.
+
+Decode: full-resolution decode + resize vs. draft decode (libjpeg DCT
+scaling) of the same JPEG, per source size, with the largest pixel
+difference between the two model inputs.
+
+Parity: writes a small class-per-directory dataset (JPEG and PNG; portrait,
+landscape, grayscale, small and large images), loads it through the
+training pipeline (ai.preprocessing.image_dataset) and through the serving
+decode (inference.decode_image) with the served model's resize mode, and
+exits non-zero unless every tensor is identical. For reference it prints
+the gap to Keras' image_dataset_from_directory with the same geometry, and
+the gap of the previous nearest-neighbour serving decode to it.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_preprocessing --sizes 512 1024 2048 --repeat 30
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from ai.preprocessing import IMG_SIZE, decode_image, image_dataset, open_image, preprocess_image
+from inference import decode_image as serving_decode_image
+from model_registry import model_registry, ENSEMBLE_MODEL
+
+# (filename, width, height, mode, format)
+PARITY_SAMPLES = [
+    ("landscape.jpg", 2048, 1536, "RGB", "JPEG"),
+    ("portrait.jpg", 900, 1200, "RGB", "JPEG"),
+    ("grayscale.jpg", 1024, 1024, "L", "JPEG"),
+    ("exact.jpg", 256, 256, "RGB", "JPEG"),
+    ("small.png", 200, 180, "RGB", "PNG"),
+    ("wide.png", 640, 300, "L", "PNG"),
+]
+
+
+def make_image(width: int, height: int, mode: str, fmt: str, seed: int = 0) -> bytes:
+    """Synthetic MRI-like slice encoded as ``fmt``"""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[:height, :width]
+    r = np.hypot((yy - height / 2) / (height / 2), (xx - width / 2) / (width / 2))
+    pixels = np.clip((1 - r) * 200 + 40 * np.sin(xx / 7.0) + rng.normal(0, 12, (height, width)), 0, 255)
+    img = Image.fromarray(pixels.astype(np.uint8), "L").convert(mode)
+    buf = io.BytesIO()
+    img.save(buf, fmt, quality=90)
+    return buf.getvalue()
+
+
+def bench(fn, data: bytes, repeat: int) -> float:
+    fn(data)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(data)
+    return (time.perf_counter() - start) / repeat * 1000.0
+
+
+def full_decode(data: bytes) -> np.ndarray:
+    """Same preprocessing, but the JPEG decoded at full resolution first"""
+    return preprocess_image(open_image(data))
+
+
+def run_decode_benchmark(sizes: list, repeat: int):
+    print(f"{'source':>9} {'full ms':>9} {'draft ms':>9} {'speedup':>8} {'max diff':>9}")
+    for size in sizes:
+        data = make_image(size, size, "RGB", "JPEG")
+        full_ms = bench(full_decode, data, repeat)
+        draft_ms = bench(decode_image, data, repeat)
+        diff = np.abs(full_decode(data) - decode_image(data)).max() * 255
+        print(f"{size:>4}x{size:<4} {full_ms:>9.2f} {draft_ms:>9.2f} {full_ms / draft_ms:>7.2f}x {diff:>9.1f}")
+
+
+def legacy_serving(data: bytes) -> np.ndarray:
+    """Serving before the shared module: nearest-neighbour stretch to 256x256"""
+    img = Image.open(io.BytesIO(data)).convert("RGB").resize((IMG_SIZE[1], IMG_SIZE[0]), Image.NEAREST)
+    return np.asarray(img, dtype=np.float32) / 255.0
+
+
+def run_parity_check() -> bool:
+    with tempfile.TemporaryDirectory() as directory:
+        class_names = ["a", "b"]
+        for i, (filename, width, height, mode, fmt) in enumerate(PARITY_SAMPLES):
+            class_dir = os.path.join(directory, class_names[i % 2])
+            os.makedirs(class_dir, exist_ok=True)
+            with open(os.path.join(class_dir, filename), "wb") as f:
+                f.write(make_image(width, height, mode, fmt, seed=i))
+
+        # Unshuffled datasets list files class by class, sorted by name
+        paths = [
+            os.path.join(directory, c, f) for c in class_names for f in sorted(os.listdir(os.path.join(directory, c)))
+        ]
+        # Training data as it would be prepared for the served model
+        resize = model_registry.resize_mode(ENSEMBLE_MODEL)
+        training = np.concatenate([
+            x.numpy() for x, _ in image_dataset(directory, class_names, shuffle=False, resize=resize)
+        ])
+
+        from tensorflow.keras.preprocessing import image_dataset_from_directory
+
+        keras_training = np.concatenate([
+            x.numpy() / 255.0 for x, _ in image_dataset_from_directory(
+                directory, label_mode="categorical", class_names=class_names, image_size=IMG_SIZE,
+                shuffle=False, pad_to_aspect_ratio=resize == "pad",
+            )
+        ])
+
+        ok = True
+        print(f"\nResize mode of the served model: {resize}")
+        print(f"{'file':<15} {'serve=train':>11} {'vs keras':>9} {'old serve vs keras':>19}")
+        for path, train_tensor, keras_tensor in zip(paths, training, keras_training):
+            with open(path, "rb") as f:
+                data = f.read()
+            serving = serving_decode_image(data)
+            identical = serving.shape == train_tensor.shape and np.array_equal(serving, train_tensor)
+            ok = ok and identical
+            keras_gap = np.abs(keras_tensor - train_tensor).mean() * 255
+            old_gap = np.abs(legacy_serving(data) - keras_tensor).mean() * 255
+            print(f"{os.path.basename(path):<15} {str(identical):>11} {keras_gap:>9.2f} {old_gap:>19.2f}")
+        print("(gaps: mean absolute difference in 0-255 pixel levels)")
+        return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[512, 1024, 2048], help="Source JPEG edges")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--skip-benchmark", action="store_true", help="Only run the parity check")
+    args = parser.parse_args()
+
+    if not args.skip_benchmark:
+        run_decode_benchmark(args.sizes, args.repeat)
+    if not run_parity_check():
+        print("Parity check FAILED: training and serving tensors differ")
+        sys.exit(1)
+    print("Parity check passed: training and serving tensors are identical")
+
+
+if __name__ == "__main__":
+    main()
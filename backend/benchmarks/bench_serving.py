@@ -0,0 +1,61 @@
+"""Before/after benchmark for the serving export (ai/export_serving.py).
+
+Compares, per batch size, the per-call latency of:
+  * ``Model.predict`` on the trained .keras model (the old serving path),
+  * a direct ``model(x, training=False)`` call on the same model,
+  * the exported SavedModel's fixed-signature ``serve`` function.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_serving --batch-sizes 1 8 32 --repeat 30
+"""
+import argparse
+import time
+
+import numpy as np
+
+from model_registry import ENSEMBLE_MODEL_PATH, serving_path
+
+
+def bench(fn, batch: np.ndarray, repeat: int) -> dict:
+    fn(batch)  # warm-up / tracing
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(batch)
+        timings.append(time.perf_counter() - started)
+    timings = np.array(timings) * 1000.0
+    return {"p50_ms": float(np.percentile(timings, 50)), "mean_ms": float(np.mean(timings))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=ENSEMBLE_MODEL_PATH)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(args.model)
+    serving = tf.saved_model.load(serving_path(args.model))
+
+    paths = {
+        "Model.predict": lambda x: model.predict(x, verbose=0),
+        "model(x)": lambda x: model(x, training=False).numpy(),
+        "serve(x)": lambda x: serving.serve(x).numpy(),
+    }
+
+    print(f"{'batch':>5}  " + "  ".join(f"{name:>14}" for name in paths) + "   speedup  max diff")
+    rng = np.random.default_rng(0)
+    for batch_size in args.batch_sizes:
+        batch = rng.random((batch_size, 256, 256, 3), dtype=np.float32)
+        results = {name: bench(fn, batch, args.repeat) for name, fn in paths.items()}
+        max_diff = float(np.max(np.abs(paths["Model.predict"](batch) - paths["serve(x)"](batch))))
+        speedup = results["Model.predict"]["p50_ms"] / results["serve(x)"]["p50_ms"]
+        print(f"{batch_size:>5}  " + "  ".join(f"{r['p50_ms']:>11.2f} ms" for r in results.values())
+              + f"   {speedup:>6.2f}x  {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Test-time augmentation latency: N sequential predictions vs. one batched pass.
+
+Compares, per view count, building N augmented views and calling the
+ensemble once per view (the naive approach) with ``inference.predict_tta``,
+which builds all views in one vectorized op and runs a single batch.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_tta --views 4 8 16 --repeat 10
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ai.tta import augment_views
+from inference import predict_tta
+from model_registry import model_registry, ENSEMBLE_MODEL
+
+
+def bench(fn, repeat: int) -> float:
+    fn()  # warm-up / tracing
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return float(np.percentile(timings, 50)) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--views", nargs="+", type=int, default=[4, 8, 16])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    img = np.random.default_rng(0).random((256, 256, 3), dtype=np.float32)
+    single_ms = bench(lambda: model_registry.predict(ENSEMBLE_MODEL, img[None]), args.repeat)
+    print(f"single prediction: {single_ms:.1f} ms")
+
+    print(f"{'views':>5}  {'sequential':>12}  {'batched':>10}  {'augment':>9}  speedup")
+    for n_views in args.views:
+        def sequential():
+            for view in augment_views(img, n_views):
+                model_registry.predict(ENSEMBLE_MODEL, view[None])
+
+        sequential_ms = bench(sequential, args.repeat)
+        batched_ms = bench(lambda: predict_tta([img], n_views), args.repeat)
+        augment_ms = bench(lambda: augment_views(img, n_views), args.repeat)
+        print(f"{n_views:>5}  {sequential_ms:>10.1f}ms  {batched_ms:>8.1f}ms  {augment_ms:>7.1f}ms  "
+              f"{sequential_ms / batched_ms:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Import-time profile of the API: how long ``import main`` takes and what it loads.
+
+Starts a fresh interpreter per mode with ``python -X importtime`` and reports
+wall time to import the app, time spent per top-level package and RSS.
+``local`` additionally warms the models up as the lifespan hook would, so
+the report shows what API-only mode (INFERENCE_MODE=off) saves on start-up
+and memory.
+
+Optional heavy dependencies (TensorFlow, pydicom, nibabel, httpx) must stay
+unimported until a request needs them; the report lists any that were
+loaded. It also times importing just the web/database/auth frameworks the
+API is built on: the floor no lazy import in this code can go below.
+
+Run from the backend directory:
+
+    python -m benchmarks.import_profile
+    python -m benchmarks.import_profile --modes off --top 20 --output import_profile.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter() - started
+from model_registry import model_registry, current_rss_bytes
+result = {"import_seconds": imported, "import_rss_bytes": current_rss_bytes()}
+if sys.argv[1] == "1":
+    model_registry.warm_up_all()
+    result["ready_seconds"] = time.perf_counter() - started
+    result["ready_rss_bytes"] = current_rss_bytes()
+result["heavy_modules"] = [m for m in ("tensorflow", "keras", "pydicom", "nibabel", "httpx") if m in sys.modules]
+print(json.dumps(result))
+"""
+
+FRAMEWORKS_CHILD = """
+import json, time
+started = time.perf_counter()
+import dotenv, fastapi, fastapi.security, pydantic, email_validator, sqlalchemy, sqlalchemy.orm
+import jose.jwt, passlib.context
+print(json.dumps({"import_seconds": time.perf_counter() - started}))
+"""
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Self time (seconds) per top-level package from ``-X importtime`` output"""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1e6
+    return packages
+
+
+def profile(mode: str, database_url: str) -> dict:
+    env = dict(os.environ, INFERENCE_MODE=mode, DATABASE_URL=database_url)
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, "1" if mode == "local" else "0"],
+        env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"INFERENCE_MODE={mode} failed:\n{result.stderr[-2000:]}")
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report["mode"] = mode
+    report["process_seconds"] = wall
+    report["packages"] = parse_importtime(result.stderr)
+    return report
+
+
+def profile_frameworks() -> float:
+    """Seconds to import only the frameworks, measured like ``import main``"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", FRAMEWORKS_CHILD], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])["import_seconds"]
+
+
+def mb(value) -> str:
+    return f"{value / 2**20:.0f}MB" if value else "-"
+
+
+def print_report(reports: list, frameworks_seconds: float, top: int):
+    print(f"\n{'mode':<6} {'import':>8} {'ready':>8} {'process':>8} {'rss':>8} {'ready rss':>10}  heavy modules loaded")
+    for r in reports:
+        ready = f"{r['ready_seconds']:.2f}s" if "ready_seconds" in r else "-"
+        print(f"{r['mode']:<6} {r['import_seconds']:>7.2f}s {ready:>8} {r['process_seconds']:>7.2f}s "
+              f"{mb(r['import_rss_bytes']):>8} {mb(r.get('ready_rss_bytes')):>10}  "
+              f"{', '.join(r['heavy_modules']) or 'none'}")
+    print(f"\nFrameworks alone (fastapi, sqlalchemy, pydantic, jose, passlib): {frameworks_seconds:.2f}s")
+
+    for r in reports:
+        print(f"\nTop packages by import time (INFERENCE_MODE={r['mode']}):")
+        for package, seconds in sorted(r["packages"].items(), key=lambda item: -item[1])[:top]:
+            print(f"  {package:<28} {seconds * 1000:>9.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", choices=["off", "local"], default=["off", "local"])
+    parser.add_argument("--database-url", help="Database for the imported app (default: temporary SQLite)")
+    parser.add_argument("--top", type=int, default=12, help="Packages listed per mode")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'import_profile.db')}"
+    reports = [profile(mode, database_url) for mode in args.modes]
+    frameworks_seconds = profile_frameworks()
+    print_report(reports, frameworks_seconds, args.top)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"frameworks_import_seconds": frameworks_seconds, "modes": reports}, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""End-to-end load test: throughput and p50/p95/p99 latency per endpoint.
+
+Starts the API with uvicorn (SQLite stand-in by default, or the Postgres in
+--database-url), seeds doctors and patients through the API, then drives
+concurrent load against the analysis, patient and auth endpoints with
+synthetic MRI-like JPEG/PNG uploads. The JSON report can be diffed between
+commits with --baseline.
+
+Run from the backend directory:
+
+    python -m benchmarks.loadtest --concurrency 16 --duration 60
+    python -m benchmarks.loadtest --url http://localhost:8000 --output after.json --baseline before.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+import numpy as np
+from PIL import Image
+
+# Relative weights of the request mix
+SCENARIOS = {
+    "POST /api/analysis/predict/{patient_id}": 6,
+    "GET /api/patients": 2,
+    "POST /api/auth/login": 1,
+    "GET /api/auth/me": 1,
+}
+
+PASSWORD = "loadtest-password"
+
+
+def make_upload(seed: int, size: int, fmt: str) -> bytes:
+    """Synthetic MRI-like slice: bright skull ring, darker tissue, noise and a blob"""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[:size, :size]
+    r = np.hypot(yy - size / 2, xx - size / 2) / (size / 2)
+    tissue = np.where(r < 0.8, 90 + 40 * np.cos(r * 9), 0)
+    skull = np.where((r >= 0.8) & (r < 0.9), 220, 0)
+    cy, cx = rng.uniform(0.3, 0.7, 2) * size
+    blob = 120 * np.exp(-((yy - cy) ** 2 + (xx - cx) ** 2) / (2 * (size * rng.uniform(0.03, 0.1)) ** 2))
+    pixels = np.clip(tissue + skull + blob * (r < 0.8) + rng.normal(0, 8, (size, size)), 0, 255).astype(np.uint8)
+
+    buf = io.BytesIO()
+    Image.fromarray(pixels, mode="L").convert("RGB").save(buf, fmt)
+    return buf.getvalue()
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def start_server(port: int, database_url: str, env_overrides: dict) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=database_url, **env_overrides)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float, server: subprocess.Popen = None):
+    """Wait for /health/ready so model loading isn't measured as request latency"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            if (await client.get("/health/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"Server not ready after {timeout:.0f}s")
+
+
+async def seed(client: httpx.AsyncClient, doctors: int, patients_per_doctor: int) -> list:
+    """Register doctors and create their patients; returns one dict per doctor"""
+    run_id = uuid.uuid4().hex[:8]
+    seeded = []
+    for i in range(doctors):
+        email = f"loadtest-{run_id}-{i}@loadtest.com"
+        r = await client.post("/api/auth/register", json={
+            "name": f"Load Test {i}", "email": email, "password": PASSWORD, "specialization": "Neurology",
+        })
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['token']}"}
+
+        for j in range(patients_per_doctor):
+            r = await client.post("/api/patients", headers=headers, json={
+                "name": f"Patient {i}-{j}", "age": 30 + j, "gender": "other", "disease": "unknown",
+            })
+            r.raise_for_status()
+
+        r = await client.get("/api/patients", headers=headers)
+        r.raise_for_status()
+        seeded.append({
+            "email": email,
+            "headers": headers,
+            "patient_ids": [p["id"] for p in r.json()["patients"]],
+        })
+    return seeded
+
+
+async def run_load(client, doctors, uploads, concurrency: int, duration: float, warmup: float) -> dict:
+    """Closed-loop load: each worker sends its next request when the last one returns"""
+    names = list(SCENARIOS)
+    weights = [SCENARIOS[name] for name in names]
+    samples = {name: [] for name in names}
+    statuses = {name: {} for name in names}
+    measure_from = time.monotonic() + warmup
+    stop_at = measure_from + duration
+
+    async def request(name: str, rng: random.Random):
+        doctor = rng.choice(doctors)
+        if name.startswith("POST /api/analysis/predict"):
+            filename, data, content_type = rng.choice(uploads)
+            return await client.post(
+                f"/api/analysis/predict/{rng.choice(doctor['patient_ids'])}",
+                headers=doctor["headers"], files={"file": (filename, data, content_type)},
+            )
+        if name == "GET /api/patients":
+            return await client.get("/api/patients", headers=doctor["headers"])
+        if name == "POST /api/auth/login":
+            return await client.post("/api/auth/login", json={"email": doctor["email"], "password": PASSWORD})
+        return await client.get("/api/auth/me", headers=doctor["headers"])
+
+    async def worker(worker_id: int):
+        rng = random.Random(worker_id)
+        while time.monotonic() < stop_at:
+            name = rng.choices(names, weights)[0]
+            started = time.monotonic()
+            try:
+                status = (await request(name, rng)).status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            if started >= measure_from:
+                samples[name].append(time.monotonic() - started)
+                statuses[name][str(status)] = statuses[name].get(str(status), 0) + 1
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return {"samples": samples, "statuses": statuses}
+
+
+def summarize(samples: dict, statuses: dict, duration: float) -> dict:
+    endpoints = {}
+    for name, latencies in samples.items():
+        if not latencies:
+            continue
+        ms = np.array(latencies) * 1000.0
+        ok = sum(count for status, count in statuses[name].items() if status.startswith("2"))
+        endpoints[name] = {
+            "requests": len(latencies),
+            "errors": len(latencies) - ok,
+            "throughput_rps": round(ok / duration, 2),
+            "mean_ms": round(float(ms.mean()), 2),
+            "p50_ms": round(float(np.percentile(ms, 50)), 2),
+            "p95_ms": round(float(np.percentile(ms, 95)), 2),
+            "p99_ms": round(float(np.percentile(ms, 99)), 2),
+            "max_ms": round(float(ms.max()), 2),
+            "status_codes": statuses[name],
+        }
+    return endpoints
+
+
+def print_report(report: dict, baseline: dict = None):
+    print(f"\n{'endpoint':<42} {'req':>6} {'err':>5} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, row in report["endpoints"].items():
+        print(f"{name:<42} {row['requests']:>6} {row['errors']:>5} {row['throughput_rps']:>8.2f} "
+              f"{row['p50_ms']:>7.1f}ms {row['p95_ms']:>7.1f}ms {row['p99_ms']:>7.1f}ms")
+        before = (baseline or {}).get("endpoints", {}).get(name)
+        if before:
+            deltas = [
+                f"{key} {100.0 * (row[key] - before[key]) / before[key]:+.1f}%"
+                for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms") if before[key]
+            ]
+            print(f"{'  vs ' + baseline['meta']['commit']:<42} " + ", ".join(deltas))
+
+
+async def main_async(args) -> dict:
+    server = None
+    base_url = args.url
+    if base_url is None:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'loadtest.db')}"
+        env_overrides = dict(item.split("=", 1) for item in args.env)
+        server = start_server(args.port, database_url, env_overrides)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+            await wait_ready(client, args.startup_timeout, server)
+            doctors = await seed(client, args.doctors, args.patients)
+
+            formats = [("JPEG", "image/jpeg", "jpg"), ("PNG", "image/png", "png")]
+            uploads = []
+            for i in range(args.images):
+                fmt, content_type, ext = formats[i % len(formats)]
+                uploads.append((f"slice{i}.{ext}", make_upload(i, args.image_size, fmt), content_type))
+
+            print(f"Seeded {args.doctors} doctors x {args.patients} patients, {len(uploads)} images; "
+                  f"running {args.concurrency} workers for {args.duration:.0f}s")
+            result = await run_load(client, doctors, uploads, args.concurrency, args.duration, args.warmup)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "url": base_url,
+            "database": "external" if args.url else (args.database_url or "sqlite").split(":")[0],
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "images": args.images,
+            "image_size": args.image_size,
+            "scenarios": SCENARIOS,
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "endpoints": summarize(result["samples"], result["statuses"], args.duration),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Benchmark a running server instead of starting one")
+    parser.add_argument("--database-url", help="Database for the started server (default: temporary SQLite)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--env", nargs="*", default=[], help="Extra KEY=VALUE settings for the started server")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of load excluded from the report")
+    parser.add_argument("--doctors", type=int, default=4)
+    parser.add_argument("--patients", type=int, default=5, help="Patients per doctor")
+    parser.add_argument("--images", type=int, default=64,
+                        help="Distinct synthetic uploads; fewer means more prediction-cache hits")
+    parser.add_argument("--image-size", type=int, default=512)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--output", default="loadtest_report.json")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Write a synthetic MR DICOM series for trying out /api/analysis/predict-dicom.
+
+16-bit MONOCHROME2 slices of a head-like phantom (skull ring, tissue and a
+bright lesion spanning a few slices), with rescale slope/intercept and a
+window in the headers, as a scanner export would have.
+
+Run from the backend directory:
+
+    python -m benchmarks.synthetic_dicom --slices 24 --output /tmp/series
+    python -m benchmarks.synthetic_dicom --slices 24 --zip /tmp/series.zip
+"""
+import argparse
+import io
+import os
+import zipfile
+
+import numpy as np
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, MRImageStorage, generate_uid
+
+
+def phantom_slice(index: int, slices: int, size: int, rng) -> np.ndarray:
+    """Raw detector values (before rescale) for slice ``index``"""
+    yy, xx = np.mgrid[:size, :size]
+    z = (index - slices / 2) / (slices / 2)
+    radius = np.sqrt(max(1.0 - 0.8 * z * z, 0.05))
+    r = np.hypot(yy - size / 2, xx - size / 2) / (size / 2 * radius)
+    tissue = np.where(r < 0.8, 900 + 300 * np.cos(r * 9), 0)
+    skull = np.where((r >= 0.8) & (r < 0.9), 2200, 0)
+    lesion_z = np.exp(-((index - slices * 0.6) ** 2) / (2 * (slices * 0.08) ** 2))
+    lesion = 1400 * lesion_z * np.exp(-((yy - size * 0.4) ** 2 + (xx - size * 0.6) ** 2) / (2 * (size * 0.06) ** 2))
+    noise = rng.normal(0, 40, (size, size))
+    return np.clip(tissue + skull + lesion * (r < 0.8) + noise + 100, 0, 4095).astype(np.uint16)
+
+
+def make_series(slices: int, size: int = 256, seed: int = 0) -> list:
+    """(filename, DICOM bytes) per slice of one series"""
+    rng = np.random.default_rng(seed)
+    study_uid, series_uid = generate_uid(), generate_uid()
+    files = []
+    for i in range(slices):
+        meta = FileMetaDataset()
+        meta.MediaStorageSOPClassUID = MRImageStorage
+        meta.MediaStorageSOPInstanceUID = generate_uid()
+        meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+        ds = Dataset()
+        ds.file_meta = meta
+        ds.SOPClassUID = MRImageStorage
+        ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+        ds.StudyInstanceUID = study_uid
+        ds.SeriesInstanceUID = series_uid
+        ds.Modality = "MR"
+        ds.SeriesNumber = 1
+        ds.InstanceNumber = i + 1
+        ds.ImagePositionPatient = [0.0, 0.0, float(i * 5)]
+        ds.SliceThickness = 5.0
+        ds.Rows = ds.Columns = size
+        ds.SamplesPerPixel = 1
+        ds.PhotometricInterpretation = "MONOCHROME2"
+        ds.BitsAllocated = 16
+        ds.BitsStored = 12
+        ds.HighBit = 11
+        ds.PixelRepresentation = 0
+        ds.RescaleSlope = 1
+        ds.RescaleIntercept = -100
+        ds.WindowCenter = 1100
+        ds.WindowWidth = 2400
+        ds.PixelData = phantom_slice(i, slices, size, rng).tobytes()
+
+        buf = io.BytesIO()
+        ds.save_as(buf, enforce_file_format=True)
+        files.append((f"IM{i + 1:04d}.dcm", buf.getvalue()))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--slices", type=int, default=24)
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--output", help="Directory to write the .dcm files to")
+    parser.add_argument("--zip", help="Write the series as one ZIP archive instead")
+    args = parser.parse_args()
+
+    series = make_series(args.slices, args.size)
+    if args.zip:
+        with zipfile.ZipFile(args.zip, "w") as archive:
+            for filename, data in series:
+                archive.writestr(filename, data)
+        print(f"Wrote {len(series)} slices to {args.zip}")
+    else:
+        output = args.output or "synthetic_series"
+        os.makedirs(output, exist_ok=True)
+        for filename, data in series:
+            with open(os.path.join(output, filename), "wb") as f:
+                f.write(data)
+        print(f"Wrote {len(series)} slices to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Write a synthetic MR NIfTI volume for trying out /api/analysis/predict-volume.
+
+The same head-like phantom as synthetic_dicom (lesion included), padded with
+empty slices above and below the head as real volumes are, so the background
+pre-filter has something to skip. ``.nii.gz`` output is gzip-compressed.
+
+Run from the backend directory:
+
+    python -m benchmarks.synthetic_nifti --slices 155 --size 240 --output /tmp/volume.nii.gz
+"""
+import argparse
+
+import nibabel as nib
+import numpy as np
+
+from benchmarks.synthetic_dicom import phantom_slice
+
+
+def make_volume(slices: int, size: int = 256, padding: float = 0.15, seed: int = 0) -> nib.Nifti1Image:
+    """int16 RAS volume of ``slices`` axial slices, ``padding`` of them empty at each end"""
+    rng = np.random.default_rng(seed)
+    empty = int(slices * padding)
+    head = slices - 2 * empty
+    data = np.zeros((size, size, slices), dtype=np.int16)
+    for z in range(slices):
+        if empty <= z < empty + head:
+            # phantom_slice rows run anterior to posterior; voxel axes are x (R), y (A)
+            data[:, :, z] = np.rot90(phantom_slice(z - empty, head, size, rng), -1)
+        else:
+            data[:, :, z] = np.clip(rng.normal(20, 8, (size, size)), 0, None)
+    return nib.Nifti1Image(data, np.diag([1.0, 1.0, 2.0, 1.0]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--slices", type=int, default=155)
+    parser.add_argument("--size", type=int, default=240)
+    parser.add_argument("--output", default="synthetic_volume.nii.gz", help=".nii or .nii.gz path")
+    args = parser.parse_args()
+
+    nib.save(make_volume(args.slices, args.size), args.output)
+    print(f"Wrote {args.slices} slices of {args.size}x{args.size} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
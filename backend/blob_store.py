@@ -0,0 +1,164 @@
+"""Content-addressed storage for uploaded images.
+
+Every upload is stored once under its SHA-256 (``sha256:<hex>``), so the same
+image uploaded for several patients or by several doctors shares one blob.
+Access control stays with the analyses that reference a key. The key is what
+MRIAnalysis.image_path holds. Derivatives (thumbnails, previews) are stored
+next to their original as ``sha256:<hex>.<name>``.
+"""
+from abc import ABC, abstractmethod
+import hashlib
+import os
+import re
+import threading
+
+# "filesystem" is the only backend so far; object storage would subclass BlobStore
+BLOB_STORE_BACKEND = os.getenv("BLOB_STORE_BACKEND", "filesystem")
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "storage/blobs")
+BLOB_READ_CHUNK_BYTES = int(os.getenv("BLOB_READ_CHUNK_BYTES", str(256 * 1024)))
+
+KEY_PATTERN = re.compile(r"^sha256:([0-9a-f]{64})$")
+# An original key, optionally followed by a derivative name such as ".thumbnail.webp"
+STORED_KEY_PATTERN = re.compile(r"^sha256:([0-9a-f]{64})((?:\.[a-z0-9_]+)*)$")
+
+
+def content_key(data: bytes) -> str:
+    return f"sha256:{hashlib.sha256(data).hexdigest()}"
+
+
+def is_content_key(value: str) -> bool:
+    """Analyses stored before the blob store hold a filename instead"""
+    return bool(value and KEY_PATTERN.match(value))
+
+
+def derivative_key(key: str, name: str) -> str:
+    return f"{key}.{name}"
+
+
+class BlobNotFound(Exception):
+    """No blob is stored under the key"""
+
+
+class BlobStore(ABC):
+    """Write-once blobs addressed by content key"""
+
+    @abstractmethod
+    def put(self, data: bytes) -> str:
+        """Store ``data`` unless already present; returns its key"""
+
+    @abstractmethod
+    def put_derivative(self, key: str, name: str, data: bytes) -> str:
+        """Store a rendition of blob ``key`` (e.g. "thumbnail.webp"); returns its key"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def iter_range(self, key: str, start: int = 0, end: int = None, chunk_size: int = BLOB_READ_CHUNK_BYTES):
+        """Yield bytes ``start``..``end`` (inclusive, default to the end) in chunks"""
+
+    def read(self, key: str) -> bytes:
+        return b"".join(self.iter_range(key))
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class FilesystemBlobStore(BlobStore):
+    """Blobs as files under ``<root>/<hex[:2]>/<hex[2:4]>/<hex>``"""
+
+    backend = "filesystem"
+
+    def __init__(self, root: str = BLOB_STORE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._dedup_hits = 0
+        self._bytes_written = 0
+
+    def path(self, key: str) -> str:
+        match = STORED_KEY_PATTERN.match(key or "")
+        if not match:
+            raise BlobNotFound(key)
+        digest, suffix = match.groups()
+        return os.path.join(self.root, digest[:2], digest[2:4], digest + suffix)
+
+    def put(self, data: bytes) -> str:
+        key = content_key(data)
+        if os.path.exists(self.path(key)):
+            with self._lock:
+                self._dedup_hits += 1
+            return key
+        self.write(key, data)
+        return key
+
+    def put_derivative(self, key: str, name: str, data: bytes) -> str:
+        key = derivative_key(key, name)
+        self.write(key, data)
+        return key
+
+    def write(self, key: str, data: bytes):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Concurrent writers of the same blob each write a temp file; the
+        # rename is atomic and both contents are identical
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._writes += 1
+            self._bytes_written += len(data)
+
+    def exists(self, key: str) -> bool:
+        try:
+            return os.path.exists(self.path(key))
+        except BlobNotFound:
+            return False
+
+    def size(self, key: str) -> int:
+        try:
+            return os.path.getsize(self.path(key))
+        except OSError:
+            raise BlobNotFound(key)
+
+    def iter_range(self, key: str, start: int = 0, end: int = None, chunk_size: int = BLOB_READ_CHUNK_BYTES):
+        try:
+            f = open(self.path(key), "rb")
+        except OSError:
+            raise BlobNotFound(key)
+        with f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "root": self.root,
+                "writes": self._writes,
+                "dedup_hits": self._dedup_hits,
+                "bytes_written": self._bytes_written,
+            }
+
+
+def make_blob_store() -> BlobStore:
+    if BLOB_STORE_BACKEND == "filesystem":
+        return FilesystemBlobStore()
+    raise ValueError(f"Unknown blob store backend: {BLOB_STORE_BACKEND}")
+
+
+blob_store = make_blob_store()
@@ -0,0 +1,253 @@
+"""CPU threading and affinity for inference, applied once before the first model load.
+
+Several API or worker processes on one node each get their own slice of
+cores (INFERENCE_CPU_AFFINITY=auto) and size TensorFlow's thread pools to
+it, instead of every process starting pools sized for the whole machine.
+With INFERENCE_THREADS_AUTOTUNE=true a few intra/inter-op settings are
+benchmarked in subprocesses at the configured batch size, and the fastest is
+applied. The result is cached in INFERENCE_TUNING_FILE, so later starts
+don't repeat the search.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# 0 = TensorFlow default (or the number of pinned cores when affinity is set)
+INFERENCE_INTRA_OP_THREADS = int(os.getenv("INFERENCE_INTRA_OP_THREADS", "0"))
+INFERENCE_INTER_OP_THREADS = int(os.getenv("INFERENCE_INTER_OP_THREADS", "0"))
+# Exported as OMP_NUM_THREADS (defaults to the intra-op thread count)
+INFERENCE_OMP_NUM_THREADS = os.getenv("INFERENCE_OMP_NUM_THREADS", "")
+# "true"/"false" sets TF_ENABLE_ONEDNN_OPTS; empty keeps TensorFlow's default
+INFERENCE_ONEDNN = os.getenv("INFERENCE_ONEDNN", "")
+# "" = no pinning, "auto" = an even share of the available cores per process,
+# or an explicit CPU list such as "0-7,16-23"
+INFERENCE_CPU_AFFINITY = os.getenv("INFERENCE_CPU_AFFINITY", "")
+# Processes sharing the node for "auto" affinity (e.g. uvicorn --workers)
+INFERENCE_PROCESSES = int(os.getenv("INFERENCE_PROCESSES", os.getenv("WEB_CONCURRENCY", "1")))
+
+INFERENCE_THREADS_AUTOTUNE = os.getenv("INFERENCE_THREADS_AUTOTUNE", "false").lower() in ("1", "true", "yes")
+# Optional explicit candidates, e.g. "8:1,4:2,2:4" (intra:inter)
+INFERENCE_AUTOTUNE_CANDIDATES = os.getenv("INFERENCE_AUTOTUNE_CANDIDATES", "")
+INFERENCE_TUNING_FILE = os.getenv("INFERENCE_TUNING_FILE", "cache/thread_tuning.json")
+
+
+def parse_cpu_list(spec: str) -> list:
+    """"0-3,8,10-11" -> [0, 1, 2, 3, 8, 10, 11]"""
+    cpus = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return sorted(set(cpus))
+
+
+def available_cpus() -> list:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class CPUConfig:
+    """The threading/affinity settings this process runs inference with"""
+
+    def __init__(self):
+        self.applied = False
+        self.intra_op_threads = INFERENCE_INTRA_OP_THREADS
+        self.inter_op_threads = INFERENCE_INTER_OP_THREADS
+        self.affinity = None
+        self.worker_slot = None
+        self.source = "env"
+        self.tuning = None
+        self._slot_file = None
+        self._lock = threading.Lock()
+
+    def claim_worker_slot(self, slots: int) -> int:
+        """Index of this process among the ``slots`` sharing the node (held until exit)"""
+        import fcntl
+
+        lock_dir = os.path.join(tempfile.gettempdir(), "mri-inference-slots")
+        os.makedirs(lock_dir, exist_ok=True)
+        for slot in range(slots):
+            f = open(os.path.join(lock_dir, f"slot-{slot}.lock"), "w")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                continue
+            self._slot_file = f
+            return slot
+        # More processes than slots: share the last slice
+        return slots - 1
+
+    def pin(self):
+        if not INFERENCE_CPU_AFFINITY or not hasattr(os, "sched_setaffinity"):
+            return
+        if INFERENCE_CPU_AFFINITY == "auto":
+            cpus = available_cpus()
+            slots = max(1, min(INFERENCE_PROCESSES, len(cpus)))
+            self.worker_slot = self.claim_worker_slot(slots)
+            share = len(cpus) // slots
+            cpus = cpus[self.worker_slot * share:(self.worker_slot + 1) * share]
+        else:
+            cpus = parse_cpu_list(INFERENCE_CPU_AFFINITY)
+        os.sched_setaffinity(0, cpus)
+        self.affinity = cpus
+
+    def apply(self, model_version: str = "", batch_size: int = None):
+        """Pin, tune and configure TensorFlow; later calls are no-ops"""
+        with self._lock:
+            if self.applied:
+                return
+            self.pin()
+            if self.intra_op_threads == 0 and self.affinity:
+                self.intra_op_threads = len(self.affinity)
+
+            if INFERENCE_THREADS_AUTOTUNE and batch_size:
+                self.intra_op_threads, self.inter_op_threads = self.autotune(model_version, batch_size)
+
+            if INFERENCE_ONEDNN:
+                os.environ["TF_ENABLE_ONEDNN_OPTS"] = "1" if INFERENCE_ONEDNN.lower() in ("1", "true", "yes") else "0"
+            omp_threads = INFERENCE_OMP_NUM_THREADS or (str(self.intra_op_threads) if self.intra_op_threads else "")
+            if omp_threads:
+                os.environ["OMP_NUM_THREADS"] = omp_threads
+
+            if "tensorflow" in sys.modules:
+                print("Warning: TensorFlow was imported before the CPU configuration; "
+                      "OMP/oneDNN settings may not take effect")
+            if self.intra_op_threads or self.inter_op_threads:
+                import tensorflow as tf
+
+                try:
+                    tf.config.threading.set_intra_op_parallelism_threads(self.intra_op_threads)
+                    tf.config.threading.set_inter_op_parallelism_threads(self.inter_op_threads)
+                except RuntimeError as e:
+                    print(f"Could not set TensorFlow thread pools: {e}")
+
+            self.applied = True
+            print(f"✓ CPU config: intra={self.intra_op_threads} inter={self.inter_op_threads} "
+                  f"cpus={len(self.affinity) if self.affinity else 'all'} ({self.source})")
+
+    def candidates(self) -> list:
+        if INFERENCE_AUTOTUNE_CANDIDATES:
+            return [tuple(int(n) for n in item.split(":")) for item in INFERENCE_AUTOTUNE_CANDIDATES.split(",")]
+        cores = len(self.affinity or available_cpus())
+        intra = sorted({cores, max(1, cores // 2), max(1, cores // 4)}, reverse=True)
+        return [(i, inter) for i in intra for inter in (1, 2)]
+
+    def autotune(self, model_version: str, batch_size: int) -> tuple:
+        """Fastest (intra, inter) at ``batch_size``, from the tuning file or fresh probes"""
+        from model_registry import INFERENCE_BACKEND
+
+        key = f"{model_version}|{INFERENCE_BACKEND}|cpus={len(self.affinity or available_cpus())}|batch={batch_size}"
+        try:
+            with open(INFERENCE_TUNING_FILE) as f:
+                cached = json.load(f).get(key)
+        except (OSError, ValueError):
+            cached = None
+        if cached:
+            self.source, self.tuning = "autotune (cached)", cached
+            return cached["intra_op_threads"], cached["inter_op_threads"]
+
+        results = []
+        for intra, inter in self.candidates():
+            throughput = probe_subprocess(intra, inter, batch_size)
+            print(f"  autotune intra={intra} inter={inter}: "
+                  f"{f'{throughput:.1f} img/s' if throughput else 'failed'}")
+            if throughput:
+                results.append({"intra_op_threads": intra, "inter_op_threads": inter,
+                                "images_per_second": round(throughput, 2)})
+        if not results:
+            print("Autotune failed for every candidate, keeping the configured threads")
+            return self.intra_op_threads, self.inter_op_threads
+
+        best = max(results, key=lambda r: r["images_per_second"])
+        self.source, self.tuning = "autotune", dict(best, candidates=results)
+        save_tuning(key, self.tuning)
+        return best["intra_op_threads"], best["inter_op_threads"]
+
+    def stats(self) -> dict:
+        return {
+            "applied": self.applied,
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+            "affinity": self.affinity,
+            "worker_slot": self.worker_slot,
+            "omp_num_threads": os.environ.get("OMP_NUM_THREADS"),
+            "onednn": os.environ.get("TF_ENABLE_ONEDNN_OPTS"),
+            "source": self.source,
+            "tuning": self.tuning,
+        }
+
+
+def save_tuning(key: str, result: dict):
+    try:
+        with open(INFERENCE_TUNING_FILE) as f:
+            tuning = json.load(f)
+    except (OSError, ValueError):
+        tuning = {}
+    tuning[key] = result
+    os.makedirs(os.path.dirname(INFERENCE_TUNING_FILE) or ".", exist_ok=True)
+    tmp_path = f"{INFERENCE_TUNING_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(tuning, f, indent=2)
+    os.replace(tmp_path, INFERENCE_TUNING_FILE)
+
+
+def probe_subprocess(intra: int, inter: int, batch_size: int):
+    """Images/second for one setting, measured in a fresh process (inherits the affinity)"""
+    env = dict(
+        os.environ,
+        INFERENCE_INTRA_OP_THREADS=str(intra),
+        INFERENCE_INTER_OP_THREADS=str(inter),
+        INFERENCE_THREADS_AUTOTUNE="false",
+        INFERENCE_CPU_AFFINITY="",
+    )
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--probe", "--batch-size", str(batch_size)],
+        env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])["images_per_second"]
+
+
+def probe(batch_size: int, repeat: int) -> dict:
+    import numpy as np
+    from model_registry import model_registry, ENSEMBLE_MODEL
+
+    model_registry.warm_up(ENSEMBLE_MODEL, [batch_size])
+    batch = np.random.default_rng(0).random((batch_size, 256, 256, 3), dtype=np.float32)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        model_registry.predict(ENSEMBLE_MODEL, batch)
+    return {"images_per_second": batch_size * repeat / (time.perf_counter() - started)}
+
+
+cpu_config = CPUConfig()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inference CPU configuration")
+    parser.add_argument("--probe", action="store_true", help="Measure throughput with the current environment")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.probe:
+        print(json.dumps(probe(args.batch_size, args.repeat)))
+    else:
+        # Apply (and autotune, if enabled) without serving, e.g. to pre-fill the tuning file
+        from model_registry import model_registry
+
+        model_registry.configure_cpu()
+        print(json.dumps(cpu_config.stats(), indent=2))
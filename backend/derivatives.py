@@ -0,0 +1,93 @@
+"""Downscaled renditions of stored images, generated in the background on upload.
+
+For every original in the blob store:
+
+    thumbnail.webp / thumbnail.jpeg   fits within THUMBNAIL_SIZE, for list screens
+    input.webp / input.jpeg           exactly what the model sees (256x256 RGB)
+
+They are stored next to the original (``sha256:<hex>.thumbnail.webp``), so
+the patient list never has to fetch or decode a full-size MRI.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import io
+import os
+import threading
+
+import numpy as np
+from PIL import Image
+
+from ai.preprocessing import decode_image, open_image
+from blob_store import blob_store, derivative_key
+from model_registry import model_registry, ENSEMBLE_MODEL
+
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "160"))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+DERIVATIVE_WORKERS = int(os.getenv("DERIVATIVE_WORKERS", "2"))
+
+VARIANTS = ("thumbnail", "input")
+FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+MEDIA_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+def render_variants(image_bytes: bytes) -> dict:
+    """{"thumbnail.webp": bytes, ...} for one original image"""
+    # Same decode, resize and padding as inference, so the preview is the model input
+    model_input = Image.fromarray(
+        np.round(decode_image(image_bytes, resize=model_registry.resize_mode(ENSEMBLE_MODEL)) * 255).astype(np.uint8)
+    )
+
+    thumbnail = open_image(image_bytes, (THUMBNAIL_SIZE, THUMBNAIL_SIZE)).convert("RGB")
+    thumbnail.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.LANCZOS)
+
+    rendered = {}
+    for variant, image in (("thumbnail", thumbnail), ("input", model_input)):
+        for ext, pil_format in FORMATS.items():
+            buf = io.BytesIO()
+            image.save(buf, pil_format, quality=THUMBNAIL_QUALITY)
+            rendered[f"{variant}.{ext}"] = buf.getvalue()
+    return rendered
+
+
+class DerivativePipeline:
+    """Worker pool writing renditions of newly stored images"""
+
+    def __init__(self, workers: int = DERIVATIVE_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="derivatives")
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.generated = 0
+        self.failures = 0
+
+    def complete(self, key: str) -> bool:
+        # Renditions are written in render_variants order; the last marks the set complete
+        return blob_store.exists(derivative_key(key, "input.jpeg"))
+
+    def schedule(self, key: str, image_bytes: bytes = None):
+        """Future for ``key``'s renditions; joins the running one if there is one"""
+        with self.lock:
+            future = self.pending.get(key)
+            if future is None:
+                future = self.pending[key] = self.executor.submit(self.generate, key, image_bytes)
+        return future
+
+    def generate(self, key: str, image_bytes: bytes = None):
+        try:
+            if not self.complete(key):
+                for name, data in render_variants(image_bytes or blob_store.read(key)).items():
+                    blob_store.put_derivative(key, name, data)
+                self.generated += 1
+        except Exception as e:
+            self.failures += 1
+            print(f"Derivatives failed for {key}: {e}")
+            raise
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+
+    def stats(self) -> dict:
+        with self.lock:
+            pending = len(self.pending)
+        return {"pending": pending, "generated": self.generated, "failures": self.failures}
+
+
+derivative_pipeline = DerivativePipeline()
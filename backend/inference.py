@@ -0,0 +1,220 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+import numpy as np
+
+from ai.preprocessing import open_image, preprocess_image, ImageDecodeError, IMG_SIZE
+from ai.tta import augment_views
+from batching import MicroBatcher
+from metrics import stage_timer, forward_batch_size, predictions_total
+from model_registry import model_registry, ENSEMBLE_MODEL, CASCADE_ENABLED, CASCADE_THRESHOLD, CASCADE_MODEL
+from prediction_cache import PredictionCache, make_cache_key
+
+diagnoses = ['glioma', 'meningioma', 'notumor', 'pituitary']
+
+# Slices of a study are decoded in parallel on their own threads
+decode_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="decode")
+
+# Upper bound for the opt-in ``tta`` view count on the analysis endpoints
+TTA_MAX_VIEWS = int(os.getenv("TTA_MAX_VIEWS", "16"))
+
+
+def load_prediction_model():
+    """Load the prediction model (shared through the model registry)"""
+    return model_registry.get(ENSEMBLE_MODEL)
+
+
+def get_model_version(tta: int = 0) -> str:
+    """Identify the deployed model(s) so cached predictions never outlive them"""
+    version = model_registry.version(ENSEMBLE_MODEL)
+    if tta:
+        return f"{version}|tta{tta}"
+    if CASCADE_ENABLED:
+        version += f"|{model_registry.version(CASCADE_MODEL)}@{CASCADE_THRESHOLD}"
+    return version
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    """Row-wise softmax over model logits"""
+    exp = np.exp(logits)
+    return exp / np.sum(exp, axis=-1, keepdims=True)
+
+
+def decode_image(image_bytes: bytes, resize: str = None) -> np.ndarray:
+    """Decode and preprocess an upload as the served model was trained, timing each stage"""
+    resize = resize or model_registry.resize_mode(ENSEMBLE_MODEL)
+    with stage_timer("decode"):
+        img = open_image(image_bytes, IMG_SIZE, resize)
+    with stage_timer("preprocess"):
+        return preprocess_image(img, IMG_SIZE, resize)
+
+
+def predict_batch(img_batch: np.ndarray) -> list:
+    """Run a batch of preprocessed images; returns (logits, stage) per image.
+
+    In cascade mode the CNN scores the whole batch and only the images whose
+    top probability is below CASCADE_THRESHOLD are sent to the ensemble.
+    """
+    forward_batch_size.observe(len(img_batch))
+    with stage_timer("forward"):
+        return run_models(img_batch)
+
+
+def run_models(img_batch: np.ndarray) -> list:
+    if not CASCADE_ENABLED:
+        logits = model_registry.predict(ENSEMBLE_MODEL, img_batch)
+        return [(row, ENSEMBLE_MODEL) for row in logits]
+
+    logits = np.array(model_registry.predict(CASCADE_MODEL, img_batch))
+    stages = [CASCADE_MODEL] * len(logits)
+
+    escalate = np.flatnonzero(softmax(logits).max(axis=1) < CASCADE_THRESHOLD)
+    if len(escalate):
+        logits[escalate] = model_registry.predict(ENSEMBLE_MODEL, img_batch[escalate])
+        for i in escalate:
+            stages[i] = ENSEMBLE_MODEL
+
+    return list(zip(logits, stages))
+
+
+def format_prediction(pred: np.ndarray, stage: str = ENSEMBLE_MODEL) -> dict:
+    """Turn one row of model logits into the prediction response"""
+    with stage_timer("postprocess"):
+        predictions_total.labels(stage).inc()
+        return _format_prediction(pred, stage)
+
+
+def _format_prediction(pred: np.ndarray, stage: str) -> dict:
+    # Apply softmax to get probabilities
+    probs = softmax(pred)
+    probs_rounded = np.round(probs, 4)
+
+    # Get predicted class
+    res_index = int(np.argmax(pred))
+    predicted_class = diagnoses[res_index]
+
+    return {
+        "predicted_class": predicted_class,
+        "probabilities": {
+            diagnoses[i]: float(probs_rounded[i]) for i in range(len(diagnoses))
+        },
+        "stage": stage,
+    }
+
+
+def predict_tta(img_arrays: list, tta: int) -> list:
+    """Test-time augmentation: all views of all images in one ensemble batch.
+
+    Returns the mean probabilities over the views, and the per-view variance
+    of each class probability; ``uncertainty`` is the variance of the
+    predicted class.
+    """
+    with stage_timer("preprocess"):
+        views = np.concatenate([augment_views(img_array, tta) for img_array in img_arrays])
+    forward_batch_size.observe(len(views))
+    with stage_timer("forward"):
+        logits = np.asarray(model_registry.predict(ENSEMBLE_MODEL, views))
+    predictions_total.labels(f"{ENSEMBLE_MODEL}+tta{tta}").inc(len(img_arrays))
+    probs = softmax(logits).reshape(len(img_arrays), tta, -1)
+
+    results = []
+    for mean, variance in zip(probs.mean(axis=1), probs.var(axis=1)):
+        res_index = int(np.argmax(mean))
+        results.append({
+            "predicted_class": diagnoses[res_index],
+            "probabilities": {
+                diagnoses[i]: float(np.round(mean[i], 4)) for i in range(len(diagnoses))
+            },
+            "stage": f"{ENSEMBLE_MODEL}+tta{tta}",
+            "variance": {
+                diagnoses[i]: float(np.round(variance[i], 6)) for i in range(len(diagnoses))
+            },
+            "uncertainty": float(np.round(variance[res_index], 6)),
+        })
+    return results
+
+
+# Concurrent requests share forward passes through the micro-batcher
+batcher = MicroBatcher(predict_batch)
+
+# Repeated uploads of the same image are answered from the cache
+prediction_cache = PredictionCache()
+
+
+def make_prediction(image_bytes: bytes, tta: int = 0) -> dict:
+    """Make prediction on an uploaded MRI image, optionally averaged over ``tta`` views"""
+    img_array = decode_image(image_bytes)
+    key = make_cache_key(img_array, get_model_version(tta))
+    if tta:
+        return prediction_cache.get_or_compute(key, lambda: predict_tta([img_array], tta)[0])
+    return prediction_cache.get_or_compute(
+        key, lambda: format_prediction(*batcher.predict(img_array))
+    )
+
+
+def decode_images(images: list) -> list:
+    """Decode a list of (filename, bytes) uploads in parallel"""
+    def decode(item):
+        filename, image_bytes = item
+        try:
+            return decode_image(image_bytes)
+        except ImageDecodeError as e:
+            raise ImageDecodeError(f"Could not decode image: {filename}") from e
+
+    return list(decode_executor.map(decode, images))
+
+
+def iter_batch_predictions(img_arrays: list, tta: int = 0):
+    """Yield [(index, prediction), ...] per model batch as soon as it finishes.
+
+    Cached images come first as one group; the rest run in batches of
+    batcher.max_batch_size (with TTA, as many images as fit with their views).
+    """
+    model_version = get_model_version(tta)
+    keys = [make_cache_key(img_array, model_version) for img_array in img_arrays]
+    cached = [(i, prediction_cache.get(key)) for i, key in enumerate(keys)]
+    missing = [i for i, result in cached if result is None]
+    cached = [(i, result) for i, result in cached if result is not None]
+    if cached:
+        yield cached
+
+    chunk_size = max(1, batcher.max_batch_size // tta) if tta else batcher.max_batch_size
+    for start in range(0, len(missing), chunk_size):
+        chunk = missing[start:start + chunk_size]
+        if tta:
+            predictions = predict_tta([img_arrays[i] for i in chunk], tta)
+        else:
+            predictions = [format_prediction(*pred) for pred in predict_batch(np.stack([img_arrays[i] for i in chunk]))]
+        results = []
+        for i, result in zip(chunk, predictions):
+            prediction_cache.put(keys[i], result)
+            results.append((i, result))
+        yield results
+
+
+def make_batch_prediction(images: list, tta: int = 0) -> list:
+    """Predict a list of (filename, bytes) uploads in model-sized batches"""
+    img_arrays = decode_images(images)
+    results = [None] * len(img_arrays)
+    for batch in iter_batch_predictions(img_arrays, tta):
+        for i, result in batch:
+            results[i] = result
+    return results
+
+
+def aggregate_predictions(results: list) -> dict:
+    """Combine per-image predictions into a study-level prediction"""
+    probs = np.mean(
+        [[r["probabilities"][d] for d in diagnoses] for r in results], axis=0
+    )
+    votes = {d: 0 for d in diagnoses}
+    for r in results:
+        votes[r["predicted_class"]] += 1
+
+    return {
+        "predicted_class": diagnoses[int(np.argmax(probs))],
+        "probabilities": {
+            diagnoses[i]: float(np.round(probs[i], 4)) for i in range(len(diagnoses))
+        },
+        "votes": votes,
+    }
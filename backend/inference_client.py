@@ -0,0 +1,208 @@
+"""How the API reaches the models: in-process, or over HTTP to inference_server.py.
+
+Both clients have the same async interface (predict, predict_batch,
+open_stream, ready, start, close, stats) and raise the same exceptions, so
+routes/analysis.py doesn't know which one it is talking to. INFERENCE_MODE
+picks one: ``local`` (and ``off``) use the in-process stand-in, ``remote``
+the pooled HTTP client.
+"""
+import asyncio
+import json
+import os
+import threading
+
+from inference import make_prediction, make_batch_prediction, decode_images, iter_batch_predictions, ImageDecodeError
+from inference_pool import inference_pool, InferenceQueueFull
+from model_registry import model_registry, INFERENCE_MODE
+
+INFERENCE_SERVER_URL = os.getenv("INFERENCE_SERVER_URL", "http://localhost:8001")
+INFERENCE_CLIENT_TIMEOUT_SECONDS = float(os.getenv("INFERENCE_CLIENT_TIMEOUT_SECONDS", "60"))
+INFERENCE_CLIENT_CONNECT_TIMEOUT_SECONDS = float(os.getenv("INFERENCE_CLIENT_CONNECT_TIMEOUT_SECONDS", "2"))
+# Predictions are idempotent, so connection failures and 502/503/504 are retried
+INFERENCE_CLIENT_RETRIES = int(os.getenv("INFERENCE_CLIENT_RETRIES", "2"))
+INFERENCE_CLIENT_RETRY_BACKOFF_SECONDS = float(os.getenv("INFERENCE_CLIENT_RETRY_BACKOFF_SECONDS", "0.2"))
+INFERENCE_CLIENT_MAX_CONNECTIONS = int(os.getenv("INFERENCE_CLIENT_MAX_CONNECTIONS", "32"))
+
+RETRY_STATUS_CODES = (502, 503, 504)
+
+
+class InferenceUnavailable(Exception):
+    """The inference server could not be reached or failed the request"""
+
+
+class LocalInferenceClient:
+    """In-process stand-in: runs the models in this process's inference pool"""
+
+    mode = "local"
+
+    async def predict(self, image_bytes: bytes, tta: int = 0) -> dict:
+        return await inference_pool.run(make_prediction, image_bytes, tta)
+
+    async def predict_batch(self, images: list, tta: int = 0) -> list:
+        return await inference_pool.run(make_batch_prediction, images, tta)
+
+    async def open_stream(self, images: list, tta: int = 0):
+        """Decode every image (raising ImageDecodeError up front), then stream batches"""
+        img_arrays = await inference_pool.run(decode_images, images)
+        batches = iter_batch_predictions(img_arrays, tta)
+
+        async def stream():
+            while True:
+                batch = await inference_pool.run(next, batches, None)
+                if batch is None:
+                    return
+                yield batch
+
+        return stream()
+
+    async def ready(self) -> bool:
+        return model_registry.ready
+
+    def start(self):
+        # Load and warm up models in the background; /health/ready reports
+        # when they can serve without first-request latency
+        threading.Thread(target=model_registry.warm_up_all, name="model-warmup", daemon=True).start()
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"mode": INFERENCE_MODE}
+
+
+class RemoteInferenceClient:
+    """Keep-alive HTTP client for inference_server.py with timeouts and retries"""
+
+    mode = "remote"
+
+    def __init__(self, base_url: str = INFERENCE_SERVER_URL):
+        self.base_url = base_url.rstrip("/")
+        self._client = None
+        self._loop = None
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+
+    def client(self):
+        # Connections belong to one event loop (test clients may start several)
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            import httpx
+
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(INFERENCE_CLIENT_TIMEOUT_SECONDS, connect=INFERENCE_CLIENT_CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(
+                    max_connections=INFERENCE_CLIENT_MAX_CONNECTIONS,
+                    max_keepalive_connections=INFERENCE_CLIENT_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    async def send(self, method: str, path: str, stream: bool = False, **kwargs):
+        """Send with retries; returns a successful response or raises the mapped error"""
+        import httpx
+
+        self._requests += 1
+        for attempt in range(INFERENCE_CLIENT_RETRIES + 1):
+            if attempt:
+                self._retries += 1
+                await asyncio.sleep(INFERENCE_CLIENT_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            try:
+                client = self.client()
+                response = await client.send(client.build_request(method, path, **kwargs), stream=stream)
+            except httpx.TransportError as e:
+                error = InferenceUnavailable(f"Inference server unreachable: {e!r}")
+                continue
+            if response.status_code in RETRY_STATUS_CODES and attempt < INFERENCE_CLIENT_RETRIES:
+                await response.aclose()
+                continue
+            if response.status_code >= 400:
+                if stream:
+                    await response.aread()
+                    await response.aclose()
+                self._failures += 1
+                is_json = response.headers.get("content-type", "").startswith("application/json")
+                raise self.error_for(response.status_code, response.json().get("detail") if is_json else response.text)
+            return response
+        self._failures += 1
+        raise error
+
+    @staticmethod
+    def error_for(status_code: int, detail: str) -> Exception:
+        if status_code == 400:
+            return ImageDecodeError(detail)
+        if status_code == 503:
+            return InferenceQueueFull()
+        return InferenceUnavailable(f"Inference server error {status_code}: {detail}")
+
+    @staticmethod
+    def multipart(images: list) -> list:
+        return [("files", (filename or "image", data, "application/octet-stream")) for filename, data in images]
+
+    async def predict(self, image_bytes: bytes, tta: int = 0) -> dict:
+        response = await self.send(
+            "POST", "/predict", params={"tta": tta}, content=image_bytes,
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        return response.json()
+
+    async def predict_batch(self, images: list, tta: int = 0) -> list:
+        response = await self.send("POST", "/predict-batch", params={"tta": tta}, files=self.multipart(images))
+        return response.json()["results"]
+
+    async def open_stream(self, images: list, tta: int = 0):
+        """The server decodes before it starts streaming, so a bad image fails here"""
+        response = await self.send(
+            "POST", "/predict-stream", stream=True, params={"tta": tta}, files=self.multipart(images)
+        )
+
+        async def stream():
+            try:
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    message = json.loads(line)
+                    if "error" in message:
+                        raise self.error_for(message["error"]["status"], message["error"]["detail"])
+                    yield [(i, result) for i, result in message["batch"]]
+            finally:
+                await response.aclose()
+
+        return stream()
+
+    async def ready(self) -> bool:
+        import httpx
+
+        try:
+            response = await self.client().get("/health/ready", timeout=INFERENCE_CLIENT_CONNECT_TIMEOUT_SECONDS)
+        except httpx.TransportError:
+            return False
+        return response.status_code == 200
+
+    def start(self):
+        pass
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "url": self.base_url,
+            "requests": self._requests,
+            "retries": self._retries,
+            "failures": self._failures,
+        }
+
+
+def make_inference_client():
+    if INFERENCE_MODE == "remote":
+        return RemoteInferenceClient()
+    return LocalInferenceClient()
+
+
+inference_client = make_inference_client()
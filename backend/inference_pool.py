@@ -0,0 +1,87 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from batching import MAX_BATCH_SIZE
+
+# Worker pool configuration. Workers block on the micro-batcher while their
+# request is in flight, so the default matches the maximum batch size.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(MAX_BATCH_SIZE)))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "64"))
+INFERENCE_RETRY_AFTER_SECONDS = int(os.getenv("INFERENCE_RETRY_AFTER_SECONDS", "5"))
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference pool cannot accept more work"""
+
+
+class InferencePool:
+    """Bounded thread pool that keeps blocking inference off the event loop.
+
+    At most ``workers`` jobs run at once and at most ``queue_size`` more wait
+    for a free worker. Anything beyond that is rejected immediately with
+    ``InferenceQueueFull`` so the API can answer 503 instead of piling up.
+    """
+
+    def __init__(self, workers: int = INFERENCE_WORKERS, queue_size: int = INFERENCE_QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn`` in the pool and await its result without blocking the loop"""
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                self._rejected += 1
+                raise InferenceQueueFull()
+            self._pending += 1
+
+        # The slot is released when the job finishes (or is cancelled before
+        # it starts), not when the awaiting request goes away
+        future = self._executor.submit(partial(self._call, fn, *args, **kwargs))
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def _call(self, fn, *args, **kwargs):
+        with self._lock:
+            self._running += 1
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._running -= 1
+        with self._lock:
+            self._completed += 1
+        return result
+
+    def stats(self) -> dict:
+        """Pool occupancy and backpressure counters"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "running": self._running,
+                "queued": max(0, self._pending - self._running),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
+
+
+inference_pool = InferencePool()
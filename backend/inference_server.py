@@ -0,0 +1,146 @@
+"""Standalone inference service: owns the models, micro-batcher and prediction cache.
+
+Run one per inference host and point the API at it with INFERENCE_MODE=remote
+and INFERENCE_SERVER_URL; the API then only does auth, validation and
+database work.
+
+    python inference_server.py              # INFERENCE_SERVER_HOST / INFERENCE_SERVER_PORT
+    uvicorn inference_server:app --port 8001
+
+Endpoints take raw image bytes (/predict) or multipart ``files``
+(/predict-batch, /predict-stream) and return the same prediction dicts as
+inference.py. 400 means an image could not be decoded, 503 that the
+inference pool is full.
+"""
+from contextlib import asynccontextmanager
+import json
+import os
+from typing import List
+
+from fastapi import FastAPI, File, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from cpu_tuning import cpu_config
+from inference import batcher, prediction_cache, ImageDecodeError, TTA_MAX_VIEWS
+from inference_client import LocalInferenceClient
+from inference_pool import inference_pool, InferenceQueueFull, INFERENCE_RETRY_AFTER_SECONDS
+from metrics import MetricsMiddleware, render_metrics, stage_timer
+from model_registry import model_registry
+
+INFERENCE_SERVER_HOST = os.getenv("INFERENCE_SERVER_HOST", "0.0.0.0")
+INFERENCE_SERVER_PORT = int(os.getenv("INFERENCE_SERVER_PORT", "8001"))
+
+# The server always runs the models itself, whatever INFERENCE_MODE says
+local = LocalInferenceClient()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not model_registry.enabled:
+        raise SystemExit("inference_server.py runs inference; unset INFERENCE_MODE=off for it")
+    local.start()
+    yield
+
+
+app = FastAPI(title="MRI Inference Service", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(ImageDecodeError)
+async def image_decode_error(request: Request, e: ImageDecodeError):
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(e)})
+
+
+@app.exception_handler(InferenceQueueFull)
+async def inference_queue_full(request: Request, e: InferenceQueueFull):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Inference queue is full, please retry later"},
+        headers={"Retry-After": str(INFERENCE_RETRY_AFTER_SECONDS)},
+    )
+
+
+def tta_query():
+    return Query(0, ge=0, le=TTA_MAX_VIEWS)
+
+
+async def read_files(files: List[UploadFile]) -> list:
+    images = []
+    with stage_timer("receive"):
+        for file in files:
+            try:
+                images.append((file.filename or "", await file.read()))
+            finally:
+                await file.close()
+    return images
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Models are loaded and warmed up"""
+    if not await local.ready():
+        return JSONResponse(status_code=503, content={"status": "starting", "models": model_registry.stats()})
+    return {"status": "ready", "models": model_registry.stats()}
+
+
+@app.get("/stats")
+async def get_stats():
+    return {
+        "models": model_registry.stats(),
+        "pool": inference_pool.stats(),
+        "batcher": batcher.stats(),
+        "cache": prediction_cache.stats(),
+        "cpu": cpu_config.stats(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.post("/predict")
+async def predict(request: Request, tta: int = tta_query()):
+    """Predict one image sent as the raw request body"""
+    with stage_timer("receive"):
+        image_bytes = await request.body()
+    if not image_bytes:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty request body")
+    return await local.predict(image_bytes, tta)
+
+
+@app.post("/predict-batch")
+async def predict_batch(files: List[UploadFile] = File(...), tta: int = tta_query()):
+    """Predict a study; results are in upload order"""
+    images = await read_files(files)
+    return {"results": await local.predict_batch(images, tta)}
+
+
+@app.post("/predict-stream")
+async def predict_stream(files: List[UploadFile] = File(...), tta: int = tta_query()):
+    """Predict a study as newline-delimited JSON, one ``batch`` line per model batch.
+
+    Images are decoded before the response starts, so a bad upload is a 400;
+    failures after that are sent as a final ``error`` line.
+    """
+    images = await read_files(files)
+    batches = await local.open_stream(images, tta)
+
+    async def lines():
+        try:
+            async for batch in batches:
+                yield json.dumps({"batch": batch}) + "\n"
+        except InferenceQueueFull:
+            yield json.dumps({"error": {"status": 503, "detail": "Inference queue is full"}}) + "\n"
+        except Exception as e:
+            print(f"Streaming inference failed: {e}")
+            yield json.dumps({"error": {"status": 500, "detail": "Inference failed"}}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=INFERENCE_SERVER_HOST, port=INFERENCE_SERVER_PORT)
@@ -36,9 +36,56 @@ CREATE TABLE IF NOT EXISTS mri_analyses (
     image_path TEXT,
     predicted_class VARCHAR(255),
     probabilities JSONB,
+    stage VARCHAR(50),
+    uncertainty DOUBLE PRECISION,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Columns added after the initial schema (no-ops on fresh databases)
+ALTER TABLE mri_analyses ADD COLUMN IF NOT EXISTS stage VARCHAR(50);
+ALTER TABLE mri_analyses ADD COLUMN IF NOT EXISTS uncertainty DOUBLE PRECISION;
+
+-- Create analysis job queue (claimed by worker.py with FOR UPDATE SKIP LOCKED)
+CREATE TABLE IF NOT EXISTS analysis_jobs (
+    id SERIAL PRIMARY KEY,
+    patient_id INTEGER NOT NULL REFERENCES patients(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    filename VARCHAR(500) NOT NULL DEFAULT '',
+    image_key VARCHAR(100),
+    image_data BYTEA,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    locked_until TIMESTAMP,
+    worker_id VARCHAR(255),
+    last_error TEXT,
+    analysis_id INTEGER REFERENCES mri_analyses(id) ON DELETE SET NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+ALTER TABLE analysis_jobs ADD COLUMN IF NOT EXISTS image_key VARCHAR(100);
+
+-- Create shadow evaluation queue (sampled analyses re-scored by shadow_worker.py)
+CREATE TABLE IF NOT EXISTS shadow_predictions (
+    id SERIAL PRIMARY KEY,
+    analysis_id INTEGER REFERENCES mri_analyses(id) ON DELETE SET NULL,
+    image_key VARCHAR(100) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    primary_class VARCHAR(255) NOT NULL,
+    primary_probabilities VARCHAR(1000) NOT NULL,
+    primary_stage VARCHAR(50),
+    primary_latency_ms DOUBLE PRECISION,
+    candidate_version VARCHAR(255),
+    candidate_class VARCHAR(255),
+    candidate_probabilities VARCHAR(1000),
+    candidate_latency_ms DOUBLE PRECISION,
+    locked_until TIMESTAMP,
+    worker_id VARCHAR(255),
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    scored_at TIMESTAMP
+);
+
 -- Create refresh_tokens table
 CREATE TABLE IF NOT EXISTS refresh_tokens (
     id SERIAL PRIMARY KEY,
@@ -53,3 +100,5 @@ CREATE INDEX IF NOT EXISTS idx_patients_doctor_id ON patients(doctor_id);
 CREATE INDEX IF NOT EXISTS idx_analysis_patient_id ON mri_analyses(patient_id);
 CREATE INDEX IF NOT EXISTS idx_doctors_email ON doctors(email);
 CREATE INDEX IF NOT EXISTS idx_refresh_tokens_doctor_id ON refresh_tokens(doctor_id);
+CREATE INDEX IF NOT EXISTS idx_analysis_jobs_claim ON analysis_jobs(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_shadow_predictions_claim ON shadow_predictions(status, created_at);
@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+import json
+import os
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from models import AnalysisJob, MRIAnalysis, Patient
+from metrics import stage_timer
+
+# A claimed job that isn't finished within this time is handed to another worker
+JOB_VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Retry backoff: JOB_RETRY_DELAY_SECONDS * 2 ** (attempt - 1)
+JOB_RETRY_DELAY_SECONDS = int(os.getenv("JOB_RETRY_DELAY_SECONDS", "10"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1.0"))
+JOB_CLAIM_BATCH_SIZE = int(os.getenv("JOB_CLAIM_BATCH_SIZE", "16"))
+
+
+def enqueue_job(db: Session, patient_id: int, filename: str, image_key: str) -> AnalysisJob:
+    """Queue an analysis of an image already written to the blob store"""
+    job = AnalysisJob(
+        patient_id=patient_id,
+        filename=filename,
+        image_key=image_key,
+        max_attempts=JOB_MAX_ATTEMPTS,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def claim_jobs(db: Session, worker_id: str, limit: int = JOB_CLAIM_BATCH_SIZE) -> list:
+    """Claim up to ``limit`` runnable jobs; returns plain dicts with the image key.
+
+    Rows are locked with FOR UPDATE SKIP LOCKED so concurrent workers never
+    claim the same job. Running jobs whose visibility timeout has expired
+    (their worker died or hung) are claimed again.
+    """
+    now = datetime.utcnow()
+    jobs = db.query(AnalysisJob).filter(
+        or_(
+            and_(
+                AnalysisJob.status == "queued",
+                or_(AnalysisJob.locked_until.is_(None), AnalysisJob.locked_until <= now)
+            ),
+            and_(AnalysisJob.status == "running", AnalysisJob.locked_until <= now)
+        )
+    ).order_by(AnalysisJob.created_at).limit(limit).with_for_update(skip_locked=True).all()
+
+    claimed = []
+    for job in jobs:
+        if job.attempts >= job.max_attempts:
+            # Timed out on its last attempt
+            job.status = "failed"
+            job.last_error = job.last_error or "Visibility timeout exceeded"
+            job.image_data = None
+            job.finished_at = now
+            continue
+
+        job.status = "running"
+        job.attempts += 1
+        job.worker_id = worker_id
+        job.locked_until = now + timedelta(seconds=JOB_VISIBILITY_TIMEOUT_SECONDS)
+        job.started_at = now
+        claimed.append({
+            "id": job.id,
+            "patient_id": job.patient_id,
+            "filename": job.filename,
+            "image_key": job.image_key,
+            "image_data": job.image_data,
+        })
+
+    db.commit()
+    return claimed
+
+
+def _lock_own_job(db: Session, job_id: int, worker_id: str):
+    """The job row, if this worker still holds it"""
+    return db.query(AnalysisJob).filter(
+        AnalysisJob.id == job_id,
+        AnalysisJob.status == "running",
+        AnalysisJob.worker_id == worker_id
+    ).with_for_update().first()
+
+
+def complete_job(db: Session, job_id: int, worker_id: str, result: dict):
+    """Write the MRIAnalysis for a finished job; returns None if the job was reclaimed"""
+    job = _lock_own_job(db, job_id, worker_id)
+    if not job:
+        db.rollback()
+        return None
+
+    analysis = MRIAnalysis(
+        patient_id=job.patient_id,
+        image_path=job.image_key or job.filename,
+        predicted_class=result["predicted_class"],
+        probabilities=json.dumps(result["probabilities"]),
+        stage=result["stage"]
+    )
+    db.add(analysis)
+    db.flush()
+
+    # Update patient's disease field with the predicted class
+    patient = db.query(Patient).filter(Patient.id == job.patient_id).first()
+    if patient:
+        patient.disease = result["predicted_class"]
+
+    job.status = "done"
+    job.analysis_id = analysis.id
+    job.image_data = None
+    job.locked_until = None
+    job.last_error = None
+    job.finished_at = datetime.utcnow()
+    with stage_timer("db_write"):
+        db.commit()
+    return analysis
+
+
+def fail_job(db: Session, job_id: int, worker_id: str, error: str, retryable: bool = True):
+    """Requeue a job with backoff, or mark it failed when out of attempts"""
+    job = _lock_own_job(db, job_id, worker_id)
+    if not job:
+        db.rollback()
+        return None
+
+    now = datetime.utcnow()
+    job.last_error = error
+    if retryable and job.attempts < job.max_attempts:
+        job.status = "queued"
+        job.locked_until = now + timedelta(seconds=JOB_RETRY_DELAY_SECONDS * 2 ** (job.attempts - 1))
+    else:
+        job.status = "failed"
+        job.image_data = None
+        job.locked_until = None
+        job.finished_at = now
+    db.commit()
+    return job
+
+
+def queue_stats(db: Session) -> dict:
+    """Queue depth per status, age of the oldest queued job and expired leases"""
+    now = datetime.utcnow()
+    counts = dict(
+        db.query(AnalysisJob.status, func.count(AnalysisJob.id)).group_by(AnalysisJob.status).all()
+    )
+    oldest_queued = db.query(func.min(AnalysisJob.created_at)).filter(
+        AnalysisJob.status == "queued"
+    ).scalar()
+    expired = db.query(func.count(AnalysisJob.id)).filter(
+        AnalysisJob.status == "running",
+        AnalysisJob.locked_until <= now
+    ).scalar()
+
+    return {
+        "depth": counts.get("queued", 0),
+        "by_status": {s: counts.get(s, 0) for s in ("queued", "running", "done", "failed")},
+        "oldest_queued_age_seconds": round((now - oldest_queued).total_seconds(), 1) if oldest_queued else 0.0,
+        "expired_leases": expired or 0,
+    }
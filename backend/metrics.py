@@ -0,0 +1,137 @@
+from contextlib import contextmanager
+import time
+
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+# Analysis pipeline stages, in request order:
+#   receive     reading the upload into memory
+#   decode      image bytes -> PIL image
+#   preprocess  RGB conversion, resize and normalization
+#   forward     model forward pass (per batch)
+#   postprocess softmax, rounding and response formatting
+#   store       writing the upload to the blob store
+#   db_write    SQLAlchemy flush/commit of the analysis rows
+ANALYSIS_STAGES = ("receive", "decode", "preprocess", "forward", "postprocess", "store", "db_write")
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+analysis_stage_seconds = Histogram(
+    "mri_analysis_stage_seconds", "Time spent per analysis pipeline stage", ["stage"], buckets=STAGE_BUCKETS
+)
+http_request_seconds = Histogram(
+    "mri_http_request_duration_seconds", "HTTP request latency per route", ["method", "route", "status"]
+)
+http_requests_in_flight = Gauge("mri_http_requests_in_flight", "HTTP requests currently being handled")
+forward_batch_size = Histogram(
+    "mri_forward_batch_size", "Images per model forward pass", buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+predictions_total = Counter("mri_predictions_total", "Predictions computed (cache misses)", ["model"])
+
+# Label lookups are resolved once so the hot path is a single observe()
+stage_histograms = {stage: analysis_stage_seconds.labels(stage) for stage in ANALYSIS_STAGES}
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Record the duration of the enclosed block under an analysis stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_histograms[stage].observe(time.perf_counter() - started)
+
+
+class ServingCollector:
+    """Scrape-time gauges for models and the inference queues"""
+
+    def describe(self):
+        # Nothing to describe up front; keeps registration from calling collect()
+        return []
+
+    def collect(self):
+        from model_registry import model_registry
+
+        load_seconds = GaugeMetricFamily("mri_model_load_seconds", "Model load time", labels=["model", "backend"])
+        warmed_up = GaugeMetricFamily("mri_model_warmed_up", "1 once the model is warmed up", labels=["model"])
+        for name, stats in model_registry.stats().items():
+            if stats["load_seconds"] is not None:
+                load_seconds.add_metric([name, stats["backend"]], stats["load_seconds"])
+            warmed_up.add_metric([name], 1.0 if stats["warmed_up"] else 0.0)
+        yield load_seconds
+        yield warmed_up
+
+        from inference_pool import inference_pool
+        from inference import batcher
+
+        pool_stats = inference_pool.stats()
+        inference = GaugeMetricFamily("mri_inference_pool_tasks", "Inference pool tasks", labels=["state"])
+        inference.add_metric(["running"], pool_stats["running"])
+        inference.add_metric(["queued"], pool_stats["queued"])
+        yield inference
+        yield GaugeMetricFamily("mri_batcher_queue_depth", "Images waiting in the micro-batcher",
+                                value=batcher.stats()["queue_depth"])
+
+
+REGISTRY.register(ServingCollector())
+
+
+class DatabaseCollector:
+    """Scrape-time gauges for the SQLAlchemy pool.
+
+    Registered by main.py only: the inference server has no database, and
+    importing it from a scrape would block on the connection retry loop.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        pool = self.engine.pool
+        if hasattr(pool, "checkedout"):
+            db_pool = GaugeMetricFamily("mri_db_pool_connections", "SQLAlchemy pool connections", labels=["state"])
+            db_pool.add_metric(["checked_out"], pool.checkedout())
+            db_pool.add_metric(["checked_in"], pool.checkedin())
+            db_pool.add_metric(["overflow"], pool.overflow())
+            db_pool.add_metric(["size"], pool.size())
+            yield db_pool
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            # Route templates (/api/analysis/predict/{patient_id}) keep label cardinality bounded
+            route = scope.get("route")
+            http_request_seconds.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status_code)
+            ).observe(time.perf_counter() - started)
+
+
+def render_metrics():
+    """Prometheus text exposition of the default registry"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,260 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from ai.preprocessing import read_resize_mode
+from batching import MAX_BATCH_SIZE
+from cpu_tuning import cpu_config
+
+# Batch sizes traced during warm-up so the first real requests don't pay for it
+MODEL_WARMUP_BATCH_SIZES = [
+    int(size) for size in os.getenv("MODEL_WARMUP_BATCH_SIZES", f"1,4,{MAX_BATCH_SIZE}").split(",") if size.strip()
+]
+
+# Serving backend: "keras" runs the .keras file, "savedmodel" runs the
+# serving export from ai/export_serving.py, "tflite" runs the variant
+# exported by ai/export_tflite.py (float32, float16 or int8)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "keras")
+TFLITE_QUANTIZATION = os.getenv("TFLITE_QUANTIZATION", "int8")
+
+ENSEMBLE_MODEL = "ensemble"
+ENSEMBLE_MODEL_PATH = "ai/trained/MRI_ENSEMBLED.keras"
+
+# Cascade mode: the standalone CNN answers first and only images it is
+# unsure about (max softmax below the threshold) go to the ensemble
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "false").lower() in ("1", "true", "yes")
+CASCADE_THRESHOLD = float(os.getenv("CASCADE_THRESHOLD", "0.9"))
+CASCADE_MODEL = "cnn"
+CASCADE_MODEL_PATH = "ai/trained/MRI_CNN.keras"
+
+# "local" loads and runs the models in this process; "remote" sends
+# predictions to inference_server.py (see inference_client.py); "off" is
+# API-only (auth, patients, job submission): TensorFlow is never imported and
+# the analysis endpoints answer 503, leaving inference to worker.py
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "local")
+
+
+class InferenceDisabled(RuntimeError):
+    """A model was requested in an API-only process"""
+
+
+def current_rss_bytes():
+    """Resident set size of this process, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ModelEntry:
+    """One Keras model artifact: loaded at most once, then shared by every caller"""
+
+    backend = "keras"
+
+    def __init__(self, name: str, path: str, input_shape=(256, 256, 3), resize_mode: str = None):
+        self.name = name
+        self.path = path
+        self.input_shape = input_shape
+        # How the inputs were resized in training, from the .keras artifact's preprocessing file
+        self.resize_mode = resize_mode or read_resize_mode(path)
+        self.model = None
+        self.load_seconds = None
+        self.rss_bytes = None
+        self.warmup_seconds = {}
+        self.warmed_up = False
+        self.error = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            raise RuntimeError(f"Model file not found: {self.path}")
+
+        rss_before = current_rss_bytes()
+        started = time.perf_counter()
+        model = self.load_artifact()
+        self.load_seconds = time.perf_counter() - started
+        rss_after = current_rss_bytes()
+        if rss_before is not None and rss_after is not None:
+            self.rss_bytes = rss_after - rss_before
+        return model
+
+    def load_artifact(self):
+        from tensorflow.keras.models import load_model
+
+        return load_model(self.path)
+
+    def predict(self, img_batch: np.ndarray) -> np.ndarray:
+        return self.model.predict(img_batch, verbose=0)
+
+    @property
+    def version(self) -> str:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return "unknown"
+        return f"{os.path.basename(self.path)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "path": self.path,
+            "resize": self.resize_mode,
+            "loaded": self.model is not None,
+            "warmed_up": self.warmed_up,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "rss_mb": round(self.rss_bytes / 2**20, 1) if self.rss_bytes is not None else None,
+            "warmup_seconds": {str(k): round(v, 3) for k, v in self.warmup_seconds.items()},
+            "error": self.error,
+        }
+
+
+class TFLiteModelEntry(ModelEntry):
+    """A model exported to TFLite by ai/export_tflite.py"""
+
+    backend = "tflite"
+
+    def load_artifact(self):
+        from ai.tflite_runner import TFLiteRunner
+
+        return TFLiteRunner(self.path, num_threads=cpu_config.intra_op_threads or None)
+
+    def predict(self, img_batch: np.ndarray) -> np.ndarray:
+        return self.model.predict(img_batch)
+
+
+class SavedModelEntry(ModelEntry):
+    """A serving export from ai/export_serving.py, called through its fixed signature"""
+
+    backend = "savedmodel"
+
+    def load_artifact(self):
+        import tensorflow as tf
+
+        return tf.saved_model.load(self.path)
+
+    def predict(self, img_batch: np.ndarray) -> np.ndarray:
+        return self.model.serve(np.asarray(img_batch, dtype=np.float32)).numpy()
+
+    @property
+    def version(self) -> str:
+        try:
+            stat = os.stat(os.path.join(self.path, "saved_model.pb"))
+        except OSError:
+            return "unknown"
+        return f"{os.path.basename(self.path)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def serving_path(keras_path: str) -> str:
+    """Same naming as ai/export_serving.py: MRI_ENSEMBLED.serving"""
+    return f"{os.path.splitext(keras_path)[0]}.serving"
+
+
+def tflite_path(keras_path: str, quantization: str) -> str:
+    """Same naming as ai/export_tflite.py: MRI_ENSEMBLED.int8.tflite"""
+    return f"{os.path.splitext(keras_path)[0]}.{quantization}.tflite"
+
+
+class ModelRegistry:
+    """Process-wide registry that loads each model artifact exactly once"""
+
+    def __init__(self):
+        self._entries = {}
+
+    def register(self, name: str, path: str, input_shape=(256, 256, 3), backend: str = INFERENCE_BACKEND) -> ModelEntry:
+        """Register a Keras model path, served through the configured backend"""
+        # Exports share the preprocessing of the .keras artifact they were made from
+        resize_mode = read_resize_mode(path)
+        if backend == "tflite":
+            entry = TFLiteModelEntry(name, tflite_path(path, TFLITE_QUANTIZATION), input_shape, resize_mode)
+        elif backend == "savedmodel":
+            entry = SavedModelEntry(name, serving_path(path), input_shape, resize_mode)
+        elif backend == "keras":
+            entry = ModelEntry(name, path, input_shape, resize_mode)
+        else:
+            raise ValueError(f"Unknown inference backend: {backend}")
+        self._entries[name] = entry
+        return entry
+
+    def configure_cpu(self):
+        """Apply threading/affinity settings (see cpu_tuning.py) before any model loads"""
+        versions = "|".join(entry.version for entry in self._entries.values())
+        cpu_config.apply(versions, MAX_BATCH_SIZE)
+
+    @property
+    def enabled(self) -> bool:
+        return INFERENCE_MODE != "off"
+
+    def entry(self, name: str) -> ModelEntry:
+        """Return the loaded entry for ``name``, loading it on first use"""
+        if not self.enabled:
+            raise InferenceDisabled("Inference is disabled in this process (INFERENCE_MODE=off)")
+        entry = self._entries[name]
+        if entry.model is None:
+            self.configure_cpu()
+            with entry.lock:
+                if entry.model is None:
+                    try:
+                        entry.model = entry.load()
+                        entry.error = None
+                    except Exception as e:
+                        entry.error = str(e)
+                        raise
+        return entry
+
+    def get(self, name: str):
+        return self.entry(name).model
+
+    def predict(self, name: str, img_batch: np.ndarray) -> np.ndarray:
+        return self.entry(name).predict(img_batch)
+
+    def resize_mode(self, name: str) -> str:
+        """"pad" or "stretch": how inputs to ``name`` are resized (no model load needed)"""
+        return self._entries[name].resize_mode
+
+    def version(self, name: str) -> str:
+        """Identify a model so cached results never outlive it"""
+        return os.getenv("MODEL_VERSION") or self._entries[name].version
+
+    def warm_up(self, name: str, batch_sizes=None):
+        """Load ``name`` and trace forward passes at several batch sizes"""
+        entry = self.entry(name)
+        for batch_size in batch_sizes or MODEL_WARMUP_BATCH_SIZES:
+            started = time.perf_counter()
+            entry.predict(np.zeros((batch_size, *entry.input_shape), dtype=np.float32))
+            entry.warmup_seconds[batch_size] = time.perf_counter() - started
+        entry.warmed_up = True
+
+    def warm_up_all(self):
+        """Warm up every registered model, recording failures instead of raising"""
+        if not self.enabled:
+            print("✓ API-only mode: models are not loaded")
+            return
+        for name in self._entries:
+            try:
+                self.warm_up(name)
+                print(f"✓ Model '{name}' ready")
+            except Exception as e:
+                self._entries[name].error = str(e)
+                print(f"Failed to warm up model '{name}': {e}")
+
+    @property
+    def ready(self) -> bool:
+        return not self.enabled or all(entry.warmed_up for entry in self._entries.values())
+
+    def stats(self) -> dict:
+        return {name: entry.stats() for name, entry in self._entries.items()}
+
+
+model_registry = ModelRegistry()
+model_registry.register(ENSEMBLE_MODEL, ENSEMBLE_MODEL_PATH)
+if CASCADE_ENABLED:
+    model_registry.register(CASCADE_MODEL, CASCADE_MODEL_PATH)
+    # Both stages score the same decoded batch
+    if model_registry.resize_mode(CASCADE_MODEL) != model_registry.resize_mode(ENSEMBLE_MODEL):
+        raise RuntimeError(
+            f"{CASCADE_MODEL_PATH} and {ENSEMBLE_MODEL_PATH} were trained with different resizing; "
+            "retrain them together (ai/run_all.py --force)"
+        )
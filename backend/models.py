@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, LargeBinary, Float
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -60,6 +60,8 @@ class Patient(Base):
             "notes": self.notes,
             "createdAt": self.created_at.isoformat(),
             "url": latest_analysis.image_path if latest_analysis else "",
+            # Thumbnail of the latest MRI (needs the Bearer header); the full image is at .../image
+            "thumbnailUrl": f"/api/analysis/analyses/{latest_analysis.id}/thumbnail" if latest_analysis else "",
         }
 
 
@@ -68,9 +70,11 @@ class MRIAnalysis(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
-    image_path = Column(String(500), nullable=False)
+    image_path = Column(String(500), nullable=False)  # Blob store content key (sha256:<hex>)
     predicted_class = Column(String(255), nullable=False)
     probabilities = Column(String(1000), nullable=False)  # JSON stored as string
+    stage = Column(String(50), nullable=True)  # Model that answered: "cnn" (cascade) or "ensemble"
+    uncertainty = Column(Float, nullable=True)  # Test-time augmentation variance, if TTA was used
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -89,10 +93,76 @@ class MRIAnalysis(Base):
             "imagePath": self.image_path,
             "predictedClass": self.predicted_class,
             "probabilities": probs,
+            "stage": self.stage,
+            "uncertainty": self.uncertainty,
             "createdAt": self.created_at.isoformat(),
         }
 
 
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued, running, done, failed
+    filename = Column(String(500), nullable=False, default="")
+    image_key = Column(String(100), nullable=True)  # Blob store content key of the upload
+    image_data = Column(LargeBinary, nullable=True)  # Jobs queued before the blob store; cleared once done
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    # Queued: not claimable before this time (retry backoff)
+    # Running: visibility timeout, after which another worker may reclaim it
+    locked_until = Column(DateTime, nullable=True)
+    worker_id = Column(String(255), nullable=True)
+    last_error = Column(Text, nullable=True)
+    analysis_id = Column(Integer, ForeignKey("mri_analyses.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    # Relationships
+    analysis = relationship("MRIAnalysis")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "patientId": self.patient_id,
+            "status": self.status,
+            "filename": self.filename,
+            "attempts": self.attempts,
+            "error": self.last_error,
+            "analysis": self.analysis.to_dict() if self.analysis else None,
+            "createdAt": self.created_at.isoformat(),
+            "finishedAt": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class ShadowPrediction(Base):
+    """A live analysis re-scored by a candidate model (see shadow.py)"""
+    __tablename__ = "shadow_predictions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    analysis_id = Column(Integer, ForeignKey("mri_analyses.id", ondelete="SET NULL"), nullable=True)
+    image_key = Column(String(100), nullable=False)
+    status = Column(String(20), nullable=False, default="queued", index=True)  # queued, running, done, failed
+    # What the live model answered
+    primary_class = Column(String(255), nullable=False)
+    primary_probabilities = Column(String(1000), nullable=False)  # JSON stored as string
+    primary_stage = Column(String(50), nullable=True)
+    # Filled in by shadow_worker.py; latencies are per image, measured on the worker
+    primary_latency_ms = Column(Float, nullable=True)
+    candidate_version = Column(String(255), nullable=True)
+    candidate_class = Column(String(255), nullable=True)
+    candidate_probabilities = Column(String(1000), nullable=True)
+    candidate_latency_ms = Column(Float, nullable=True)
+    # Running: visibility timeout, after which another worker may reclaim it
+    locked_until = Column(DateTime, nullable=True)
+    worker_id = Column(String(255), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    scored_at = Column(DateTime, nullable=True)
+
+
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
 
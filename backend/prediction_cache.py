@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+# Prediction cache configuration
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "1024"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "3600"))
+# Shared on-disk tier, disabled when empty
+PREDICTION_CACHE_DIR = os.getenv("PREDICTION_CACHE_DIR", "")
+
+
+def make_cache_key(img_array: np.ndarray, model_version: str) -> str:
+    """Content address for a decoded image under a given model version"""
+    digest = hashlib.sha256()
+    digest.update(model_version.encode())
+    digest.update(str(img_array.shape).encode())
+    digest.update(np.ascontiguousarray(img_array).tobytes())
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """In-process LRU + TTL prediction cache with singleflight coalescing.
+
+    Concurrent callers asking for the same key while it is being computed
+    wait on the first caller's result instead of running their own forward
+    pass. An optional directory tier lets several workers share results.
+    """
+
+    def __init__(self, max_entries: int = PREDICTION_CACHE_SIZE, ttl: float = PREDICTION_CACHE_TTL_SECONDS,
+                 disk_dir: str = PREDICTION_CACHE_DIR):
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl
+        self.disk_dir = disk_dir or None
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+
+    def get_or_compute(self, key: str, compute):
+        """Return the cached value for ``key`` or compute it exactly once"""
+        with self._lock:
+            value = self._get_memory(key)
+            if value is not None:
+                self._hits += 1
+                return value
+
+            inflight = self._inflight.get(key)
+            owner = inflight is None
+            if owner:
+                inflight = Future()
+                self._inflight[key] = inflight
+            else:
+                self._coalesced += 1
+
+        if not owner:
+            return inflight.result()
+
+        try:
+            value = self._get_disk(key)
+            if value is not None:
+                with self._lock:
+                    self._disk_hits += 1
+            else:
+                with self._lock:
+                    self._misses += 1
+                value = compute()
+                self._put_disk(key, value)
+            with self._lock:
+                self._put_memory(key, value)
+            inflight.set_result(value)
+            return value
+        except Exception as e:
+            inflight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def get(self, key: str):
+        """Look up ``key`` in memory then disk without computing; None on miss"""
+        with self._lock:
+            value = self._get_memory(key)
+            if value is not None:
+                self._hits += 1
+                return value
+        value = self._get_disk(key)
+        with self._lock:
+            if value is not None:
+                self._disk_hits += 1
+                self._put_memory(key, value)
+            else:
+                self._misses += 1
+        return value
+
+    def put(self, key: str, value):
+        """Store a value computed outside ``get_or_compute``"""
+        self._put_disk(key, value)
+        with self._lock:
+            self._put_memory(key, value)
+
+    def stats(self) -> dict:
+        """Hit/miss/coalesce counters"""
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses + self._coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "disk_tier": self.disk_dir is not None,
+                "inflight": len(self._inflight),
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "evictions": self._evictions,
+                "hit_ratio": round((lookups - self._misses) / lookups, 4) if lookups else 0.0,
+            }
+
+    def _get_memory(self, key):
+        # Called with self._lock held
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if self.ttl and time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put_memory(self, key, value):
+        # Called with self._lock held
+        if self.max_entries == 0:
+            return
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + ".json")
+
+    def _get_disk(self, key: str):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if self.ttl and time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _put_disk(self, key: str, value):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
@@ -1,70 +1,257 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, status
+from fastapi import APIRouter, BackgroundTasks, File, UploadFile, HTTPException, Depends, Header, Query, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
-from database import get_db
+from typing import List, Optional
+from database import get_db, SessionLocal
 from models import Patient, MRIAnalysis, Doctor
-from schemas import MRIAnalysisResponse
+from schemas import MRIAnalysisResponse, MRIBatchAnalysisResponse, StudyPrediction, SlicePrediction, VolumeAnalysisResponse
 from dependencies import get_current_doctor, get_current_patient
-import tempfile
-import shutil
+from inference_pool import inference_pool, InferenceQueueFull, INFERENCE_RETRY_AFTER_SECONDS
+from inference import (
+    batcher,
+    prediction_cache,
+    aggregate_predictions,
+    ImageDecodeError,
+    TTA_MAX_VIEWS,
+    diagnoses,
+)
+from inference_client import inference_client, InferenceUnavailable
+from model_registry import model_registry, INFERENCE_MODE
+from cpu_tuning import cpu_config
+from saliency import saliency_store, make_saliency_key
+from blob_store import blob_store, BlobNotFound, derivative_key, is_content_key
+from derivatives import derivative_pipeline
+from shadow import schedule_shadow, shadow_report, sampling_stats as shadow_sampling_stats
+from metrics import stage_timer
+from batching import MAX_BATCH_SIZE
+from contextlib import nullcontext
+from functools import partial
+import asyncio
+import io
 import json
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
-import numpy as np
+import zipfile
 import os
 
 router = APIRouter(prefix="/api/analysis", tags=["MRI Analysis"])
 
-# Load model once at startup
-predict_model = None
+IMAGE_CONTENT_TYPES = ["image/jpeg", "image/png", "image/jpg", "image/webp"]
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+ZIP_CONTENT_TYPES = ["application/zip", "application/x-zip-compressed"]
 
-diagnoses = ['glioma', 'meningioma', 'notumor', 'pituitary']
+# Multi-image study limits
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "128"))
+BATCH_MAX_UNCOMPRESSED_MB = int(os.getenv("BATCH_MAX_UNCOMPRESSED_MB", "512"))
 
+# DICOM series: slices are decoded and predicted DICOM_BATCH_SIZE at a time
+DICOM_MAX_SLICES = int(os.getenv("DICOM_MAX_SLICES", "1024"))
+DICOM_BATCH_SIZE = int(os.getenv("DICOM_BATCH_SIZE", str(MAX_BATCH_SIZE)))
 
-def load_prediction_model():
-    """Load the prediction model"""
-    global predict_model
-    if predict_model is None:
-        model_path = "ai/trained/MRI_ENSEMBLED.keras"
-        if os.path.exists(model_path):
-            predict_model = load_model(model_path)
+
+def ensure_inference_enabled():
+    """503 in API-only processes (INFERENCE_MODE=off), which never load models"""
+    if not model_registry.enabled:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Inference is not available on this server; use /api/analysis/jobs"
+        )
+
+
+def ensure_local_models():
+    """Grad-CAM needs the Keras model in this process, not behind the inference server"""
+    if INFERENCE_MODE != "local":
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Grad-CAM is only available when models run in the API process"
+        )
+
+
+def inference_http_error(e: Exception) -> HTTPException:
+    """Map an inference client error to its HTTP response"""
+    if isinstance(e, ImageDecodeError):
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if isinstance(e, InferenceQueueFull):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Inference queue is full, please retry later",
+            headers={"Retry-After": str(INFERENCE_RETRY_AFTER_SECONDS)},
+        )
+    print(f"Inference service error: {e}")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Inference service unavailable, please retry later",
+        headers={"Retry-After": str(INFERENCE_RETRY_AFTER_SECONDS)},
+    )
+
+
+async def run_inference(fn, *args):
+    """Call an inference client method, rejecting with 503 when it is saturated or down"""
+    ensure_inference_enabled()
+    try:
+        return await fn(*args)
+    except (ImageDecodeError, InferenceQueueFull, InferenceUnavailable) as e:
+        raise inference_http_error(e)
+
+
+async def run_prediction(image_bytes: bytes, tta: int = 0) -> dict:
+    """Predict a single uploaded image through the inference client"""
+    return await run_inference(inference_client.predict, image_bytes, tta)
+
+
+def tta_query():
+    return Query(
+        0, ge=0, le=TTA_MAX_VIEWS,
+        description="Test-time augmentation views averaged into the prediction (0 = off)"
+    )
+
+
+def extract_zip_images(data: bytes) -> list:
+    """Read (filename, bytes) image entries from a ZIP archive"""
+    images = []
+    total_size = 0
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for info in sorted(archive.infolist(), key=lambda i: i.filename):
+            name = info.filename
+            if info.is_dir() or name.startswith("__MACOSX/") or not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            total_size += info.file_size
+            if total_size > BATCH_MAX_UNCOMPRESSED_MB * 1024 * 1024:
+                raise ValueError(f"Archive exceeds {BATCH_MAX_UNCOMPRESSED_MB} MB uncompressed")
+            if len(images) >= BATCH_MAX_IMAGES:
+                raise ValueError(f"Too many images, maximum is {BATCH_MAX_IMAGES}")
+            images.append((name, archive.read(info)))
+    return images
+
+
+async def read_study_uploads(files: List[UploadFile]) -> list:
+    """Collect (filename, bytes) images from image uploads and/or ZIP archives"""
+    images = []
+    for file in files:
+        with stage_timer("receive"):
+            try:
+                data = await file.read()
+            finally:
+                await file.close()
+
+        filename = file.filename or ""
+        if file.content_type in ZIP_CONTENT_TYPES or filename.lower().endswith(".zip"):
+            try:
+                images.extend(await asyncio.to_thread(extract_zip_images, data))
+            except (zipfile.BadZipFile, ValueError) as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid ZIP archive {filename}: {e}"
+                )
+        elif file.content_type in IMAGE_CONTENT_TYPES:
+            images.append((filename, data))
         else:
-            raise RuntimeError("Model file not found")
-    return predict_model
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid file type for {filename}. Supported: JPEG, PNG, WebP, ZIP"
+            )
 
+    if not images:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No images found in upload"
+        )
+    if len(images) > BATCH_MAX_IMAGES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many images, maximum is {BATCH_MAX_IMAGES}"
+        )
+    return images
+
+
+async def store_images(images: list) -> list:
+    """Write (filename, bytes) uploads to the blob store and queue their thumbnails; returns the keys"""
+    with stage_timer("store"):
+        image_keys = await asyncio.to_thread(lambda: [blob_store.put(data) for _, data in images])
+    for image_key, (_, data) in zip(image_keys, images):
+        derivative_pipeline.schedule(image_key, data)
+    return image_keys
+
+
+def save_study(db: Session, patient: Patient, image_keys: list, results: list,
+               study: dict = None) -> MRIBatchAnalysisResponse:
+    """Store one analysis per image and the study-level diagnosis (by default aggregated from them)"""
+    study = study or aggregate_predictions(results)
+
+    analyses = [
+        MRIAnalysis(
+            patient_id=patient.id,
+            image_path=image_key,
+            predicted_class=result["predicted_class"],
+            probabilities=json.dumps(result["probabilities"]),
+            stage=result["stage"],
+            uncertainty=result.get("uncertainty")
+        )
+        for image_key, result in zip(image_keys, results)
+    ]
 
-def make_prediction(path_to_img: str) -> dict:
-    """Make prediction on an MRI image"""
-    model = load_prediction_model()
-    
-    # Load and preprocess image
-    img_to_predict = image.load_img(path_to_img, target_size=(256, 256))
-    img_array = image.img_to_array(img_to_predict)
-    img_array = img_array / 255.0
-    img_array = np.expand_dims(img_array, axis=0)
+    # Update patient's disease field with the study-level prediction
+    patient.disease = study["predicted_class"]
+
+    # One bulk INSERT for the whole study; build the response before commit
+    # expires the rows so it doesn't trigger a refresh per analysis
+    with stage_timer("db_write"):
+        db.add_all(analyses)
+        db.flush()
+        response = MRIBatchAnalysisResponse(
+            patientId=patient.id,
+            analyses=[MRIAnalysisResponse(**a.to_dict()) for a in analyses],
+            study=StudyPrediction(
+                predictedClass=study["predicted_class"],
+                probabilities=study["probabilities"],
+                votes=study["votes"],
+            ),
+        )
+        db.commit()
+
+    return response
 
-    # Predict
-    pred = model.predict(img_array)
 
-    # Apply softmax to get probabilities
-    probs = np.exp(pred) / np.sum(np.exp(pred), axis=1, keepdims=True)
-    probs_rounded = np.round(probs[0], 4)
+def sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-    # Get predicted class
-    res_index = int(np.argmax(pred[0]))
-    predicted_class = diagnoses[res_index]
 
+@router.get("/stats")
+async def get_inference_stats(current_doctor: Doctor = Depends(get_current_doctor)):
+    """Model, inference pool, micro-batcher and prediction cache statistics"""
     return {
-        "predicted_class": predicted_class,
-        "probabilities": {
-            diagnoses[i]: float(probs_rounded[i]) for i in range(len(diagnoses))
-        }
+        "models": model_registry.stats(),
+        "pool": inference_pool.stats(),
+        "batcher": batcher.stats(),
+        "cache": prediction_cache.stats(),
+        "gradcam": saliency_store.stats(),
+        "cpu": cpu_config.stats(),
+        "client": inference_client.stats(),
+        "blobs": blob_store.stats(),
+        "derivatives": derivative_pipeline.stats(),
+        "shadow": shadow_sampling_stats(),
     }
 
 
+@router.get("/shadow/report")
+async def get_shadow_report(
+    hours: Optional[float] = Query(None, gt=0, description="Only samples from the last N hours"),
+    candidate: Optional[str] = Query(None, description="Only samples scored by this candidate version"),
+    current_doctor: Doctor = Depends(get_current_doctor),
+    db: Session = Depends(get_db)
+):
+    """Agreement and latency of the shadow candidate model vs. the live one"""
+    return await asyncio.to_thread(shadow_report, db, hours, candidate)
+
+
 @router.post("/predict/{patient_id}", response_model=MRIAnalysisResponse)
 async def analyze_mri(
+    background_tasks: BackgroundTasks,
     patient_id: int,
     file: UploadFile = File(...),
+    tta: int = tta_query(),
     current_doctor: Doctor = Depends(get_current_doctor),
     db: Session = Depends(get_db)
 ):
@@ -83,55 +270,320 @@ async def analyze_mri(
         )
     
     # Validate image type
-    if file.content_type not in ["image/jpeg", "image/png", "image/jpg", "image/webp"]:
+    if file.content_type not in IMAGE_CONTENT_TYPES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid image type. Supported: JPEG, PNG, WebP"
         )
     
-    # Save uploaded file to temporary location
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-            shutil.copyfileobj(file.file, tmp)
-            tmp_path = tmp.name
-    finally:
-        file.file.close()
-    
-    try:
-        # Make prediction
-        prediction_result = make_prediction(tmp_path)
+    # Read upload into memory; decoding happens in the inference pool
+    with stage_timer("receive"):
+        try:
+            image_bytes = await file.read()
+        finally:
+            await file.close()
+
+    # Make prediction
+    prediction_result = await run_prediction(image_bytes, tta)
+    image_key, = await store_images([(file.filename, image_bytes)])
+
+    # Save analysis to database
+    analysis = MRIAnalysis(
+        patient_id=patient_id,
+        image_path=image_key,
+        predicted_class=prediction_result["predicted_class"],
+        probabilities=json.dumps(prediction_result["probabilities"]),
+        stage=prediction_result["stage"],
+        uncertainty=prediction_result.get("uncertainty")
+    )
+
+    # Update patient's disease field with the predicted class
+    patient.disease = prediction_result["predicted_class"]
+
+    with stage_timer("db_write"):
+        db.add(analysis)
+        db.commit()
+        db.refresh(analysis)
+
+    # Return response with parsed probabilities
+    response = MRIAnalysisResponse(**analysis.to_dict())
+    schedule_shadow(background_tasks, [response])
+    return response
 
-        # Save analysis to database
-        analysis = MRIAnalysis(
-            patient_id=patient_id,
-            image_path=tmp_path,
-            predicted_class=prediction_result["predicted_class"],
-            probabilities=json.dumps(prediction_result["probabilities"])
+
+@router.post("/predict-batch/{patient_id}", response_model=MRIBatchAnalysisResponse)
+async def analyze_mri_batch(
+    background_tasks: BackgroundTasks,
+    patient_id: int,
+    files: List[UploadFile] = File(...),
+    tta: int = tta_query(),
+    current_doctor: Doctor = Depends(get_current_doctor),
+    db: Session = Depends(get_db)
+):
+    """Analyze a multi-image MRI study (image files and/or ZIP archives) for a patient"""
+
+    # Verify patient belongs to current doctor
+    patient = db.query(Patient).filter(
+        Patient.id == patient_id,
+        Patient.doctor_id == current_doctor.id
+    ).first()
+
+    if not patient:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Patient not found"
         )
 
-        # Update patient's disease field with the predicted class
-        patient.disease = prediction_result["predicted_class"]
+    images = await read_study_uploads(files)
+
+    # Decode in parallel and predict in model-sized batches
+    results = await run_inference(inference_client.predict_batch, images, tta)
+    response = save_study(db, patient, await store_images(images), results)
+    schedule_shadow(background_tasks, response.analyses)
+    return response
 
-        db.add(analysis)
-        db.commit()
-        db.refresh(analysis)
 
-        # Return response with parsed probabilities
-        return MRIAnalysisResponse(
-            id=analysis.id,
-            patientId=analysis.patient_id,
-            imagePath=analysis.image_path,
-            predictedClass=analysis.predicted_class,
-            probabilities=analysis.probabilities,
-            createdAt=analysis.created_at.isoformat()
+@router.post("/predict-stream/{patient_id}")
+async def analyze_mri_stream(
+    background_tasks: BackgroundTasks,
+    patient_id: int,
+    files: List[UploadFile] = File(...),
+    tta: int = tta_query(),
+    current_doctor: Doctor = Depends(get_current_doctor),
+    db: Session = Depends(get_db)
+):
+    """Analyze a multi-image study, streaming predictions as server-sent events.
+
+    Events: ``start`` (image count), one ``prediction`` per image as soon as
+    its batch finishes, then ``study`` with the saved analyses and aggregate
+    (same body as /predict-batch), or ``error``.
+    """
+
+    # Verify patient belongs to current doctor
+    patient = db.query(Patient).filter(
+        Patient.id == patient_id,
+        Patient.doctor_id == current_doctor.id
+    ).first()
+
+    if not patient:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Patient not found"
         )
 
-    finally:
-        # Clean up temporary file
+    images = await read_study_uploads(files)
+
+    # Undecodable uploads are rejected before the stream starts
+    batches = await run_inference(inference_client.open_stream, images, tta)
+
+    async def events():
+        yield sse_event("start", {"patientId": patient_id, "total": len(images)})
+
+        results = [None] * len(images)
+        try:
+            async for batch in batches:
+                for i, result in batch:
+                    results[i] = result
+                    yield sse_event("prediction", {
+                        "index": i,
+                        "filename": images[i][0],
+                        "predictedClass": result["predicted_class"],
+                        "probabilities": result["probabilities"],
+                        "stage": result["stage"],
+                        "uncertainty": result.get("uncertainty"),
+                    })
+        except (InferenceQueueFull, InferenceUnavailable) as e:
+            error = inference_http_error(e)
+            yield sse_event("error", {"status": error.status_code, "detail": error.detail})
+            return
+        except Exception as e:
+            print(f"Streaming analysis failed: {e}")
+            yield sse_event("error", {"status": 500, "detail": "Inference failed"})
+            return
+
+        image_keys = await store_images(images)
+
+        # The request's session is closed once the response starts streaming
+        stream_db = SessionLocal()
         try:
-            os.remove(tmp_path)
-        except:
-            pass
+            stream_patient = stream_db.query(Patient).filter(Patient.id == patient_id).first()
+            response = save_study(stream_db, stream_patient, image_keys, results)
+        finally:
+            stream_db.close()
+        # Runs after the stream ends, with the response's background tasks
+        schedule_shadow(background_tasks, response.analyses)
+        yield sse_event("study", response.model_dump())
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def reopen_upload(f):
+    """The spooled upload rewound, without closing it after use"""
+    f.seek(0)
+    return nullcontext(f)
+
+
+def dicom_sources(files: List[UploadFile]) -> list:
+    """(name, open_file) per uploaded file and ZIP member, read lazily from the spooled uploads"""
+    sources = []
+    for upload in files:
+        filename = upload.filename or ""
+        if upload.content_type in ZIP_CONTENT_TYPES or filename.lower().endswith(".zip"):
+            archive = zipfile.ZipFile(upload.file)
+            members = [
+                info for info in archive.infolist()
+                if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+            ]
+            if sum(info.file_size for info in members) > BATCH_MAX_UNCOMPRESSED_MB * 1024 * 1024:
+                raise ValueError(f"Archive exceeds {BATCH_MAX_UNCOMPRESSED_MB} MB uncompressed")
+            sources.extend((info.filename, partial(archive.open, info)) for info in members)
+        else:
+            sources.append((filename, partial(reopen_upload, upload.file)))
+    return sources
+
+
+@router.post("/predict-dicom/{patient_id}", response_model=MRIBatchAnalysisResponse)
+async def analyze_dicom_series(
+    background_tasks: BackgroundTasks,
+    patient_id: int,
+    files: List[UploadFile] = File(...),
+    tta: int = tta_query(),
+    window_center: Optional[float] = Query(None, description="Window center, overriding the files' window"),
+    window_width: Optional[float] = Query(None, gt=0, description="Window width, overriding the files' window"),
+    current_doctor: Doctor = Depends(get_current_doctor),
+    db: Session = Depends(get_db)
+):
+    """Analyze a DICOM series (.dcm files and/or ZIP archives) slice by slice.
+
+    Headers are indexed first; pixel data is then decoded, windowed and
+    predicted DICOM_BATCH_SIZE slices at a time, so memory stays bounded for
+    long series. Each slice is stored as an analysis and the study prediction
+    aggregates all of them (same response as /predict-batch).
+    """
+
+    # Verify patient belongs to current doctor
+    patient = db.query(Patient).filter(
+        Patient.id == patient_id,
+        Patient.doctor_id == current_doctor.id
+    ).first()
+
+    if not patient:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Patient not found"
+        )
+
+    ensure_inference_enabled()
+    from ai.dicom import index_series, render_slices
+
+    try:
+        slices = await asyncio.to_thread(lambda: index_series(dicom_sources(files)))
+    except (zipfile.BadZipFile, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid DICOM upload: {e}"
+        )
+
+    if not slices:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No DICOM images found in upload"
+        )
+    if len(slices) > DICOM_MAX_SLICES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many slices, maximum is {DICOM_MAX_SLICES}"
+        )
+
+    image_keys, results = [], []
+    for start in range(0, len(slices), DICOM_BATCH_SIZE):
+        try:
+            with stage_timer("decode"):
+                images = await asyncio.to_thread(
+                    render_slices, slices[start:start + DICOM_BATCH_SIZE], window_center, window_width
+                )
+        except ImageDecodeError as e:
+            raise inference_http_error(e)
+        results.extend(await run_inference(inference_client.predict_batch, images, tta))
+        image_keys.extend(await store_images(images))
+
+    response = save_study(db, patient, image_keys, results)
+    schedule_shadow(background_tasks, response.analyses)
+    return response
+
+
+@router.post("/predict-volume/{patient_id}", response_model=VolumeAnalysisResponse)
+async def analyze_nifti_volume(
+    background_tasks: BackgroundTasks,
+    patient_id: int,
+    file: UploadFile = File(...),
+    tta: int = tta_query(),
+    current_doctor: Doctor = Depends(get_current_doctor),
+    db: Session = Depends(get_db)
+):
+    """Analyze a NIfTI volume (.nii or .nii.gz) slice by slice.
+
+    The upload is memory-mapped (or stream-decompressed), background slices
+    are skipped by an intensity pre-filter and the rest predicted in batches.
+    Returns every analyzed slice's probabilities and the most suspicious
+    slice indices; only those slices are stored as analyses, while the study
+    prediction aggregates all analyzed slices.
+    """
+
+    # Verify patient belongs to current doctor
+    patient = db.query(Patient).filter(
+        Patient.id == patient_id,
+        Patient.doctor_id == current_doctor.id
+    ).first()
+
+    if not patient:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Patient not found"
+        )
+
+    ensure_inference_enabled()
+    from ai.nifti import NiftiVolume
+    from volume_analysis import analyze_volume
+
+    try:
+        volume = await asyncio.to_thread(NiftiVolume, partial(reopen_upload, file.file))
+        analysis = await analyze_volume(volume, tta)
+    except (ImageDecodeError, InferenceQueueFull, InferenceUnavailable) as e:
+        raise inference_http_error(e)
+    except (ValueError, OSError, EOFError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid NIfTI volume: {e}"
+        )
+
+    most_suspicious = analysis["most_suspicious"]
+    image_keys = await store_images([image for _, image, _ in most_suspicious])
+    response = save_study(
+        db, patient, image_keys, [result for _, _, result in most_suspicious], study=analysis["study"]
+    )
+    schedule_shadow(background_tasks, response.analyses)
+
+    return VolumeAnalysisResponse(
+        **response.model_dump(),
+        shape=analysis["shape"],
+        orientation=analysis["orientation"],
+        skippedSlices=analysis["shape"][2] - len(analysis["slices"]),
+        slices=[
+            SlicePrediction(
+                index=z,
+                predictedClass=result["predicted_class"],
+                probabilities=result["probabilities"],
+                uncertainty=result.get("uncertainty"),
+            )
+            for z, result in analysis["slices"]
+        ],
+        mostSuspicious=[z for z, _, _ in most_suspicious],
+    )
 
 
 @router.get("/patient/{patient_id}", response_model=list)
@@ -165,6 +617,8 @@ async def get_patient_analyses(
             "imagePath": a.image_path,
             "predictedClass": a.predicted_class,
             "probabilities": a.probabilities,
+            "stage": a.stage,
+            "uncertainty": a.uncertainty,
             "createdAt": a.created_at.isoformat(),
         }
         for a in analyses
@@ -173,62 +627,54 @@ async def get_patient_analyses(
 
 @router.post("/predict-patient", response_model=MRIAnalysisResponse)
 async def analyze_mri_for_patient(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    tta: int = tta_query(),
     current_patient: Patient = Depends(get_current_patient),
     db: Session = Depends(get_db)
 ):
     """Analyze an MRI image for the current authenticated patient (self-service)"""
 
     # Validate image type
-    if file.content_type not in ["image/jpeg", "image/png", "image/jpg", "image/webp"]:
+    if file.content_type not in IMAGE_CONTENT_TYPES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid image type. Supported: JPEG, PNG, WebP"
         )
 
-    # Save uploaded file to temporary location
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-            shutil.copyfileobj(file.file, tmp)
-            tmp_path = tmp.name
-    finally:
-        file.file.close()
-
-    try:
-        # Make prediction
-        prediction_result = make_prediction(tmp_path)
-
-        # Save analysis to database
-        analysis = MRIAnalysis(
-            patient_id=current_patient.id,
-            image_path=tmp_path,
-            predicted_class=prediction_result["predicted_class"],
-            probabilities=json.dumps(prediction_result["probabilities"])
-        )
-
-        # Update patient's disease field with the predicted class
-        current_patient.disease = prediction_result["predicted_class"]
-
+    # Read upload into memory; decoding happens in the inference pool
+    with stage_timer("receive"):
+        try:
+            image_bytes = await file.read()
+        finally:
+            await file.close()
+
+    # Make prediction
+    prediction_result = await run_prediction(image_bytes, tta)
+    image_key, = await store_images([(file.filename, image_bytes)])
+
+    # Save analysis to database
+    analysis = MRIAnalysis(
+        patient_id=current_patient.id,
+        image_path=image_key,
+        predicted_class=prediction_result["predicted_class"],
+        probabilities=json.dumps(prediction_result["probabilities"]),
+        stage=prediction_result["stage"],
+        uncertainty=prediction_result.get("uncertainty")
+    )
+
+    # Update patient's disease field with the predicted class
+    current_patient.disease = prediction_result["predicted_class"]
+
+    with stage_timer("db_write"):
         db.add(analysis)
         db.commit()
         db.refresh(analysis)
 
-        # Return response with parsed probabilities
-        return MRIAnalysisResponse(
-            id=analysis.id,
-            patientId=analysis.patient_id,
-            imagePath=analysis.image_path,
-            predictedClass=analysis.predicted_class,
-            probabilities=analysis.probabilities,
-            createdAt=analysis.created_at.isoformat()
-        )
-
-    finally:
-        # Clean up temporary file
-        try:
-            os.remove(tmp_path)
-        except:
-            pass
+    # Return response with parsed probabilities
+    response = MRIAnalysisResponse(**analysis.to_dict())
+    schedule_shadow(background_tasks, [response])
+    return response
 
 
 @router.get("/my-analyses", response_model=list)
@@ -249,7 +695,270 @@ async def get_my_analyses(
             "imagePath": a.image_path,
             "predictedClass": a.predicted_class,
             "probabilities": a.probabilities,
+            "stage": a.stage,
+            "uncertainty": a.uncertainty,
             "createdAt": a.created_at.isoformat(),
         }
         for a in analyses
     ]
+
+
+GRADCAM_MEDIA_TYPES = {"png": "image/png", "npz": "application/octet-stream"}
+
+
+def get_doctor_analysis(db: Session, analysis_id: int, doctor: Doctor) -> MRIAnalysis:
+    """An analysis of one of the doctor's patients, or 404"""
+    analysis = db.query(MRIAnalysis).join(Patient).filter(
+        MRIAnalysis.id == analysis_id,
+        Patient.doctor_id == doctor.id
+    ).first()
+
+    if not analysis:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analysis not found"
+        )
+    return analysis
+
+
+def gradcam_response(analysis_id: int, key: str, format: str):
+    """The cached heatmap, or 202 while the background worker computes it"""
+    state = saliency_store.status(key)
+    if state == "ready":
+        return Response(
+            content=saliency_store.read(key, format),
+            media_type=GRADCAM_MEDIA_TYPES[format],
+            headers={"Cache-Control": "private, max-age=86400", "ETag": f'"{key}"'},
+        )
+    if state == "failed":
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Grad-CAM failed: {saliency_store.error(key)}"
+        )
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"status": "pending", "analysisId": analysis_id},
+        headers={"Retry-After": "2", "Location": f"/api/analysis/analyses/{analysis_id}/gradcam"},
+    )
+
+
+@router.post("/analyses/{analysis_id}/gradcam")
+async def request_gradcam(
+    analysis_id: int,
+    file: Optional[UploadFile] = File(None),
+    format: str = Query("png", pattern="^(png|npz)$"),
+    current_doctor: Doctor = Depends(get_current_doctor),
+    db: Session = Depends(get_db)
+):
+    """Request a Grad-CAM heatmap for a stored analysis.
+
+    Uses the analysis' stored image; analyses saved before the blob store
+    need the image uploaded as ``file``. Returns the heatmap if it is cached,
+    otherwise 202 while it is computed in the background; poll with GET.
+    ``png`` is the overlay, ``npz`` the raw float16 heatmap.
+    """
+    analysis = get_doctor_analysis(db, analysis_id, current_doctor)
+    ensure_local_models()
+
+    if file is None:
+        try:
+            image_bytes = await asyncio.to_thread(blob_store.read, analysis.image_path)
+        except BlobNotFound:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No stored image for this analysis; upload it as file"
+            )
+    else:
+        # Validate image type
+        if file.content_type not in IMAGE_CONTENT_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid image type. Supported: JPEG, PNG, WebP"
+            )
+
+        with stage_timer("receive"):
+            try:
+                image_bytes = await file.read()
+            finally:
+                await file.close()
+
+    # Explain the stored prediction, not whatever the model says now
+    key = saliency_store.request(image_bytes, diagnoses.index(analysis.predicted_class))
+    return gradcam_response(analysis.id, key, format)
+
+
+@router.get("/analyses/{analysis_id}/gradcam")
+async def get_gradcam(
+    analysis_id: int,
+    format: str = Query("png", pattern="^(png|npz)$"),
+    current_doctor: Doctor = Depends(get_current_doctor),
+    db: Session = Depends(get_db)
+):
+    """Get a previously requested Grad-CAM heatmap for a stored analysis"""
+    analysis = get_doctor_analysis(db, analysis_id, current_doctor)
+    ensure_local_models()
+
+    # Derived from the stored image like POST does, so any worker finds the cached heatmap
+    try:
+        image_bytes = await asyncio.to_thread(blob_store.read, analysis.image_path)
+    except BlobNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No stored image for this analysis; poll with POST and the image as file"
+        )
+    key = make_saliency_key(image_bytes, diagnoses.index(analysis.predicted_class))
+    if saliency_store.status(key) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No Grad-CAM requested for this analysis; POST the image first"
+        )
+    return gradcam_response(analysis.id, key, format)
+
+
+def parse_range(header: Optional[str], size: int):
+    """(start, end) of a single ``bytes=`` range, or None to send the whole blob.
+
+    Malformed and multi-range headers are ignored; a range outside the blob
+    raises ValueError (416).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        start = int(first) if first else None
+        end = int(last) if last else None
+    except ValueError:
+        return None
+    if start is None:
+        if end is None:
+            return None
+        # Suffix range: the last N bytes
+        if end == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - end), size - 1
+    if end is None:
+        end = size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def image_media_type(head: bytes) -> str:
+    if head.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def blob_response(key: str, range_header: Optional[str], if_none_match: Optional[str] = None):
+    """Stream a stored blob, honouring Range and If-None-Match"""
+    try:
+        size = blob_store.size(key)
+    except BlobNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not stored"
+        )
+
+    # Content-addressed, so the key is a strong validator and never changes
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{key}"',
+        "Cache-Control": "private, max-age=31536000, immutable",
+    }
+    if if_none_match and headers["ETag"] in if_none_match:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        return Response(
+            status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+
+    media_type = image_media_type(b"".join(blob_store.iter_range(key, 0, 11)))
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(blob_store.iter_range(key), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        blob_store.iter_range(key, start, end),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+@router.get("/analyses/{analysis_id}/image")
+async def get_analysis_image(
+    analysis_id: int,
+    range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    current_doctor: Doctor = Depends(get_current_doctor),
+    db: Session = Depends(get_db)
+):
+    """Stream the stored image of an analysis (supports Range requests)"""
+    analysis = get_doctor_analysis(db, analysis_id, current_doctor)
+    return blob_response(analysis.image_path, range, if_none_match)
+
+
+async def derivative_response(key: str, variant: str, format: Optional[str], accept: Optional[str],
+                              if_none_match: Optional[str]):
+    """A stored rendition, generated first if the background pipeline hasn't got to it"""
+    if not is_content_key(key):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not stored"
+        )
+
+    # WebP when the client accepts it, unless a format was asked for
+    ext = format or ("webp" if "image/webp" in (accept or "") else "jpeg")
+    rendition_key = derivative_key(key, f"{variant}.{ext}")
+    if not blob_store.exists(rendition_key):
+        try:
+            await asyncio.wrap_future(derivative_pipeline.schedule(key))
+        except (BlobNotFound, ImageDecodeError):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No preview available for this image"
+            )
+
+    response = blob_response(rendition_key, None, if_none_match)
+    if format is None:
+        response.headers["Vary"] = "Accept"
+    return response
+
+
+@router.get("/analyses/{analysis_id}/thumbnail")
+async def get_analysis_thumbnail(
+    analysis_id: int,
+    format: Optional[str] = Query(None, pattern="^(webp|jpeg)$"),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    current_doctor: Doctor = Depends(get_current_doctor),
+    db: Session = Depends(get_db)
+):
+    """Small thumbnail of an analysis' image, for list views"""
+    analysis = get_doctor_analysis(db, analysis_id, current_doctor)
+    return await derivative_response(analysis.image_path, "thumbnail", format, accept, if_none_match)
+
+
+@router.get("/analyses/{analysis_id}/preview")
+async def get_analysis_preview(
+    analysis_id: int,
+    format: Optional[str] = Query(None, pattern="^(webp|jpeg)$"),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    current_doctor: Doctor = Depends(get_current_doctor),
+    db: Session = Depends(get_db)
+):
+    """The 256x256 image the model was given"""
+    analysis = get_doctor_analysis(db, analysis_id, current_doctor)
+    return await derivative_response(analysis.image_path, "input", format, accept, if_none_match)
@@ -0,0 +1,93 @@
+from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Query, status
+from sqlalchemy.orm import Session
+from database import get_db
+from models import Patient, Doctor, AnalysisJob
+from schemas import AnalysisJobResponse
+from dependencies import get_current_doctor
+from job_queue import enqueue_job, queue_stats, JOB_POLL_INTERVAL_SECONDS
+from routes.analysis import IMAGE_CONTENT_TYPES, store_images
+from metrics import stage_timer
+import asyncio
+import time
+
+router = APIRouter(prefix="/api/analysis/jobs", tags=["MRI Analysis Jobs"])
+
+# Upper bound for the long-poll ``wait`` parameter
+JOB_MAX_WAIT_SECONDS = 30
+
+
+@router.get("/stats")
+async def get_job_stats(
+    current_doctor: Doctor = Depends(get_current_doctor),
+    db: Session = Depends(get_db)
+):
+    """Queue depth, oldest queued job age and expired leases"""
+    return queue_stats(db)
+
+
+@router.post("/{patient_id}", response_model=AnalysisJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_analysis_job(
+    patient_id: int,
+    file: UploadFile = File(...),
+    current_doctor: Doctor = Depends(get_current_doctor),
+    db: Session = Depends(get_db)
+):
+    """Queue an MRI image for analysis and return the job immediately"""
+
+    # Verify patient belongs to current doctor
+    patient = db.query(Patient).filter(
+        Patient.id == patient_id,
+        Patient.doctor_id == current_doctor.id
+    ).first()
+
+    if not patient:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Patient not found"
+        )
+
+    # Validate image type
+    if file.content_type not in IMAGE_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid image type. Supported: JPEG, PNG, WebP"
+        )
+
+    with stage_timer("receive"):
+        try:
+            image_bytes = await file.read()
+        finally:
+            await file.close()
+
+    image_key, = await store_images([(file.filename, image_bytes)])
+    job = enqueue_job(db, patient_id, file.filename or "", image_key)
+    return AnalysisJobResponse(**job.to_dict())
+
+
+@router.get("/{job_id}", response_model=AnalysisJobResponse)
+async def get_analysis_job(
+    job_id: int,
+    wait: float = Query(0, ge=0, le=JOB_MAX_WAIT_SECONDS, description="Seconds to wait for the job to finish"),
+    current_doctor: Doctor = Depends(get_current_doctor),
+    db: Session = Depends(get_db)
+):
+    """Get a job's status and result, optionally long-polling until it finishes"""
+    deadline = time.monotonic() + wait
+    while True:
+        job = db.query(AnalysisJob).join(Patient).filter(
+            AnalysisJob.id == job_id,
+            Patient.doctor_id == current_doctor.id
+        ).first()
+
+        if not job:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Job not found"
+            )
+
+        if job.status in ("done", "failed") or time.monotonic() >= deadline:
+            return AnalysisJobResponse(**job.to_dict())
+
+        # End the transaction so the next poll sees the worker's commit
+        db.rollback()
+        await asyncio.sleep(JOB_POLL_INTERVAL_SECONDS)
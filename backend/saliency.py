@@ -0,0 +1,156 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import io
+import os
+import threading
+
+import numpy as np
+
+from ai.preprocessing import decode_image
+from model_registry import model_registry, ModelEntry, ENSEMBLE_MODEL, ENSEMBLE_MODEL_PATH, INFERENCE_BACKEND
+
+# Grad-CAM results: <key>.png overlay and <key>.npz float16 heatmap
+GRADCAM_CACHE_DIR = os.getenv("GRADCAM_CACHE_DIR", "cache/gradcam")
+GRADCAM_WORKERS = int(os.getenv("GRADCAM_WORKERS", "1"))
+# Recent failures kept so a poll can report them; a new request retries
+GRADCAM_MAX_ERRORS = int(os.getenv("GRADCAM_MAX_ERRORS", "256"))
+
+# Grad-CAM needs gradients, so it always runs the Keras artifact even when
+# predictions are served from a SavedModel or TFLite export
+gradcam_model = ModelEntry("gradcam", ENSEMBLE_MODEL_PATH)
+
+
+def gradcam_version() -> str:
+    if INFERENCE_BACKEND == "keras":
+        return model_registry.version(ENSEMBLE_MODEL)
+    return os.getenv("MODEL_VERSION") or gradcam_model.version
+
+
+def make_saliency_key(image_bytes: bytes, class_index: int) -> str:
+    """Key a heatmap by uploaded image hash, Keras model version and target class"""
+    h = hashlib.sha256(image_bytes)
+    h.update(f"|{gradcam_version()}|{class_index}".encode())
+    return h.hexdigest()
+
+
+class SaliencyStore:
+    """Lazily computed, disk-cached Grad-CAM heatmaps for stored analyses.
+
+    Keys derive from the image and the explained class only, so any API
+    process finds heatmaps computed by another, or before a restart.
+    """
+
+    def __init__(self, directory: str = GRADCAM_CACHE_DIR, workers: int = GRADCAM_WORKERS):
+        self.directory = directory
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gradcam")
+        self.pending = {}
+        self.errors = OrderedDict()
+        self.lock = threading.Lock()
+        self.gradcam = None
+        self.hits = 0
+        self.computed = 0
+        self.failures = 0
+
+    def path(self, key: str, ext: str) -> str:
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    def status(self, key: str):
+        """"ready", "pending", "failed" or None if never requested"""
+        if os.path.exists(self.path(key, "png")):
+            return "ready"
+        with self.lock:
+            if key in self.pending:
+                return "pending"
+            if key in self.errors:
+                return "failed"
+        # Finished between the two checks
+        return "ready" if os.path.exists(self.path(key, "png")) else None
+
+    def error(self, key: str):
+        with self.lock:
+            return self.errors.get(key)
+
+    def request(self, image_bytes: bytes, class_index: int) -> str:
+        """Schedule the heatmap unless it is cached or running; retries a failed one"""
+        key = make_saliency_key(image_bytes, class_index)
+        if os.path.exists(self.path(key, "png")):
+            return key
+        with self.lock:
+            if key in self.pending:
+                return key
+            self.errors.pop(key, None)
+            future = self.executor.submit(self.compute, key, image_bytes, class_index)
+            self.pending[key] = future
+        # Outside the lock: runs immediately if the future is already done
+        future.add_done_callback(lambda f: self.finished(key, f))
+        return key
+
+    def finished(self, key: str, future):
+        with self.lock:
+            self.pending.pop(key, None)
+            if future.exception() is not None:
+                self.errors[key] = str(future.exception())
+                while len(self.errors) > GRADCAM_MAX_ERRORS:
+                    self.errors.popitem(last=False)
+
+    def read(self, key: str, ext: str) -> bytes:
+        with self.lock:
+            self.hits += 1
+        with open(self.path(key, ext), "rb") as f:
+            return f.read()
+
+    def load_gradcam(self):
+        if self.gradcam is None:
+            from ai.gradcam import GradCAM
+
+            if INFERENCE_BACKEND == "keras":
+                model = model_registry.get(ENSEMBLE_MODEL)
+            else:
+                with gradcam_model.lock:
+                    if gradcam_model.model is None:
+                        gradcam_model.model = gradcam_model.load()
+                model = gradcam_model.model
+            self.gradcam = GradCAM(model)
+        return self.gradcam
+
+    def compute(self, key: str, image_bytes: bytes, class_index: int):
+        from ai.gradcam import overlay_png
+
+        try:
+            img_array = decode_image(image_bytes, resize=gradcam_model.resize_mode)
+            heatmap = self.load_gradcam().heatmap(img_array, class_index)
+
+            os.makedirs(self.directory, exist_ok=True)
+            buf = io.BytesIO()
+            np.savez_compressed(buf, heatmap=heatmap.astype(np.float16))
+            self.write(self.path(key, "npz"), buf.getvalue())
+            # The PNG is written last: its presence marks the entry complete
+            self.write(self.path(key, "png"), overlay_png(img_array, heatmap))
+            with self.lock:
+                self.computed += 1
+        except Exception as e:
+            with self.lock:
+                self.failures += 1
+            print(f"Grad-CAM failed for {key}: {e}")
+            raise
+
+    @staticmethod
+    def write(path: str, data: bytes):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "directory": self.directory,
+                "pending": len(self.pending),
+                "hits": self.hits,
+                "computed": self.computed,
+                "failures": self.failures,
+            }
+
+
+saliency_store = SaliencyStore()
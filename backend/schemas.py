@@ -39,6 +39,8 @@ class PatientResponse(BaseModel):
     disease: str
     notes: Optional[str]
     createdAt: str
+    url: str = ""  # Stored image key of the latest MRI
+    thumbnailUrl: str = ""  # Its thumbnail endpoint (authenticated)
 
     class Config:
         from_attributes = True
@@ -97,7 +99,49 @@ class MRIAnalysisResponse(BaseModel):
     imagePath: str
     predictedClass: str
     probabilities: Dict[str, float]
+    stage: Optional[str] = None
+    uncertainty: Optional[float] = None
     createdAt: str
 
     class Config:
         from_attributes = True
+
+
+class StudyPrediction(BaseModel):
+    predictedClass: str
+    probabilities: Dict[str, float]
+    votes: Dict[str, int]
+
+
+class MRIBatchAnalysisResponse(BaseModel):
+    patientId: int
+    analyses: List[MRIAnalysisResponse]
+    study: StudyPrediction
+
+
+class SlicePrediction(BaseModel):
+    index: int
+    predictedClass: str
+    probabilities: Dict[str, float]
+    uncertainty: Optional[float] = None
+
+
+class VolumeAnalysisResponse(MRIBatchAnalysisResponse):
+    """``analyses`` holds the stored most suspicious slices; ``slices`` every analyzed one"""
+    shape: List[int]
+    orientation: str
+    skippedSlices: int
+    slices: List[SlicePrediction]
+    mostSuspicious: List[int]
+
+
+class AnalysisJobResponse(BaseModel):
+    id: int
+    patientId: int
+    status: str
+    filename: str
+    attempts: int
+    error: Optional[str] = None
+    analysis: Optional[MRIAnalysisResponse] = None
+    createdAt: str
+    finishedAt: Optional[str] = None
@@ -0,0 +1,182 @@
+"""Shadow evaluation: a candidate model re-scores a sample of live analyses.
+
+The API only samples. Once a response has been sent (a background task), a
+SHADOW_SAMPLE_RATE fraction of the analyses it stored is queued in
+shadow_predictions. shadow_worker.py, a separate low-priority process,
+scores them with the candidate model (e.g. a fresh ai/run_all.py build)
+and records its prediction and latency next to the live one.
+shadow_report() compares the two, for /api/analysis/shadow/report and
+``python shadow_worker.py --report``.
+"""
+from datetime import datetime, timedelta
+import json
+import os
+import random
+import threading
+
+import numpy as np
+from sqlalchemy import func, or_, and_
+from sqlalchemy.orm import Session
+
+from blob_store import is_content_key
+from database import SessionLocal
+from models import ShadowPrediction
+
+# Fraction of analyses also scored by the candidate; 0 disables sampling
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0"))
+SHADOW_MODEL_PATH = os.getenv("SHADOW_MODEL_PATH", "ai/trained/MRI_ENSEMBLED.candidate.keras")
+# Samples are dropped while this many are waiting, so a stopped worker can't grow the table
+SHADOW_MAX_BACKLOG = int(os.getenv("SHADOW_MAX_BACKLOG", "1000"))
+SHADOW_CLAIM_BATCH_SIZE = int(os.getenv("SHADOW_CLAIM_BATCH_SIZE", "16"))
+SHADOW_VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("SHADOW_VISIBILITY_TIMEOUT_SECONDS", "300"))
+SHADOW_REPORT_MAX_ROWS = int(os.getenv("SHADOW_REPORT_MAX_ROWS", "10000"))
+
+_sampling_stats = {"sampled": 0, "dropped": 0, "failures": 0}
+_sampling_lock = threading.Lock()
+
+
+def count_sampling(name: str, n: int = 1):
+    with _sampling_lock:
+        _sampling_stats[name] += n
+
+
+def sampling_stats() -> dict:
+    with _sampling_lock:
+        return dict(_sampling_stats)
+
+
+def schedule_shadow(background_tasks, analyses: list):
+    """Queue a sample of stored analyses (MRIAnalysisResponse) once the response is sent.
+
+    TTA predictions are not sampled: the candidate is scored on single views.
+    """
+    if SHADOW_SAMPLE_RATE <= 0:
+        return
+    samples = [
+        {
+            "analysis_id": a.id,
+            "image_key": a.imagePath,
+            "primary_class": a.predictedClass,
+            "primary_probabilities": json.dumps(a.probabilities),
+            "primary_stage": a.stage,
+        }
+        for a in analyses
+        if is_content_key(a.imagePath) and "+tta" not in (a.stage or "") and random.random() < SHADOW_SAMPLE_RATE
+    ]
+    if samples:
+        background_tasks.add_task(enqueue_shadow, samples)
+
+
+def enqueue_shadow(samples: list):
+    """Insert sampled analyses for the shadow worker; never raises into the request"""
+    db = SessionLocal()
+    try:
+        backlog = db.query(func.count(ShadowPrediction.id)).filter(ShadowPrediction.status == "queued").scalar()
+        if backlog + len(samples) > SHADOW_MAX_BACKLOG:
+            count_sampling("dropped", len(samples))
+            return
+        db.add_all([ShadowPrediction(**sample) for sample in samples])
+        db.commit()
+        count_sampling("sampled", len(samples))
+    except Exception as e:
+        count_sampling("failures")
+        print(f"Shadow sampling failed: {e}")
+    finally:
+        db.close()
+
+
+def claim_shadow(db: Session, worker_id: str, limit: int = SHADOW_CLAIM_BATCH_SIZE) -> list:
+    """Claim up to ``limit`` queued samples (or ones whose worker died); returns plain dicts"""
+    now = datetime.utcnow()
+    rows = db.query(ShadowPrediction).filter(
+        or_(
+            ShadowPrediction.status == "queued",
+            and_(ShadowPrediction.status == "running", ShadowPrediction.locked_until <= now)
+        )
+    ).order_by(ShadowPrediction.created_at).limit(limit).with_for_update(skip_locked=True).all()
+
+    claimed = []
+    for row in rows:
+        row.status = "running"
+        row.worker_id = worker_id
+        row.locked_until = now + timedelta(seconds=SHADOW_VISIBILITY_TIMEOUT_SECONDS)
+        claimed.append({"id": row.id, "image_key": row.image_key})
+    db.commit()
+    return claimed
+
+
+def record_shadow(db: Session, sample_id: int, worker_id: str, outcome):
+    """Store the worker's result dict for a sample, or mark it failed with an exception.
+
+    Returns None, writing nothing, if the claim expired and another worker took the sample.
+    """
+    row = db.query(ShadowPrediction).filter(
+        ShadowPrediction.id == sample_id,
+        ShadowPrediction.status == "running",
+        ShadowPrediction.worker_id == worker_id
+    ).with_for_update().first()
+    if not row:
+        db.rollback()
+        return None
+    row.locked_until = None
+    row.scored_at = datetime.utcnow()
+    if isinstance(outcome, Exception):
+        row.status = "failed"
+        row.error = str(outcome)
+    else:
+        row.status = "done"
+        row.candidate_version = outcome["candidate_version"]
+        row.candidate_class = outcome["candidate"]["predicted_class"]
+        row.candidate_probabilities = json.dumps(outcome["candidate"]["probabilities"])
+        row.candidate_latency_ms = outcome["candidate_latency_ms"]
+        row.primary_latency_ms = outcome["primary_latency_ms"]
+    db.commit()
+    return row
+
+
+def latency_summary(values: list) -> dict:
+    if not values:
+        return {"mean_ms": None, "p50_ms": None, "p95_ms": None}
+    return {
+        "mean_ms": round(float(np.mean(values)), 2),
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p95_ms": round(float(np.percentile(values, 95)), 2),
+    }
+
+
+def shadow_report(db: Session, hours: float = None, candidate_version: str = None) -> dict:
+    """Agreement and latency of the candidate vs. the live model over scored samples"""
+    counts = dict(
+        db.query(ShadowPrediction.status, func.count(ShadowPrediction.id)).group_by(ShadowPrediction.status).all()
+    )
+
+    query = db.query(ShadowPrediction).filter(ShadowPrediction.status == "done")
+    if hours:
+        query = query.filter(ShadowPrediction.created_at >= datetime.utcnow() - timedelta(hours=hours))
+    if candidate_version:
+        query = query.filter(ShadowPrediction.candidate_version == candidate_version)
+    rows = query.order_by(ShadowPrediction.created_at.desc()).limit(SHADOW_REPORT_MAX_ROWS).all()
+
+    confusion = {}
+    probability_deltas = []
+    for row in rows:
+        by_candidate = confusion.setdefault(row.primary_class, {})
+        by_candidate[row.candidate_class] = by_candidate.get(row.candidate_class, 0) + 1
+        primary, candidate = json.loads(row.primary_probabilities), json.loads(row.candidate_probabilities)
+        probability_deltas.append(max(abs(primary[d] - candidate.get(d, 0.0)) for d in primary))
+
+    agreed = sum(1 for row in rows if row.primary_class == row.candidate_class)
+    return {
+        "sample_rate": SHADOW_SAMPLE_RATE,
+        "status": counts,
+        "compared": len(rows),
+        "candidate_versions": sorted({row.candidate_version for row in rows}),
+        "agreement": round(agreed / len(rows), 4) if rows else None,
+        # Largest per-class probability difference, averaged over samples
+        "mean_max_probability_delta": round(float(np.mean(probability_deltas)), 4) if rows else None,
+        "confusion": confusion,
+        "latency": {
+            "primary": latency_summary([row.primary_latency_ms for row in rows if row.primary_latency_ms is not None]),
+            "candidate": latency_summary([row.candidate_latency_ms for row in rows if row.candidate_latency_ms is not None]),
+        },
+    }
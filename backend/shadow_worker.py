@@ -0,0 +1,163 @@
+"""Shadow worker: scores sampled live analyses with a candidate model at low priority.
+
+Runs apart from the API (like worker.py), niced so it only uses CPU the
+serving processes leave idle. Each claimed batch is run through the live
+models and the candidate, so both latencies are measured on the same
+hardware and batch:
+
+    SHADOW_MODEL_PATH=ai/trained/MRI_ENSEMBLED.candidate.keras python shadow_worker.py
+    python shadow_worker.py --report --hours 24
+
+Copy a candidate together with its preprocessing file
+(MRI_ENSEMBLED.candidate.preprocessing.json): when its resize mode differs
+from the live models', the worker feeds each the inputs it was trained on.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import time
+
+import numpy as np
+
+from blob_store import blob_store, BlobNotFound
+from database import SessionLocal
+from inference import decode_image, run_models, format_prediction, ImageDecodeError
+from model_registry import model_registry, ENSEMBLE_MODEL
+from shadow import SHADOW_MODEL_PATH, SHADOW_CLAIM_BATCH_SIZE, claim_shadow, record_shadow, shadow_report
+
+# Applied before the models load, so TensorFlow's thread pools inherit it
+SHADOW_WORKER_NICE = int(os.getenv("SHADOW_WORKER_NICE", "10"))
+SHADOW_POLL_INTERVAL_SECONDS = float(os.getenv("SHADOW_POLL_INTERVAL_SECONDS", "5"))
+
+SHADOW_MODEL = "shadow"
+
+stopping = False
+
+
+def request_stop(signum, frame):
+    global stopping
+    stopping = True
+
+
+def score_batch(samples: list) -> list:
+    """(sample, result dict or exception) per sample"""
+    # A retrained candidate may resize differently from the live models
+    candidate_resize = model_registry.resize_mode(SHADOW_MODEL)
+    separate_inputs = candidate_resize != model_registry.resize_mode(ENSEMBLE_MODEL)
+
+    decoded = []
+    outcomes = []
+    for sample in samples:
+        try:
+            image_bytes = blob_store.read(sample["image_key"])
+            img_array = decode_image(image_bytes)
+            candidate_array = decode_image(image_bytes, candidate_resize) if separate_inputs else img_array
+            decoded.append((sample, img_array, candidate_array))
+        except (ImageDecodeError, BlobNotFound) as e:
+            outcomes.append((sample, e))
+    if not decoded:
+        return outcomes
+
+    img_batch = np.stack([img_array for _, img_array, _ in decoded])
+    started = time.perf_counter()
+    run_models(img_batch)
+    primary_ms = (time.perf_counter() - started) * 1000.0 / len(decoded)
+
+    candidate_batch = np.stack([candidate_array for _, _, candidate_array in decoded]) if separate_inputs else img_batch
+    started = time.perf_counter()
+    logits = model_registry.predict(SHADOW_MODEL, candidate_batch)
+    candidate_ms = (time.perf_counter() - started) * 1000.0 / len(decoded)
+
+    candidate_version = model_registry.entry(SHADOW_MODEL).version
+    for (sample, _, _), row in zip(decoded, logits):
+        outcomes.append((sample, {
+            "candidate": format_prediction(row, SHADOW_MODEL),
+            "candidate_version": candidate_version,
+            "candidate_latency_ms": round(candidate_ms, 3),
+            "primary_latency_ms": round(primary_ms, 3),
+        }))
+    return outcomes
+
+
+def run(worker_id: str):
+    if SHADOW_WORKER_NICE:
+        os.nice(SHADOW_WORKER_NICE)
+
+    if not model_registry.enabled:
+        raise SystemExit("shadow_worker.py runs inference; unset INFERENCE_MODE=off for it")
+    entry = model_registry.register(SHADOW_MODEL, SHADOW_MODEL_PATH)
+    if not os.path.exists(entry.path):
+        raise SystemExit(f"Candidate model not found: {entry.path} (set SHADOW_MODEL_PATH)")
+    model_registry.warm_up_all()
+    print(f"✓ Shadow worker {worker_id} scoring with {entry.version} ({entry.resize_mode} inputs)")
+
+    while not stopping:
+        db = SessionLocal()
+        try:
+            samples = claim_shadow(db, worker_id, SHADOW_CLAIM_BATCH_SIZE)
+        finally:
+            db.close()
+
+        if not samples:
+            time.sleep(SHADOW_POLL_INTERVAL_SECONDS)
+            continue
+
+        try:
+            outcomes = score_batch(samples)
+        except Exception as e:
+            outcomes = [(sample, e) for sample in samples]
+
+        db = SessionLocal()
+        try:
+            for sample, outcome in outcomes:
+                if isinstance(outcome, Exception):
+                    print(f"Shadow sample {sample['id']} failed: {outcome}")
+                if record_shadow(db, sample["id"], worker_id, outcome) is None:
+                    print(f"Shadow sample {sample['id']} was reclaimed by another worker, result discarded")
+        finally:
+            db.close()
+
+    print(f"Shadow worker {worker_id} stopped")
+
+
+def print_report(hours: float = None, candidate_version: str = None, output: str = None):
+    db = SessionLocal()
+    try:
+        report = shadow_report(db, hours, candidate_version)
+    finally:
+        db.close()
+
+    print(f"Samples: {report['status']}  compared: {report['compared']}  "
+          f"candidates: {', '.join(report['candidate_versions']) or '-'}")
+    if report["compared"]:
+        print(f"Agreement: {report['agreement']:.2%}  "
+              f"mean max probability delta: {report['mean_max_probability_delta']:.4f}")
+        for model in ("primary", "candidate"):
+            latency = report["latency"][model]
+            print(f"  {model:<9} latency  mean {latency['mean_ms']} ms  p50 {latency['p50_ms']} ms  "
+                  f"p95 {latency['p95_ms']} ms")
+        print("Confusion (live -> candidate):")
+        for primary_class, by_candidate in sorted(report["confusion"].items()):
+            print(f"  {primary_class:<10} {by_candidate}")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--report", action="store_true", help="Print the agreement/latency report and exit")
+    parser.add_argument("--hours", type=float, help="Only samples from the last N hours")
+    parser.add_argument("--candidate", help="Only samples scored by this candidate version")
+    parser.add_argument("--output", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    if args.report:
+        print_report(args.hours, args.candidate, args.output)
+    else:
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        run(f"{socket.gethostname()}:{os.getpid()}")
@@ -0,0 +1,7 @@
+"""Point the app at throwaway storage before any test imports database or blob_store."""
+import os
+import tempfile
+
+_scratch = tempfile.mkdtemp(prefix="mri-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch, 'test.db')}"
+os.environ["BLOB_STORE_DIR"] = os.path.join(_scratch, "blobs")
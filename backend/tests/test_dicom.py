@@ -0,0 +1,97 @@
+"""DICOM series: windowing/rescale into model inputs, and /predict-dicom batching
+and study aggregation, on the synthetic series from benchmarks.synthetic_dicom."""
+import io
+from functools import partial
+
+import numpy as np
+import pytest
+from PIL import Image
+
+pytest.importorskip("pydicom")
+
+from ai.dicom import index_series, render_slices
+from ai.preprocessing import IMG_SIZE
+from benchmarks.synthetic_dicom import make_series
+from inference import decode_image, diagnoses
+
+SLICES = 10
+
+
+def series_sources(series: list) -> list:
+    return [(name, partial(io.BytesIO, data)) for name, data in series]
+
+
+def test_rendered_slices_are_model_inputs():
+    slices = index_series(series_sources(make_series(4)))
+    rendered = render_slices(slices)
+
+    assert len(rendered) == 4
+    for _, png in rendered:
+        img_array = decode_image(png)
+        assert img_array.shape == IMG_SIZE + (3,)
+        assert img_array.dtype == np.float32
+        assert 0.0 <= img_array.min() and img_array.max() <= 1.0
+        # The header window maps the phantom onto the full range, not a flat image
+        assert img_array.max() - img_array.min() > 0.5
+
+
+@pytest.fixture(scope="module")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+
+    # No lifespan: models are not loaded; each test stubs the inference client
+    client = TestClient(main.app)
+    token = client.post("/api/auth/register", json={
+        "name": "Doc", "email": "dicom@example.com", "password": "password1", "specialization": "neuro"
+    }).json()["token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+    patients = client.post("/api/patients", json={"name": "P", "age": 40, "gender": "m", "disease": "x"}).json()
+    client.patient_id = patients["patients"][-1]["id"]
+    return client
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """Record the images of each predict_batch call; slice i is predicted as diagnoses[i % n]"""
+    import routes.analysis
+
+    calls = []
+
+    async def predict_batch(images, tta=0):
+        offset = sum(len(batch) for batch in calls)
+        calls.append([decode_image(data) for _, data in images])
+        return [{
+            "predicted_class": diagnoses[(offset + i) % len(diagnoses)],
+            "probabilities": {d: 1.0 / len(diagnoses) for d in diagnoses},
+            "stage": "ensemble",
+        } for i in range(len(images))]
+
+    monkeypatch.setattr(routes.analysis, "DICOM_BATCH_SIZE", 4)
+    monkeypatch.setattr(routes.analysis.inference_client, "predict_batch", predict_batch)
+    return calls
+
+
+def test_predict_dicom_batches_and_aggregates(client, batches):
+    files = [("files", (name, data, "application/dicom")) for name, data in make_series(SLICES)]
+    response = client.post(f"/api/analysis/predict-dicom/{client.patient_id}", files=files)
+
+    assert response.status_code == 200, response.text
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert all(img_array.shape == IMG_SIZE + (3,) for batch in batches for img_array in batch)
+    body = response.json()
+    assert len(body["analyses"]) == SLICES
+    assert sum(body["study"]["votes"].values()) == SLICES
+    assert body["study"]["votes"] == {
+        d: len(range(i, SLICES, len(diagnoses))) for i, d in enumerate(diagnoses)
+    }
+
+
+def test_predict_dicom_rejects_non_dicom(client, batches):
+    png = io.BytesIO()
+    Image.new("L", (64, 64)).save(png, "PNG")
+    files = [("files", ("scan.png", png.getvalue(), "image/png"))]
+    response = client.post(f"/api/analysis/predict-dicom/{client.patient_id}", files=files)
+
+    assert response.status_code == 400
+    assert batches == []
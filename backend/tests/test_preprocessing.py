@@ -0,0 +1,97 @@
+"""Training (ai.preprocessing.image_dataset) and serving (inference.decode_image) must agree,
+and both must match Keras' own image_dataset_from_directory geometry."""
+import os
+
+import numpy as np
+import pytest
+
+from ai.preprocessing import IMG_SIZE, RESIZE_MODES, image_dataset, index_images
+from benchmarks.bench_preprocessing import PARITY_SAMPLES, make_image
+from inference import decode_image
+
+CLASS_NAMES = ["a", "b"]
+# Mean absolute difference from Keras, in 0-255 levels. Draft decoding and PIL's
+# antialiased resize (vs. TensorFlow's) stay under 5; a wrong geometry
+# (stretch vs. pad) is at least 8 on every non-square fixture.
+KERAS_TOLERANCE = 6 / 255
+
+
+@pytest.fixture(scope="module")
+def dataset_dir(tmp_path_factory):
+    """Class-per-directory dataset: JPEG and PNG; portrait, landscape, grayscale, small and large"""
+    directory = tmp_path_factory.mktemp("dataset")
+    for i, (filename, width, height, mode, fmt) in enumerate(PARITY_SAMPLES):
+        class_dir = directory / CLASS_NAMES[i % 2]
+        class_dir.mkdir(exist_ok=True)
+        (class_dir / filename).write_bytes(make_image(width, height, mode, fmt, seed=i))
+    return str(directory)
+
+
+@pytest.mark.parametrize("resize", RESIZE_MODES)
+def test_training_and_serving_tensors_are_identical(dataset_dir, resize):
+    pytest.importorskip("tensorflow")
+    paths, _ = index_images(dataset_dir, CLASS_NAMES, shuffle=False)
+    training = np.concatenate([
+        x.numpy() for x, _ in image_dataset(dataset_dir, CLASS_NAMES, shuffle=False, resize=resize)
+    ])
+
+    assert len(paths) == len(PARITY_SAMPLES) == len(training)
+    for path, train_tensor in zip(paths, training):
+        with open(path, "rb") as f:
+            serving = decode_image(f.read(), resize)
+        assert serving.shape == train_tensor.shape == IMG_SIZE + (3,), os.path.basename(path)
+        assert np.array_equal(serving, train_tensor), os.path.basename(path)
+
+
+def zero_border(img_array: np.ndarray) -> tuple:
+    """All-black rows at the top and bottom, and columns at the left and right"""
+    blank_rows = np.flatnonzero(img_array.max(axis=(1, 2)) > 0)
+    blank_cols = np.flatnonzero(img_array.max(axis=(0, 2)) > 0)
+    return (blank_rows[0], len(img_array) - 1 - blank_rows[-1],
+            blank_cols[0], img_array.shape[1] - 1 - blank_cols[-1])
+
+
+@pytest.mark.parametrize("resize", RESIZE_MODES)
+def test_serving_matches_keras_geometry(dataset_dir, resize):
+    """An independent reference: Keras' loader with pad_to_aspect_ratio on or off"""
+    pytest.importorskip("tensorflow")
+    from tensorflow.keras.preprocessing import image_dataset_from_directory
+
+    paths, _ = index_images(dataset_dir, CLASS_NAMES, shuffle=False)
+    reference = np.concatenate([
+        x.numpy() / 255.0 for x, _ in image_dataset_from_directory(
+            dataset_dir, label_mode="categorical", class_names=CLASS_NAMES, image_size=IMG_SIZE,
+            shuffle=False, pad_to_aspect_ratio=resize == "pad", verbose=False,
+        )
+    ])
+
+    for path, expected in zip(paths, reference):
+        with open(path, "rb") as f:
+            serving = decode_image(f.read(), resize)
+        name = os.path.basename(path)
+        assert np.abs(serving - expected).mean() < KERAS_TOLERANCE, name
+        # Padding bands in the same place, give or take a row of rounding
+        assert np.abs(np.subtract(zero_border(serving), zero_border(expected))).max() <= 1, name
+
+
+def test_labels_follow_class_directories(dataset_dir):
+    pytest.importorskip("tensorflow")
+    paths, labels = index_images(dataset_dir, CLASS_NAMES, shuffle=False)
+    one_hot = np.concatenate([y.numpy() for _, y in image_dataset(dataset_dir, CLASS_NAMES, shuffle=False)])
+
+    assert [CLASS_NAMES[label] for label in labels] == [os.path.basename(os.path.dirname(p)) for p in paths]
+    assert np.array_equal(one_hot.argmax(axis=1), labels)
+
+
+def test_seeded_split_is_reproducible_and_disjoint(dataset_dir):
+    def split(subset):
+        return index_images(dataset_dir, CLASS_NAMES, seed=7, validation_split=0.5, subset=subset)[0]
+
+    assert split("training") == split("training")
+    assert sorted(split("training") + split("validation")) == sorted(index_images(dataset_dir, CLASS_NAMES, shuffle=False)[0])
+
+
+def test_unseeded_shuffle_leaves_global_rng_alone(dataset_dir):
+    state = np.random.get_state()
+    index_images(dataset_dir, CLASS_NAMES)
+    assert np.array_equal(np.random.get_state()[1], state[1])
@@ -0,0 +1,108 @@
+"""Whole-volume analysis of NIfTI scans: pre-filter, batch and rank axial slices.
+
+Backs /api/analysis/predict-volume and runs from the command line against
+the configured inference client (in-process models, or the inference
+server with INFERENCE_MODE=remote):
+
+    python volume_analysis.py scan.nii.gz --tta 2 --top 5 --output result.json
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import os
+from functools import partial
+
+from ai.nifti import NiftiVolume, scan_volume, iter_rendered
+from batching import MAX_BATCH_SIZE
+from inference import aggregate_predictions
+from inference_client import inference_client
+from metrics import stage_timer
+
+NIFTI_BATCH_SIZE = int(os.getenv("NIFTI_BATCH_SIZE", str(MAX_BATCH_SIZE)))
+NIFTI_TOP_SLICES = int(os.getenv("NIFTI_TOP_SLICES", "5"))
+# Slices with less than NIFTI_MIN_FOREGROUND of their voxels above
+# NIFTI_BACKGROUND_LEVEL of the volume's intensity range are not predicted
+NIFTI_MIN_FOREGROUND = float(os.getenv("NIFTI_MIN_FOREGROUND", "0.05"))
+NIFTI_BACKGROUND_LEVEL = float(os.getenv("NIFTI_BACKGROUND_LEVEL", "0.1"))
+
+
+def suspicion(result: dict) -> float:
+    """Probability of any tumor class"""
+    return 1.0 - result["probabilities"]["notumor"]
+
+
+async def analyze_volume(volume: NiftiVolume, tta: int = 0, top: int = NIFTI_TOP_SLICES) -> dict:
+    """Predict every informative slice of ``volume``; keeps the images of the ``top`` most suspicious"""
+    with stage_timer("decode"):
+        informative, window = await asyncio.to_thread(
+            scan_volume, volume, NIFTI_MIN_FOREGROUND, NIFTI_BACKGROUND_LEVEL
+        )
+    if not informative:
+        raise ValueError("No informative slices in volume")
+
+    slices, most_suspicious = [], []
+    batches = iter_rendered(volume, informative, window, NIFTI_BATCH_SIZE)
+    while True:
+        with stage_timer("decode"):
+            batch = await asyncio.to_thread(next, batches, None)
+        if batch is None:
+            break
+        images = [(f"slice{z:04d}.png", png) for z, png in batch]
+        results = await inference_client.predict_batch(images, tta)
+        for (z, png), (filename, _), result in zip(batch, images, results):
+            slices.append((z, result))
+            # Min-heap of the top slices, so only their PNGs stay in memory
+            entry = (suspicion(result), -z, filename, png, result)
+            if len(most_suspicious) < top:
+                heapq.heappush(most_suspicious, entry)
+            elif entry > most_suspicious[0]:
+                heapq.heapreplace(most_suspicious, entry)
+
+    return {
+        "shape": list(volume.shape),
+        "orientation": volume.orientation,
+        "slices": slices,
+        "study": aggregate_predictions([result for _, result in slices]),
+        "most_suspicious": [
+            (-neg_z, (filename, png), result)
+            for _, neg_z, filename, png, result in sorted(most_suspicious, reverse=True)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help=".nii or .nii.gz volume")
+    parser.add_argument("--tta", type=int, default=0)
+    parser.add_argument("--top", type=int, default=NIFTI_TOP_SLICES)
+    parser.add_argument("--output", help="Write the full result as JSON")
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            return await analyze_volume(NiftiVolume(partial(open, args.path, "rb")), args.tta, args.top)
+        finally:
+            await inference_client.close()
+
+    analysis = asyncio.run(run())
+    study = analysis["study"]
+    print(f"Volume {'x'.join(map(str, analysis['shape']))} ({analysis['orientation']}): "
+          f"{len(analysis['slices'])} of {analysis['shape'][2]} slices analyzed")
+    print(f"Study: {study['predicted_class']} {study['probabilities']}")
+    for z, _, result in analysis["most_suspicious"]:
+        print(f"  slice {z:4d}  {result['predicted_class']:<10}  tumor p={suspicion(result):.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "shape": analysis["shape"],
+                "orientation": analysis["orientation"],
+                "study": study,
+                "slices": [{"index": z, **result} for z, result in analysis["slices"]],
+                "most_suspicious": [z for z, _, _ in analysis["most_suspicious"]],
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Analysis job worker: claims queued jobs from Postgres and runs inference.
+
+Run as many of these as needed, independently of the API processes:
+
+    python worker.py
+
+Predictions go through inference_client, so with INFERENCE_MODE=remote the
+worker sends them to inference_server.py and never loads TensorFlow.
+"""
+import asyncio
+import os
+import signal
+import socket
+import time
+
+from blob_store import blob_store, BlobNotFound
+from database import SessionLocal
+from inference import ImageDecodeError
+from inference_client import inference_client
+from job_queue import claim_jobs, complete_job, fail_job, JOB_CLAIM_BATCH_SIZE, JOB_POLL_INTERVAL_SECONDS
+from model_registry import model_registry
+
+stopping = False
+# One event loop for the worker's lifetime, so the remote client keeps its connections
+runner = asyncio.Runner()
+
+
+def request_stop(signum, frame):
+    global stopping
+    stopping = True
+
+
+def job_image(job: dict) -> tuple:
+    """(filename, bytes) from the blob store, or the row for jobs queued before it"""
+    return job["filename"], job["image_data"] or blob_store.read(job["image_key"])
+
+
+def predict_batch(images: list) -> list:
+    return runner.run(inference_client.predict_batch(images))
+
+
+def predict_jobs(jobs: list) -> list:
+    """(job, result or exception) per job; a bad image only fails its own job"""
+    try:
+        results = predict_batch([job_image(job) for job in jobs])
+        return list(zip(jobs, results))
+    except (ImageDecodeError, BlobNotFound):
+        if len(jobs) == 1:
+            raise
+
+    outcomes = []
+    for job in jobs:
+        try:
+            outcomes.append((job, predict_batch([job_image(job)])[0]))
+        except Exception as e:
+            outcomes.append((job, e))
+    return outcomes
+
+
+def process_jobs(worker_id: str, jobs: list):
+    try:
+        outcomes = predict_jobs(jobs)
+    except Exception as e:
+        outcomes = [(job, e) for job in jobs]
+
+    db = SessionLocal()
+    try:
+        for job, outcome in outcomes:
+            if isinstance(outcome, Exception):
+                print(f"Job {job['id']} failed: {outcome}")
+                fail_job(db, job["id"], worker_id, str(outcome),
+                         retryable=not isinstance(outcome, (ImageDecodeError, BlobNotFound)))
+            elif complete_job(db, job["id"], worker_id, outcome) is None:
+                print(f"Job {job['id']} was reclaimed by another worker, result discarded")
+    finally:
+        db.close()
+
+
+def run(worker_id: str):
+    if not model_registry.enabled:
+        raise SystemExit("worker.py runs inference; unset INFERENCE_MODE=off for it")
+    if inference_client.mode == "local":
+        model_registry.warm_up_all()
+    print(f"✓ Worker {worker_id} polling for jobs ({inference_client.mode} inference)")
+
+    while not stopping:
+        db = SessionLocal()
+        try:
+            jobs = claim_jobs(db, worker_id, JOB_CLAIM_BATCH_SIZE)
+        finally:
+            db.close()
+
+        if not jobs:
+            time.sleep(JOB_POLL_INTERVAL_SECONDS)
+            continue
+
+        process_jobs(worker_id, jobs)
+
+    runner.run(inference_client.close())
+    runner.close()
+    print(f"Worker {worker_id} stopped")
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    run(f"{socket.gethostname()}:{os.getpid()}")